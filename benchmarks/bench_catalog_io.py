@@ -0,0 +1,71 @@
+"""
+    Benchmark of catalog import and export.
+
+    Exports a synthetic catalog of N products as CSV and JSON Lines, times importing it back
+    into an empty store, and compares with building the same products one by one through
+    Store.add_product. The memory taken by an import beyond the products it loads is measured
+    for a few chunk sizes.
+
+    Run from the repository root:
+        python -m benchmarks.bench_catalog_io [count]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.suite import make_catalog
+from catalog_io import export_catalog, import_catalog, parse_row
+from store import Store
+
+
+def _timed(function):
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def one_by_one(path):
+    """Builds the store with one parse_row and one Store.add_product per row, as a baseline."""
+    import csv
+    store = Store([])
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            store.add_product(parse_row(row))
+    return store
+
+
+def import_overhead(path, chunk_size):
+    """Returns the peak memory of an import, in bytes, beyond what the loaded store keeps."""
+    gc.collect()
+    tracemalloc.start()
+    store = Store([])
+    import_catalog(store, path, chunk_size=chunk_size)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return peak - retained
+
+
+def main(count=200_000):
+    with tempfile.TemporaryDirectory() as directory:
+        store = Store(make_catalog(count))
+        for suffix in (".csv", ".jsonl"):
+            path = os.path.join(directory, f"catalog{suffix}")
+            seconds, written = _timed(lambda: export_catalog(store, path))
+            size = os.path.getsize(path) / 2 ** 20
+            print(f"export {suffix:6}: {written / seconds:12,.0f} rows/s  ({size:.1f} MiB)")
+            seconds, report = _timed(lambda: import_catalog(Store([]), path))
+            print(f"import {suffix:6}: {report.loaded / seconds:12,.0f} rows/s  ({report.rejected} rejected)")
+        path = os.path.join(directory, "catalog.csv")
+        seconds, _ = _timed(lambda: one_by_one(path))
+        print(f"add_product loop: {count / seconds:12,.0f} rows/s")
+        for chunk_size in (1_000, 10_000, 100_000):
+            print(f"import overhead, chunks of {chunk_size:7,}: {import_overhead(path, chunk_size) / 2 ** 20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,94 @@
+"""
+    Benchmark of the order ledger.
+
+    Times Store.order with and without a ledger attached, then records N order lines with a
+    clock advancing one second per line and times sales queries over the whole history and
+    over a window cutting through segments, against adding up the same rows one by one. The
+    memory held by the ledger is measured after recording.
+
+    Run from the repository root:
+        python -m benchmarks.bench_ledger [lines]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.suite import make_catalog
+from order_ledger import OrderLedger
+from store import Store
+
+
+class StepClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+def time_orders(store, products, operations=50_000):
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(operations):
+        store.order([(products[rng.randrange(len(products))], 1)])
+    return (time.perf_counter() - start) / operations * 1e9
+
+
+def timed(function, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(line_count=1_000_000):
+    products = [product for product in make_catalog(10_000) if product.get_quantity() > 0]
+    store = Store(products)
+    print(f"Store.order, no ledger      : {time_orders(store, products):8.0f} ns")
+    ledger = OrderLedger()
+    ledger.attach(store)
+    print(f"Store.order, with ledger    : {time_orders(store, products):8.0f} ns")
+    ledger.close()
+
+    def fill(ledger):
+        rng = random.Random(1)
+        for _ in range(line_count):
+            product = products[rng.randrange(len(products))]
+            ledger.record([(product, 1, product.price_cents)])
+
+    ledger = OrderLedger(clock=StepClock())
+    start = time.perf_counter()
+    fill(ledger)
+    print(f"record                      : {line_count / (time.perf_counter() - start):10,.0f} lines/s")
+    # A second ledger is filled with tracing on, which is too slow to time.
+    tracemalloc.start()
+    traced = OrderLedger(clock=StepClock())
+    fill(traced)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    traced.close()
+    print(f"memory held                 : {held / 2 ** 20:8.1f} MiB for {line_count:,} lines")
+
+    window = (line_count * 0.1 + 0.5, line_count * 0.9 + 0.5)
+    print(f"sales_by_sku, all history   : {timed(ledger.sales_by_sku):8.2f} ms")
+    print(f"sales_by_sku, 80% window    : {timed(lambda: ledger.sales_by_sku(*window)):8.2f} ms")
+    print(f"top_sellers(10), 80% window : {timed(lambda: ledger.top_sellers(10, *window)):8.2f} ms")
+
+    def scan():
+        totals = {}
+        for segment in ledger._segments:
+            columns = segment.read_columns()
+            for sold, sku, charged in zip(columns["time"], columns["sku"], columns["charged_cents"]):
+                if window[0] <= sold < window[1]:
+                    totals[sku] = totals.get(sku, 0) + charged
+        return totals
+    print(f"row scan, 80% window        : {timed(scan, repeat=1):8.2f} ms")
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,72 @@
+"""
+    Memory benchmark for product storage.
+
+    Compares the memory taken by N products stored as dict-backed objects (the layout
+    Product had before it used __slots__), as slotted Product objects, as ProductTable
+    rows, and as ProductTable rows with a ProductRow view materialized for each.
+
+    Run from the repository root:
+        python -m benchmarks.bench_memory [count]
+"""
+import gc
+import sys
+import tracemalloc
+
+from products import Product
+from product_table import ProductTable
+
+
+class DictProduct:
+    """A product with the attribute layout Product had before __slots__."""
+
+    def __init__(self, name, price, quantity):
+        self.name = name
+        self.price = price
+        self._quantity = quantity
+        self.active = True
+        self.promotion = None
+
+
+def measure(build, names):
+    gc.collect()
+    tracemalloc.start()
+    result = build(names)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def build_dict_products(names):
+    return [DictProduct(name, 10.5, 5) for name in names]
+
+
+def build_products(names):
+    return [Product(name, 10.5, 5) for name in names]
+
+
+def build_table(names):
+    table = ProductTable()
+    for name in names:
+        table.append(name, 10.5, 5)
+    return table
+
+
+def build_table_with_views(names):
+    table = build_table(names)
+    return table, list(table)
+
+
+def main(count=1_000_000):
+    names = [f"Product {index}" for index in range(count)]
+    print(f"{count} products")
+    for label, build in [("dict-backed objects", build_dict_products),
+                         ("slotted Product", build_products),
+                         ("ProductTable", build_table),
+                         ("ProductTable + views", build_table_with_views)]:
+        size = measure(build, names)
+        print(f"{label:22} {size / 1e6:8.1f} MB  {size / count:6.1f} bytes/product")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,41 @@
+"""
+    Overhead benchmark of the metrics instrumentation.
+
+    Times Store.order and Product.buy with instrumentation never enabled, enabled, and
+    disabled again, to show that it costs nothing once off and little when on.
+
+    Run from the repository root:
+        python -m benchmarks.bench_metrics [calls]
+"""
+import random
+import sys
+import timeit
+
+import metrics
+from benchmarks.suite import make_catalog
+from store import Store
+
+
+def measure(store, stocked, calls):
+    rng = random.Random(0)
+    order_seconds = timeit.timeit(lambda: store.order([(stocked[rng.randrange(len(stocked))], 1)]), number=calls)
+    buy_seconds = timeit.timeit(lambda: stocked[rng.randrange(len(stocked))].buy(1), number=calls)
+    return order_seconds / calls * 1e9, buy_seconds / calls * 1e9
+
+
+def main(calls=100_000):
+    products = make_catalog(10_000)
+    store = Store(products)
+    stocked = [product for product in products if product.get_quantity() > 0]
+    print(f"{'':10} {'Store.order':>14} {'Product.buy':>14}")
+    for label in ("off", "on", "off again"):
+        if label == "on":
+            metrics.enable()
+        elif label == "off again":
+            metrics.disable()
+        order_ns, buy_ns = measure(store, stocked, calls)
+        print(f"{label:10} {order_ns:11.0f} ns {buy_ns:11.0f} ns")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
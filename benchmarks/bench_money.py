@@ -0,0 +1,51 @@
+"""
+    Benchmark of money arithmetic: floats, Decimal and integer cents.
+
+    Sums the line totals of random orders with a percent discount in each representation,
+    and reports the time per line and how far the float total drifts from the exact one.
+
+    Run from the repository root:
+        python -m benchmarks.bench_money [lines]
+"""
+import random
+import sys
+import timeit
+from decimal import Decimal, ROUND_HALF_UP
+
+from money import percent_off, to_basis_points, to_cents
+
+PERCENT = 12.5
+
+
+def main(lines=500_000):
+    rng = random.Random(0)
+    prices = [round(rng.uniform(0.01, 2000), 2) for _ in range(lines)]
+    quantities = [rng.randint(1, 20) for _ in range(lines)]
+    cents = [to_cents(price) for price in prices]
+    decimals = [Decimal(repr(price)) for price in prices]
+    basis_points = to_basis_points(PERCENT)
+    factor = 1 - PERCENT / 100
+    decimal_factor = 1 - Decimal(repr(PERCENT)) / 100
+    cent = Decimal("0.01")
+
+    def with_floats():
+        return sum(round(price * quantity * factor, 2) for price, quantity in zip(prices, quantities))
+
+    def with_decimals():
+        return sum((price * quantity * decimal_factor).quantize(cent, rounding=ROUND_HALF_UP)
+                   for price, quantity in zip(decimals, quantities))
+
+    def with_cents():
+        return sum(percent_off(price * quantity, basis_points) for price, quantity in zip(cents, quantities))
+
+    results = {}
+    for label, function in (("float", with_floats), ("Decimal", with_decimals), ("int cents", with_cents)):
+        seconds = timeit.timeit(lambda: results.__setitem__(label, function()), number=1)
+        print(f"{label:10} {seconds / lines * 1e9:8.0f} ns/line")
+    exact = results["Decimal"]
+    print(f"float total drift: {Decimal(repr(results['float'])) - exact}")
+    print(f"int cents total drift: {Decimal(results['int cents']) / 100 - exact}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
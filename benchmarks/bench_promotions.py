@@ -0,0 +1,40 @@
+"""
+    Benchmark of compiled promotions against the promotion classes they replace.
+
+    Prices each product at a random quantity with a classic promotion and with the
+    equivalent compiled rule, at small and very large quantities, to show that both
+    take constant time per call whatever the quantity.
+
+    Run from the repository root:
+        python -m benchmarks.bench_promotions [calls]
+"""
+import random
+import sys
+import timeit
+
+from products import Product, SecondHalfPrice, ThirdOneFree, PercentDiscount
+from promotion_engine import compile_promotion
+
+PAIRS = [
+    ("SecondHalfPrice", SecondHalfPrice("Second Half price!"), {"type": "second_half_price"}),
+    ("ThirdOneFree", ThirdOneFree("Third One Free!"), {"type": "buy_n_get_m", "buy": 2, "free": 1}),
+    ("PercentDiscount", PercentDiscount("30% off!", percent=30), {"type": "percent", "percent": 30}),
+]
+
+
+def main(calls=200_000):
+    rng = random.Random(0)
+    product = Product("Item", price=199.99, quantity=0)
+    for max_quantity in (10, 10 ** 9):
+        quantities = [rng.randint(1, max_quantity) for _ in range(calls)]
+        print(f"quantities up to {max_quantity}")
+        for label, classic, spec in PAIRS:
+            compiled = compile_promotion(spec)
+            for kind, promotion in (("class", classic), ("compiled", compiled)):
+                apply = promotion.apply_promotion
+                seconds = timeit.timeit(lambda: [apply(product, quantity) for quantity in quantities], number=1)
+                print(f"  {label:16} {kind:9} {seconds / calls * 1e9:8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
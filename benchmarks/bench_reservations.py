@@ -0,0 +1,60 @@
+"""
+    Benchmark of reservation expiry.
+
+    Places a large number of holds over a simulated hour, each lasting 15 minutes, so that
+    earlier holds expire while later ones are placed, then advances the clock until every
+    hold has expired. Reports the cost per hold, which stays flat as the number of holds grows.
+
+    Run from the repository root:
+        python -m benchmarks.bench_reservations [holds]
+"""
+import random
+import sys
+import time
+
+from products import Product
+from reservations import ReservationManager
+from store import Store
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(hold_count, product_count=10_000):
+    products = [Product(f"Product {index}", price=10, quantity=10 ** 9) for index in range(product_count)]
+    store = Store(products)
+    clock = Clock()
+    reservations = ReservationManager(store, ttl=900, clock=clock)
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    for cart in range(hold_count):
+        # Carts arrive over an hour; each hold lasts 15 minutes from its cart's arrival.
+        clock.now = cart * 3600 / hold_count
+        reservations.hold(cart, products[rng.randrange(product_count)], 1)
+    placed = time.perf_counter() - start
+
+    outstanding = len(reservations)
+    start = time.perf_counter()
+    while len(reservations):
+        clock.now += 10
+        reservations.expire()
+    drained = time.perf_counter() - start
+    assert all(product.get_available() == 10 ** 9 for product in products)
+    return placed / hold_count * 1e9, drained / outstanding * 1e9, outstanding
+
+
+def main(hold_count=1_000_000):
+    for count in sorted({hold_count // 100, hold_count // 10, hold_count}):
+        hold_ns, expire_ns, outstanding = run(count)
+        print(f"{count:9} holds: {hold_ns:8.0f} ns/hold placed (expiring earlier ones), "
+              f"{expire_ns:8.0f} ns/hold to expire the last {outstanding}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
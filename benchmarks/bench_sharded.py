@@ -0,0 +1,44 @@
+"""
+    Throughput benchmark for ShardedStore.
+
+    Client threads send single-line orders for random products through one coordinator,
+    and the benchmark reports orders per second for each number of worker processes.
+    Throughput can only grow with workers up to the number of available cores.
+
+    Run from the repository root:
+        python -m benchmarks.bench_sharded [products] [orders]
+"""
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from products import Product
+from sharded_store import ShardedStore
+
+
+def run(workers, product_count, order_count, clients=16):
+    products = [Product(f"Product {index}", price=10, quantity=10 ** 9) for index in range(product_count)]
+    names = [product.name for product in products]
+    with ShardedStore(products, workers=workers) as store:
+        def client(seed):
+            rng = random.Random(seed)
+            for _ in range(order_count // clients):
+                store.order([(store_products[rng.randrange(product_count)], 1)])
+
+        store_products = [Product(name, price=10, quantity=0) for name in names]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(client, range(clients)))
+        return order_count / (time.perf_counter() - start)
+
+
+def main(product_count=10_000, order_count=20_000):
+    print(f"{product_count} products, {order_count} orders, {os.cpu_count()} cores")
+    for workers in (1, 2, 4, 8):
+        print(f"{workers} workers: {run(workers, product_count, order_count):10.0f} orders/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,77 @@
+"""
+    Startup benchmark of the store program.
+
+    Starts main.py in a new interpreter and measures the time until the menu asks for a
+    choice, and until the first page of products is shown, with the demo catalog and with
+    a snapshot catalog of the given size. The catalog is loaded whole on the first menu
+    choice, so the time to the first page grows with its size. An empty interpreter is timed
+    for reference.
+
+    Run from the repository root:
+        python -m benchmarks.bench_startup [products] [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import make_catalog
+from snapshot import save_snapshot
+from store import Store
+
+MENU_PROMPT = b"Please choose a number: "
+PAGE_PROMPT = b"Press Enter for more products"
+
+
+def _read_until(process, marker):
+    output = b""
+    while marker not in output:
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            raise RuntimeError(f"The program ended before printing {marker!r}.")
+        output += chunk
+
+
+def time_run(arguments):
+    """
+        Returns the seconds until the menu prompt and until the first page of products.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "main.py", *arguments],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        _read_until(process, MENU_PROMPT)
+        menu = time.perf_counter() - start
+        process.stdin.write(b"1\n")
+        process.stdin.flush()
+        # A short catalog fits on one page and goes straight back to the menu.
+        _read_until(process, PAGE_PROMPT if arguments else MENU_PROMPT)
+        page = time.perf_counter() - start
+        process.stdin.write(b"q\n4\n" if arguments else b"4\n")
+        process.stdin.close()
+        process.wait()
+    finally:
+        process.kill()
+    return menu, page
+
+
+def main(product_count=100_000, runs=10):
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+    print(f"empty interpreter: {(time.perf_counter() - start) / runs * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        catalog = os.path.join(directory, "catalog.snap")
+        save_snapshot(Store(make_catalog(product_count)), catalog)
+        for label, arguments in (("demo catalog", []), (f"{product_count} products", ["--catalog", catalog])):
+            timings = [time_run(arguments) for _ in range(runs)]
+            menu = statistics.median(timing[0] for timing in timings)
+            page = statistics.median(timing[1] for timing in timings)
+            print(f"{label:17}: {menu * 1000:8.1f} ms to first menu, {page * 1000:8.1f} ms to first page")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,69 @@
+"""
+    Benchmark of stock events and bulk restocking.
+
+    Times Product.buy on a store without a StockMonitor, with an idle monitor, and with a
+    subscribed monitor whose thresholds the purchases never cross, to show the monitor adds
+    nothing measurable to the purchase path. Then times restocking N sold-out products with
+    one Store.restock call against a set_quantity and activate per product.
+
+    Run from the repository root:
+        python -m benchmarks.bench_stock_events [count]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from products import Product
+from stock_events import StockMonitor
+from store import Store
+
+
+def time_buys(store, products, operations=200_000, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for index in range(operations):
+            products[index % len(products)].buy(1)
+        timings.append((time.perf_counter() - start) / operations * 1e9)
+    return statistics.median(timings)
+
+
+def sold_out_store(count):
+    products = [Product(f"Product {index}", price=1, quantity=1) for index in range(count)]
+    store = Store(products)
+    # Sell every other product out, so reactivations come out of catalog order.
+    for product in products[::2]:
+        product.buy(1)
+    return store, products[::2][::-1]
+
+
+async def buy_benchmark():
+    products = [Product(f"Product {index}", price=1, quantity=10 ** 9) for index in range(1000)]
+    store = Store(products)
+    print(f"Product.buy, no monitor        : {time_buys(store, products):8.0f} ns")
+    monitor = StockMonitor(store)
+    print(f"Product.buy, idle monitor      : {time_buys(store, products):8.0f} ns")
+    queue = monitor.subscribe()
+    print(f"Product.buy, subscribed monitor: {time_buys(store, products):8.0f} ns  ({queue.qsize()} events)")
+    monitor.close()
+
+
+def main(count=20_000):
+    asyncio.run(buy_benchmark())
+
+    store, sold_out = sold_out_store(count)
+    start = time.perf_counter()
+    for product in sold_out:
+        product.set_quantity(10)
+        product.activate()
+    print(f"set_quantity + activate x {len(sold_out)}: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    store, sold_out = sold_out_store(count)
+    start = time.perf_counter()
+    store.restock([(product, 10) for product in sold_out])
+    print(f"Store.restock of {len(sold_out)}       : {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
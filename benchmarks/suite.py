@@ -0,0 +1,245 @@
+"""
+    Benchmark suite for the order and pricing hot paths.
+
+    Builds synthetic catalogs of each requested size, with plain, non-stocked and limited
+    products and a random share of promotions, and times Store construction, Store.order,
+    Product.buy, Store.quote, get_all_products, get_total_quantity and main.listing_all_products on them,
+    plus the time to start the program. Each case is repeated and its median time per
+    operation is reported.
+
+    Results can be written to a JSON report and compared with an earlier report used as the
+    baseline: the run fails, with exit status 1, if any case is slower than the baseline by
+    more than the threshold.
+
+    Run from the repository root:
+        python -m benchmarks.suite [--sizes 1000 100000 10000000] [--output report.json]
+                                   [--baseline baseline.json] [--threshold 0.1] [--repeat 5]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from main import listing_all_products
+from products import Product, NonStockedProduct, LimitedProduct, Promotion, SecondHalfPrice, ThirdOneFree, \
+    PercentDiscount
+from promotion_engine import compile_promotion
+from store import Store
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+PROMOTIONS = [
+    SecondHalfPrice("Second Half price!"),
+    ThirdOneFree("Third One Free!"),
+    PercentDiscount("30% off!", percent=30),
+    PercentDiscount("12.5% off!", percent=12.5),
+    compile_promotion({"type": "tiered", "name": "Volume", "tiers": [[10, 5], [100, 12]]}),
+]
+
+
+def make_catalog(size: int, seed: int = 0, promotion_share: float = 0.3,
+                 promotions: Optional[List[Promotion]] = None) -> List[Product]:
+    """
+        Builds a synthetic catalog of products.
+
+        Args:
+            size (int): The number of products.
+            seed (int): The seed of the random generator, so the same catalog can be rebuilt.
+            promotion_share (float): The share of products given a random promotion.
+            promotions (List[Promotion], optional): The promotions to choose from; PROMOTIONS by default.
+
+        Returns:
+            List[Product]: About 80% plain products, 10% non-stocked and 10% limited ones.
+    """
+    rng = random.Random(seed)
+    promotions = promotions or PROMOTIONS
+    products = []
+    for index in range(size):
+        price = rng.randint(1, 500_000) / 100
+        kind = rng.random()
+        if kind < 0.1:
+            product = NonStockedProduct(f"License {index}", price=price)
+        elif kind < 0.2:
+            product = LimitedProduct(f"Service {index}", price=price, quantity=rng.randint(10 ** 6, 10 ** 9),
+                                     maximum=rng.randint(1, 5))
+        else:
+            product = Product(f"Product {index}", price=price, quantity=rng.randint(10 ** 6, 10 ** 9))
+        if rng.random() < promotion_share:
+            product.set_promotion(rng.choice(promotions))
+        products.append(product)
+    return products
+
+
+def _time(operation: Callable[[], object], operations: int, repeat: int) -> Tuple[float, float]:
+    """
+        Returns the median and best time per operation, in nanoseconds, of running operation
+        the given number of times, over several repeats.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(operations):
+            operation()
+        timings.append((time.perf_counter() - start) / operations * 1e9)
+    return statistics.median(timings), min(timings)
+
+
+def _cases(store: Store, products: List[Product], rng: random.Random) -> Dict[str, Tuple[Callable, int]]:
+    """
+        Returns each case's operation and the number of times to run it per repeat.
+    """
+    # Non-stocked products have no quantity to sell.
+    stocked = [product for product in products if product.get_quantity() > 0]
+    count = len(stocked)
+
+    def order():
+        store.order([(stocked[rng.randrange(count)], 1)])
+
+    def order_three_lines():
+        store.order([(stocked[rng.randrange(count)], 1) for _ in range(3)])
+
+    def buy():
+        stocked[rng.randrange(count)].buy(1)
+
+    cart = [(stocked[rng.randrange(count)], 1) for _ in range(3)]
+
+    def quote_new_cart():
+        store.quote([(stocked[rng.randrange(count)], 1) for _ in range(3)])
+
+    others = [product for product in stocked if product not in {item for item, _ in cart}]
+
+    def quote_with_traffic():
+        # An order for another product between quotes, as on a busy store.
+        others[rng.randrange(len(others))].buy(1)
+        store.quote(cart)
+
+    def listing_after_change():
+        stocked[rng.randrange(count)].buy(1)
+        listing_all_products(store)
+
+    scans = max(1, 1_000_000 // len(products))
+    return {
+        "Store.order": (order, 20_000),
+        "Store.order[3 lines]": (order_three_lines, 10_000),
+        "Product.buy": (buy, 50_000),
+        "Store.quote[cached]": (lambda: store.quote(cart), 100_000),
+        "Store.quote[new cart]": (quote_new_cart, 10_000),
+        "Store.quote[cached, other orders]": (quote_with_traffic, 50_000),
+        "Store.get_all_products": (store.get_all_products, scans),
+        "Store.get_total_quantity": (store.get_total_quantity, 100_000),
+        "listing_all_products[cached]": (lambda: listing_all_products(store), 10_000),
+        "listing_all_products[after change]": (listing_after_change, max(1, scans // 10)),
+    }
+
+
+def measure_startup(repeat: int) -> Tuple[float, float]:
+    """
+        Returns the median and best time, in nanoseconds, for a new interpreter to import main.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], check=True)
+        timings.append((time.perf_counter() - start) * 1e9)
+    return statistics.median(timings), min(timings)
+
+
+def run(sizes=DEFAULT_SIZES, repeat: int = 5, seed: int = 0) -> dict:
+    """
+        Runs every case on a catalog of each size.
+
+        Returns:
+            dict: A report with the environment and, for each case, its median and best time per
+                operation in nanoseconds, keyed by "case[n=size]".
+    """
+    results = {}
+
+    def record(key, timing):
+        median, best = timing
+        results[key] = {"ns_per_op": median, "best_ns_per_op": best}
+        print(f"{key:48} {median:14.0f} ns/op", flush=True)
+
+    record("startup", measure_startup(repeat))
+    for size in sizes:
+        # A store registers itself with its products, so each construction gets a fresh catalog.
+        timings = []
+        for _ in range(repeat):
+            products = make_catalog(size, seed)
+            start = time.perf_counter()
+            store = Store(products)
+            timings.append((time.perf_counter() - start) * 1e9)
+        record(f"Store()[n={size}]", (statistics.median(timings), min(timings)))
+        rng = random.Random(seed)
+        for name, (operation, operations) in _cases(store, products, rng).items():
+            record(f"{name}[n={size}]", _time(operation, operations, repeat))
+        store.check_aggregates()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sizes": list(sizes),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.1) -> List[Tuple[str, float, float, float]]:
+    """
+        Compares a report with a baseline report.
+
+        Args:
+            report (dict): The current report.
+            baseline (dict): The earlier report.
+            threshold (float): The slowdown allowed, as a share of the baseline time.
+
+        Returns:
+            List[Tuple[str, float, float, float]]: For each case in both reports, its key, baseline and
+                current time per operation, and the ratio between them, with regressions over the
+                threshold first.
+    """
+    rows = []
+    for key, result in report["results"].items():
+        if key in baseline["results"]:
+            before = baseline["results"][key]["ns_per_op"]
+            after = result["ns_per_op"]
+            rows.append((key, before, after, after / before if before else float("inf")))
+    rows.sort(key=lambda row: (row[3] <= 1 + threshold, -row[3]))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the store's hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="catalog sizes, such as 1000 10000000")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats of each case")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic catalogs")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--baseline", help="compare with the report in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed slowdown against the baseline, as a share (default 0.1)")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = 0
+    print(f"\n{'case':48} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for key, before, after, ratio in compare(report, baseline, args.threshold):
+        regressed = ratio > 1 + args.threshold
+        regressions += regressed
+        print(f"{key:48} {before:12.0f} {after:12.0f} {ratio:7.2f}{'  REGRESSION' if regressed else ''}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+"""
+    Streaming import and export of catalogs as CSV or JSON Lines.
+
+    A catalog file holds one product per row, with these fields:
+        kind        "product" (the default), "non_stocked" or "limited"
+        name        the product name, unique in the store
+        price       the list price, such as 249.99
+        quantity    the stock; empty or 0 for non-stocked products
+        maximum     the purchase limit of a limited product
+        active      "true" (the default) or "false"
+        promotion   a promotion description, such as {"type": "percent", "name": "30% off!", "percent": 30};
+                    "second_half_price", "third_one_free" and "percent" build the classic promotions,
+                    any other type is compiled by promotion_engine.compile_promotion. In a CSV file
+                    it is written as JSON text.
+
+    Files are read and written in chunks of rows, so memory grows with the chunk size and not
+    with the file, apart from the products added to the store. Each row is checked by the
+    constructors of the products and promotions it describes; rows that fail are reported with
+    their line number and skipped, and the rest of the file is still loaded.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import math
+import os
+from collections import namedtuple
+from collections.abc import Iterator
+from itertools import islice
+
+from money import format_cents
+from products import Product, NonStockedProduct, LimitedProduct, Promotion, SecondHalfPrice, ThirdOneFree, \
+    PercentDiscount
+from promotion_engine import CompiledPromotion, compile_promotion
+from store import Store
+
+FIELDS = ["kind", "name", "price", "quantity", "maximum", "active", "promotion"]
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+KINDS = {"product": Product, "non_stocked": NonStockedProduct, "limited": LimitedProduct}
+
+FLAGS = {True: True, False: False, "true": True, "false": False, "1": True, "0": False, "yes": True, "no": False}
+
+CLASSIC_PROMOTIONS = {"second_half_price": SecondHalfPrice, "third_one_free": ThirdOneFree,
+                      "percent": PercentDiscount}
+
+
+class RowError(namedtuple("RowError", ["line", "message"])):
+    """
+        A row of a catalog file that could not be loaded.
+
+        Attributes:
+            line (int): The line of the file the row ends on, counting from 1.
+            message (str): Why the row was rejected.
+    """
+    __slots__ = ()
+
+
+class ImportReport:
+    """
+        The outcome of importing a catalog file.
+
+        Attributes:
+            loaded (int): The number of products added to the store.
+            rejected (int): The number of rows that were skipped.
+            errors (List[RowError]): The first rejected rows, up to the max_errors of the import.
+    """
+
+    def __init__(self):
+        self.loaded = 0
+        self.rejected = 0
+        self.errors: list[RowError] = []
+
+    def __repr__(self) -> str:
+        return f"ImportReport(loaded={self.loaded}, rejected={self.rejected})"
+
+
+def _format_of(path, file_format: str | None) -> str:
+    if file_format is None:
+        file_format = FORMATS.get(os.path.splitext(str(path))[1].lower()) if isinstance(path, (str, os.PathLike)) \
+            else None
+        if file_format is None:
+            raise ValueError("Cannot tell the catalog format; pass file_format='csv' or 'jsonl'.")
+    if file_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown catalog format {file_format!r}.")
+    return file_format
+
+
+def _read_csv(file) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(file)
+    if reader.fieldnames is None:
+        return
+    missing = {"name", "price"} - set(reader.fieldnames)
+    if missing:
+        raise ValueError(f"Catalog file has no {', '.join(sorted(missing))} column.")
+    for row in reader:
+        yield reader.line_num, row, None
+
+
+def _read_jsonl(file) -> Iterator[tuple[int, dict | None, str | None]]:
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"Invalid JSON: {e.msg}."
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Row is not a JSON object."
+            continue
+        yield line_number, row, None
+
+
+def _number(value, field: str) -> float:
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"{field.capitalize()} must be a number.") from None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field.capitalize()} must be a number.")
+    if not math.isfinite(value):
+        raise ValueError(f"{field.capitalize()} must be finite.")
+    return value
+
+
+def _integer(value, field: str) -> int:
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"{field.capitalize()} must be a whole number.") from None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{field.capitalize()} must be a whole number.")
+    return value
+
+
+def _flag(value) -> bool:
+    flag = FLAGS.get(value.strip().lower() if isinstance(value, str) else value) \
+        if isinstance(value, (str, bool)) else None
+    if flag is None:
+        raise ValueError("Active must be true or false.")
+    return flag
+
+
+def _build_promotion(spec) -> Promotion:
+    if isinstance(spec, str):
+        try:
+            spec = json.loads(spec)
+        except json.JSONDecodeError:
+            raise ValueError("Promotion must be a JSON object.") from None
+    if not isinstance(spec, dict):
+        raise ValueError("Promotion must be a JSON object.")
+    promotion_class = CLASSIC_PROMOTIONS.get(spec.get("type"))
+    if promotion_class is None:
+        try:
+            return compile_promotion(spec)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid promotion: {e!r}.") from None
+    name = spec.get("name") or spec["type"]
+    if promotion_class is PercentDiscount:
+        return PercentDiscount(name, percent=_number(spec.get("percent"), "percent"))
+    return promotion_class(name)
+
+
+def parse_row(row: dict, promotions: dict[str, Promotion] | None = None) -> Product:
+    """
+        Builds the product a catalog row describes.
+
+        Args:
+            row (dict): The fields of the row; missing and empty fields take their default.
+            promotions (Dict[str, Promotion], optional): Promotions already built, by their JSON
+                description. A new promotion is added to it, so rows describing the same
+                promotion share one instance.
+
+        Returns:
+            Product: The product, not yet in any store.
+
+        Raises:
+            ValueError: If the row does not describe a valid product.
+    """
+    get = row.get
+    kind = get("kind") or "product"
+    product_class = KINDS.get(kind.strip().lower()) if isinstance(kind, str) else None
+    if product_class is None:
+        raise ValueError(f"Unknown product kind {kind!r}.")
+    name = get("name")
+    if not name:
+        raise ValueError("Name cannot be empty.")
+    if not isinstance(name, str):
+        raise ValueError("Name must be text.")
+    price = get("price")
+    if price is None or price == "":
+        raise ValueError("Price is missing.")
+    price = _number(price, "price")
+    quantity = get("quantity")
+    quantity = 0 if quantity is None or quantity == "" else _integer(quantity, "quantity")
+
+    if product_class is Product:
+        product = Product(name, price=price, quantity=quantity)
+    elif product_class is NonStockedProduct:
+        if quantity != 0:
+            raise ValueError("Non-stocked products cannot have a quantity other than 0.")
+        product = NonStockedProduct(name, price=price)
+    else:
+        maximum = get("maximum")
+        if maximum is None or maximum == "":
+            raise ValueError("Limited products need a maximum.")
+        product = LimitedProduct(name, price=price, quantity=quantity, maximum=_integer(maximum, "maximum"))
+
+    spec = get("promotion")
+    if spec:
+        key = spec if isinstance(spec, str) else json.dumps(spec, sort_keys=True)
+        promotion = promotions.get(key) if promotions is not None else None
+        if promotion is None:
+            promotion = _build_promotion(spec)
+            if promotions is not None:
+                promotions[key] = promotion
+        product.set_promotion(promotion)
+    active = get("active")
+    if active is not None and active != "" and not _flag(active):
+        product.deactivate()
+    return product
+
+
+def import_catalog(store: Store, source, file_format: str | None = None, chunk_size: int = 10_000,
+                   max_errors: int = 1000) -> ImportReport:
+    """
+        Adds the products of a catalog file to a store, a chunk of rows at a time.
+
+        Each chunk is checked row by row, then added to the store in one bulk insert. Rows that
+        are invalid, or name a product the store or an earlier row already has, are skipped and
+        reported.
+
+        Args:
+            store (Store): The store to add the products to.
+            source (str, PathLike or text file): The catalog file, or an open text file.
+            file_format (str, optional): "csv" or "jsonl"; by default, taken from the file extension.
+            chunk_size (int): The number of rows read and added at a time.
+            max_errors (int): The number of rejected rows kept in the report; the others are only counted.
+
+        Returns:
+            ImportReport: The number of products loaded and the rows that were rejected.
+
+        Raises:
+            ValueError: If the format is unknown, or a CSV file has no name or price column.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be greater than zero.")
+    file_format = _format_of(source, file_format)
+    report = ImportReport()
+    promotions: dict[str, Promotion] = {}
+
+    def reject(line: int, message: str):
+        report.rejected += 1
+        if len(report.errors) < max_errors:
+            report.errors.append(RowError(line, message))
+
+    file = open(source, newline="", encoding="utf-8") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        rows = _read_csv(file) if file_format == "csv" else _read_jsonl(file)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            products = []
+            lines = []
+            for line, row, error in chunk:
+                if error is None:
+                    try:
+                        products.append(parse_row(row, promotions))
+                        lines.append(line)
+                        continue
+                    except ValueError as e:
+                        error = str(e)
+                reject(line, error)
+            skipped = {id(product) for product in store.add_products(products, skip_duplicates=True)}
+            if skipped:
+                for line, product in zip(lines, products):
+                    if id(product) in skipped:
+                        reject(line, f"Product '{product.name}' is already in the store.")
+            report.loaded += len(products) - len(skipped)
+    finally:
+        if file is not source:
+            file.close()
+    return report
+
+
+def _promotion_spec(promotion: Promotion) -> dict:
+    if isinstance(promotion, CompiledPromotion):
+        return promotion.spec
+    for type_name, promotion_class in CLASSIC_PROMOTIONS.items():
+        if type(promotion) is promotion_class:
+            spec = {"type": type_name, "name": promotion.name}
+            if promotion_class is PercentDiscount:
+                spec["percent"] = promotion.percent
+            return spec
+    raise ValueError(f"Cannot export promotion type {type(promotion).__name__}.")
+
+
+def _export_row(product: Product, file_format: str) -> dict:
+    kind = "limited" if isinstance(product, LimitedProduct) \
+        else "non_stocked" if isinstance(product, NonStockedProduct) else "product"
+    promotion = _promotion_spec(product.promotion) if product.promotion is not None else None
+    if file_format == "jsonl":
+        row = {"kind": kind, "name": product.name, "price": product.price, "quantity": product.get_quantity(),
+               "active": product.is_active()}
+        if kind == "limited":
+            row["maximum"] = product.maximum
+        if promotion is not None:
+            row["promotion"] = promotion
+        return row
+    return {"kind": kind, "name": product.name, "price": format_cents(product.price_cents),
+            "quantity": product.get_quantity(), "maximum": product.maximum if kind == "limited" else "",
+            "active": "true" if product.is_active() else "false",
+            "promotion": json.dumps(promotion) if promotion is not None else ""}
+
+
+def export_catalog(store: Store, destination, file_format: str | None = None, chunk_size: int = 10_000) -> int:
+    """
+        Writes every product of a store, active or not, to a catalog file that import_catalog reads back.
+
+        Products are read from the store a page at a time and written a chunk at a time. A file
+        given by path is written next to the target and moved into place when complete.
+
+        Args:
+            store (Store): The store to export.
+            destination (str, PathLike or text file): The file to write, or an open text file.
+            file_format (str, optional): "csv" or "jsonl"; by default, taken from the file extension.
+            chunk_size (int): The number of products read and written at a time.
+
+        Returns:
+            int: The number of products written.
+
+        Raises:
+            ValueError: If the format is unknown, or a promotion cannot be described in a catalog.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be greater than zero.")
+    file_format = _format_of(destination, file_format)
+    by_path = isinstance(destination, (str, os.PathLike))
+    temporary_path = f"{os.fspath(destination)}.tmp" if by_path else None
+    file = open(temporary_path, "w", newline="", encoding="utf-8") if by_path else destination
+    count = 0
+    try:
+        if file_format == "csv":
+            writer = csv.DictWriter(file, FIELDS)
+            writer.writeheader()
+        products = store.iter_products(page_size=chunk_size, include_inactive=True)
+        while True:
+            chunk = [_export_row(product, file_format) for product in islice(products, chunk_size)]
+            if not chunk:
+                break
+            if file_format == "csv":
+                writer.writerows(chunk)
+            else:
+                file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk))
+            count += len(chunk)
+        if by_path:
+            file.flush()
+            os.fsync(file.fileno())
+    except BaseException:
+        if by_path:
+            file.close()
+            os.remove(temporary_path)
+        raise
+    if by_path:
+        file.close()
+        os.replace(temporary_path, destination)
+    return count
@@ -0,0 +1,294 @@
+"""
+    Write-ahead journal of store stock changes.
+
+    Every order's stock changes are appended to the journal as one record before they are
+    applied, so a store can be rebuilt after a crash from its last snapshot plus the journal.
+    Each record holds the new quantity of every product the order touched, so replaying a
+    record more than once gives the same result. Records carry a length and a CRC32 checksum;
+    replay stops at the first incomplete or damaged record, which is what a crash in the
+    middle of a write leaves behind.
+"""
+import os
+import struct
+import threading
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+from products import Product
+from snapshot import save_snapshot, load_snapshot
+from store import Store
+
+RECORD_HEADER = struct.Struct("<II")  # payload length, CRC32 of payload
+ENTRY_HEADER = struct.Struct("<H")  # name length
+QUANTITY = struct.Struct("<q")
+
+
+def encode_record(changes: List[Tuple[str, int]]) -> bytes:
+    """
+        Encodes the stock changes of one order as a journal record.
+
+        Args:
+            changes (List[Tuple[str, int]]): The name and new quantity of each changed product.
+
+        Returns:
+            bytes: The record, header included.
+    """
+    payload = bytearray()
+    for name, quantity in changes:
+        encoded_name = name.encode("utf-8")
+        payload += ENTRY_HEADER.pack(len(encoded_name))
+        payload += encoded_name
+        payload += QUANTITY.pack(quantity)
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(data: bytes) -> Iterator[Tuple[int, List[Tuple[str, int]]]]:
+    """
+        Decodes journal records, stopping at the first one that is incomplete or fails its checksum.
+
+        Args:
+            data (bytes): The journal contents.
+
+        Yields:
+            Tuple[int, List[Tuple[str, int]]]: The offset just past the record, and its changes.
+    """
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, checksum = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        changes = []
+        position = 0
+        while position < length:
+            (name_length,) = ENTRY_HEADER.unpack_from(payload, position)
+            position += ENTRY_HEADER.size
+            name = payload[position:position + name_length].decode("utf-8")
+            position += name_length
+            (quantity,) = QUANTITY.unpack_from(payload, position)
+            position += QUANTITY.size
+            changes.append((name, quantity))
+        offset = start + length
+        yield offset, changes
+
+
+class OrderJournal:
+    """
+        An append-only journal of the stock changes made by a store's orders.
+
+        Records are flushed to the operating system as they are written, under the store's
+        locks, so they are in the file in the order the changes were applied. An order is only
+        acknowledged once its record is on disk: after releasing its locks it waits in
+        wait_durable, where one fsync covers every record written so far. Orders that arrive
+        while an fsync runs wait for the next one together, so under load each fsync commits a
+        whole group of orders. Once the journal grows past compact_at bytes, the store is saved
+        to snapshot_path and the journal is emptied.
+
+        Attributes:
+            path (str): The journal file.
+            compact_at (int, optional): The journal size in bytes that triggers compaction.
+            snapshot_path (str, optional): The snapshot written on compaction.
+
+        Methods:
+            attach(store): Starts journaling the store's orders.
+            record(changes) -> int: Appends one order's stock changes and returns the record's ticket.
+            wait_durable(ticket): Waits until the record with that ticket is on disk.
+            replay(store) -> int: Applies the journal to a store and returns the number of records applied.
+            sync(): Forces all written records to disk.
+            compact(): Snapshots the store and empties the journal.
+            close(): Syncs and closes the journal.
+    """
+
+    def __init__(self, path: str, compact_at: Optional[int] = None, snapshot_path: Optional[str] = None):
+        if compact_at is not None and snapshot_path is None:
+            raise ValueError("A snapshot path is needed to compact the journal.")
+        self.path = path
+        self.compact_at = compact_at
+        self.snapshot_path = snapshot_path
+        self._store: Optional[Store] = None
+        self._lock = threading.Lock()
+        self._fsynced = threading.Condition(self._lock)
+        # Records are numbered as they are written; _synced is the last one known to be on disk.
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+        self._file = open(path, "ab")
+
+    def attach(self, store: Store):
+        """
+                Starts writing the stock changes of the store's orders to this journal.
+
+                Args:
+                    store (Store): The store to journal.
+        """
+        self._store = store
+        store.journal = self
+
+    def record(self, changes: List[Tuple[str, int]]) -> int:
+        """
+                Appends the stock changes of one order, without waiting for them to reach the disk.
+
+                Args:
+                    changes (List[Tuple[str, int]]): The name and new quantity of each changed product.
+
+                Returns:
+                    int: The ticket of the record, to pass to wait_durable.
+        """
+        data = encode_record(changes)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            self._written += 1
+            return self._written
+
+    def wait_durable(self, ticket: int):
+        """
+                Waits until the record with the given ticket is on disk.
+
+                If no fsync is running, the caller runs one for every record written so far;
+                otherwise it waits for the running one, and then for the next if that did not
+                cover its record. The journal is not locked during the fsync, so other orders
+                keep writing records meanwhile.
+
+                Args:
+                    ticket (int): A ticket returned by record.
+
+                Raises:
+                    OSError: If the fsync fails. The record is written but may not be on disk.
+        """
+        with self._lock:
+            while self._synced < ticket:
+                if self._syncing:
+                    self._fsynced.wait()
+                    continue
+                self._syncing = True
+                written = self._written
+                file_number = self._file.fileno()
+                self._lock.release()
+                try:
+                    os.fsync(file_number)
+                finally:
+                    self._lock.acquire()
+                    self._syncing = False
+                    self._fsynced.notify_all()
+                self._synced = max(self._synced, written)
+
+    def sync(self):
+        """
+                Forces every record written so far to disk.
+        """
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced = self._written
+
+    def size(self) -> int:
+        """
+                Returns the size of the journal in bytes.
+        """
+        with self._lock:
+            return self._file.tell()
+
+    def compaction_due(self) -> bool:
+        """
+                Returns True if the journal has grown past its compaction threshold.
+        """
+        return self.compact_at is not None and self._store is not None and self.size() >= self.compact_at
+
+    def compact(self):
+        """
+                Saves the attached store to the snapshot file and empties the journal.
+
+                Orders are blocked while the snapshot is taken. If the process stops between
+                writing the snapshot and emptying the journal, replaying the old records over the
+                new snapshot gives the same stock, because records hold absolute quantities.
+        """
+        if self._store is None:
+            raise ValueError("The journal is not attached to a store.")
+        with self._store.locked_all():
+            save_snapshot(self._store, self.snapshot_path)
+            with self._lock:
+                self._file.truncate(0)
+                self._file.seek(0)
+                os.fsync(self._file.fileno())
+                # The snapshot holds every record written so far.
+                self._synced = self._written
+
+    def replay(self, store: Store) -> int:
+        """
+                Applies every complete record in the journal to the store, then cuts off any
+                incomplete record left at the end by a crash.
+
+                Args:
+                    store (Store): The store to update, usually loaded from the last snapshot.
+
+                Returns:
+                    int: The number of records applied.
+        """
+        with self._lock:
+            self._file.flush()
+            with open(self.path, "rb") as file:
+                data = file.read()
+            applied = 0
+            end = 0
+            for end, changes in read_records(data):
+                for name, quantity in changes:
+                    _apply_change(store, name, quantity)
+                applied += 1
+            if end < len(data):
+                self._file.truncate(end)
+                self._file.seek(end)
+                os.fsync(self._file.fileno())
+            return applied
+
+    def close(self):
+        """
+                Syncs and closes the journal.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._synced = self._written
+        if self._store is not None and self._store.journal is self:
+            self._store.journal = None
+
+
+def _apply_change(store: Store, name: str, quantity: int):
+    try:
+        product: Product = store.get_product(name)
+    except ValueError:
+        return
+    sold_out = product.get_quantity() == 0
+    product.set_quantity(quantity)
+    # Only Store.restock raises a sold-out product's stock, and it reactivates the product.
+    if sold_out and quantity > 0:
+        product.activate()
+
+
+def open_store(snapshot_path: str, journal_path: str, initial_products: Optional[List[Product]] = None,
+               **journal_options) -> Store:
+    """
+        Opens a durable store: loads the last snapshot, replays the journal over it, and
+        journals every order from then on.
+
+        Args:
+            snapshot_path (str): The snapshot file. If it does not exist, the store starts from initial_products.
+            journal_path (str): The journal file.
+            initial_products (List[Product], optional): The products of a brand new store.
+            **journal_options: compact_at, passed to OrderJournal.
+
+        Returns:
+            Store: The recovered store, with its journal attached.
+    """
+    if os.path.exists(snapshot_path):
+        store = load_snapshot(snapshot_path)
+    else:
+        store = Store(initial_products or [])
+        save_snapshot(store, snapshot_path)
+    journal = OrderJournal(journal_path, snapshot_path=snapshot_path, **journal_options)
+    journal.replay(store)
+    journal.attach(store)
+    return store
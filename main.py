@@ -1,24 +1,53 @@
+import sys
 from products import Product, NonStockedProduct, LimitedProduct, SecondHalfPrice, ThirdOneFree, PercentDiscount
+from render_cache import cache_for
+from reservations import reservations_for
 from store import Store
 
-product_list = [
-    Product("MacBook Air M2", price=1450, quantity=100),
-    Product("Bose QuietComfort Earbuds", price=250, quantity=500),
-    Product("Google Pixel 7", price=500, quantity=250),
-    NonStockedProduct("Windows License", price=125),
-    LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
-]
+PAGE_SIZE = 20
 
-second_half_price = SecondHalfPrice("Second Half price!")
-third_one_free = ThirdOneFree("Third One Free!")
-thirty_percent = PercentDiscount("30% off!", percent=30)
 
-product_list[0].set_promotion(second_half_price)
-product_list[1].set_promotion(third_one_free)
-product_list[3].set_promotion(thirty_percent)
+def load_store(catalog=None) -> Store:
+    """
+        Builds the store, from a catalog file if one is given, otherwise with the demo products.
+        A catalog file is read whole, so with a large catalog the first page waits for every
+        product to load.
+
+        Args:
+            catalog (str, optional): A snapshot file written by snapshot.save_snapshot, or a
+                CSV or JSON Lines catalog read by catalog_io.import_catalog.
 
+        Returns:
+            Store: The store.
+    """
+    if catalog is not None and catalog.lower().endswith((".csv", ".jsonl", ".ndjson")):
+        from catalog_io import import_catalog
+        store = Store([])
+        report = import_catalog(store, catalog)
+        for line, message in report.errors:
+            print(f"{catalog}:{line}: {message}")
+        if report.rejected > len(report.errors):
+            print(f"{catalog}: {report.rejected - len(report.errors)} more rows rejected.")
+        return store
+    if catalog is not None:
+        from snapshot import load_snapshot
+        return load_snapshot(catalog)
+    product_list = [
+        Product("MacBook Air M2", price=1450, quantity=100),
+        Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+        Product("Google Pixel 7", price=500, quantity=250),
+        NonStockedProduct("Windows License", price=125),
+        LimitedProduct("Shipping", price=10, quantity=250, maximum=1)
+    ]
 
-best_buy = Store(product_list)
+    second_half_price = SecondHalfPrice("Second Half price!")
+    third_one_free = ThirdOneFree("Third One Free!")
+    thirty_percent = PercentDiscount("30% off!", percent=30)
+
+    product_list[0].set_promotion(second_half_price)
+    product_list[1].set_promotion(third_one_free)
+    product_list[3].set_promotion(thirty_percent)
+    return Store(product_list)
 
 
 def print_store_menu():
@@ -32,6 +61,7 @@ def print_store_menu():
 2. Show total amount in store
 3. Make an order
 4. Quit
+5. Search products
     """
     print(store_menu)
 
@@ -46,12 +76,63 @@ def listing_all_products(store: Store):
         Returns:
             str: A string listing all products with their details.
     """
+    render_cache = cache_for(store)
+    if render_cache is not None:
+        return render_cache.listing()
     product_info = []
     for ids, product in enumerate(store.get_all_products(), start=1):
         product_info.append(f"{ids}. {product.show()}")
     return "\n".join(product_info)
 
 
+def show_product_pages(store: Store, page_size: int = PAGE_SIZE):
+    """
+        Prints the active products in the store one page at a time, asking before each further page,
+        so only the pages the user looks at are fetched.
+
+        Args:
+            store (Store): The store object containing products.
+            page_size (int): The number of products per page.
+
+        Returns:
+            List[Product]: The products printed, in the order they were numbered.
+    """
+    render_cache = cache_for(store)
+    render = render_cache.line if render_cache is not None else lambda product: product.show()
+    cursor = None
+    shown = []
+    while True:
+        page = store.get_page(limit=page_size, cursor=cursor)
+        for product in page.products:
+            shown.append(product)
+            print(f"{len(shown)}. {render(product)}")
+        if page.next_cursor is None:
+            return shown
+        if input("Press Enter for more products, or q to stop: ").strip().lower() == "q":
+            return shown
+        cursor = page.next_cursor
+
+
+def search_products(store: Store):
+    """
+        Asks for part of a product name and prints the matching products, falling back to a
+        fuzzy match when no name contains the text exactly.
+
+        Args:
+            store (Store): The store object containing products.
+    """
+    query = input("Search for: ").strip()
+    if not query:
+        return
+    matches = store.search(query) or store.search(query, mode="fuzzy")
+    print("------")
+    if not matches:
+        print("No products found.")
+    for product in matches:
+        print(product.show())
+    print("------")
+
+
 def show_total_amount(store: Store):
     """
         Displays the total quantity of all products available in the store.
@@ -65,19 +146,20 @@ def show_total_amount(store: Store):
 
 def make_order(store: Store):
     """
-        Allows the user to make an order by selecting products and quantities.
-        Displays the total price after the order is completed.
+        Allows the user to make an order by selecting products, by number or by name, and quantities.
+        Displays the total price after the order is completed. Products are listed a page at a
+        time, and numbers refer to the products on the pages shown.
 
         Args:
             store (Store): The store object containing products.
     """
-    enumerated_product = [(index, product) for index, product in
-                          enumerate(store.get_all_products(), start=1)]
     print("------")
-    for ids, product in enumerated_product:
-        print(f"{ids}. {product.show()}")
+    products = show_product_pages(store)
     print("------")
     print("When you want to finish order, enter empty text.")
+    # Each product is reserved as it is added, so it cannot sell out before checkout.
+    reservations = reservations_for(store)
+    cart = object()
     shopping_list = []
     while True:
         product_choice = input("Which product # do you want? ").strip()
@@ -86,23 +168,32 @@ def make_order(store: Store):
             break
         else:
             try:
-                product_choice = int(product_choice)
                 quantity = int(quantity)
-                if 0 < product_choice <= len(enumerated_product):
-                    selected_product = enumerated_product[product_choice - 1][1]
-                    shopping_list.append((selected_product, quantity))
-                    print("Product added to list!\n")
+                if product_choice.isdigit():
+                    product_choice = int(product_choice)
+                    if not 0 < product_choice <= len(products):
+                        raise ValueError("Unknown product number.")
+                    selected_product = products[product_choice - 1]
                 else:
-                    print("Error adding product!")
+                    selected_product = store.get_product(product_choice)
+                if reservations is not None:
+                    reservations.hold(cart, selected_product, quantity)
+                shopping_list.append((selected_product, quantity))
+                print("Product added to list!\n")
             except ValueError:
                 print("Error adding product!")
 
     if shopping_list:
         try:
-            total_price = store.order(shopping_list)
-            print(f"\nOrder made! Total payment: ${round(total_price, 2)} ")
+            if reservations is not None:
+                total_price = reservations.checkout(cart)
+            else:
+                total_price = store.order(shopping_list)
+            print(f"\nOrder made! Total payment: ${total_price:.2f} ")
         except ValueError as e:
             print(f"Order error: {e}")
+    if reservations is not None:
+        reservations.release(cart)
 
 
 def start(store: Store):
@@ -110,27 +201,76 @@ def start(store: Store):
         Starts the main loop of the store application, allowing the user to interact with the store menu.
 
         Args:
-            store (Store): The store object containing products.
+            store (Store or callable): The store object containing products, or a function returning it,
+                called when the user first picks an option, so the menu shows before the catalog is loaded.
     """
     while True:
         try:
             print_store_menu()
             user_choice = int(input("Please choose a number: "))
+            if user_choice == 4:
+                break
+            if callable(store):
+                store = store()
             if user_choice == 1:
                 print("------")
-                print(listing_all_products(store))
+                show_product_pages(store)
                 print("------")
             elif user_choice == 2:
                 show_total_amount(store)
             elif user_choice == 3:
                 make_order(store)
-            elif user_choice == 4:
-                break
+            elif user_choice == 5:
+                search_products(store)
             else:
                 continue
         except ValueError:
             print("Error with your choice! Try again!")
 
 
+def main(argv=None):
+    """
+        Runs the store from the command line: the interactive menu on the local store by default,
+        an order server with --serve, or the interactive menu as a client of a server with --connect.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        # The common case skips argparse, which costs more to import than the rest of the program.
+        start(load_store)
+        return
+    import argparse
+    parser = argparse.ArgumentParser(description="Best Buy store.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--serve", metavar="[HOST:]PORT", help="serve the store to remote clients")
+    group.add_argument("--connect", metavar="[HOST:]PORT", help="use the store of a running server")
+    parser.add_argument("--catalog", metavar="FILE", help="load the products from a snapshot, CSV or JSON Lines file")
+    parser.add_argument("--metrics", action="store_true",
+                        help="time orders and listings, and print the metrics on exit")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        import metrics
+        metrics.enable()
+        for name in ("listing_all_products", "show_product_pages", "search_products"):
+            metrics.instrument(sys.modules[__name__], name, f"{name}_seconds")
+    try:
+        if args.serve:
+            from server import parse_address, serve
+            serve(load_store(args.catalog), *parse_address(args.serve))
+        elif args.connect:
+            from server import parse_address, RemoteStore
+            remote_store = RemoteStore(*parse_address(args.connect))
+            try:
+                start(remote_store)
+            finally:
+                remote_store.close()
+        else:
+            start(lambda: load_store(args.catalog))
+    finally:
+        if args.metrics:
+            print(metrics.REGISTRY.export_text(), end="")
+            metrics.disable()
+
+
 if __name__ == "__main__":
-    start(best_buy)
+    main()
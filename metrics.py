@@ -0,0 +1,323 @@
+"""
+    Optional instrumentation of the store's hot paths.
+
+    Metrics are kept in a MetricsRegistry and exported as text, one sample per line:
+        store_order_seconds{quantile="0.99"} 0.000031
+        units_sold_total{sku="MacBook Air M2"} 12
+
+    Instrumentation is off by default and then costs nothing: enable() replaces Store.order,
+    Store.process_orders, Product.buy and Product.get_price_cents with timing wrappers, and
+    disable() puts the original methods back. Other functions, such as the listings of the
+    menu, can be timed with instrument().
+"""
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from products import Product
+from store import Store
+
+
+class Counter:
+    """
+        A count of events, optionally split by the value of one label.
+
+        Methods:
+            inc(amount=1, label=None): Adds to the count of a label value.
+            value(label=None) -> int: Returns the count of a label value.
+    """
+
+    def __init__(self, name: str, help_text: str = "", label: Optional[str] = None):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._counts: Dict[Optional[str], int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1, label: Optional[str] = None):
+        with self._lock:
+            self._counts[label] = self._counts.get(label, 0) + amount
+
+    def value(self, label: Optional[str] = None) -> int:
+        return self._counts.get(label, 0)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            counts = sorted(self._counts.items(), key=lambda item: "" if item[0] is None else item[0])
+        if self.label is None:
+            return [(self.name, counts[0][1] if counts else 0)]
+        return [(f'{self.name}{{{self.label}="{_escape(label)}"}}', count) for label, count in counts]
+
+
+class Histogram:
+    """
+        A distribution of durations in nanoseconds, kept in log-spaced buckets.
+
+        Each power of two is split into eight buckets, so a quantile is accurate to within
+        about 6% whatever the range of values, in constant memory and constant time per value.
+
+        Methods:
+            record(nanoseconds): Adds a value.
+            quantile(q) -> float: Returns an estimate of the q-quantile, in nanoseconds.
+    """
+
+    def __init__(self, name: str, help_text: str = ""):
+        self.name = name
+        self.help_text = help_text
+        self.count = 0
+        self.sum = 0
+        self.min = 0
+        self.max = 0
+        self._buckets: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, nanoseconds: int):
+        if nanoseconds < 8:
+            bucket = max(nanoseconds, 0)
+        else:
+            shift = nanoseconds.bit_length() - 4
+            bucket = (shift << 3) + (nanoseconds >> shift)
+        with self._lock:
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+            if not self.count or nanoseconds < self.min:
+                self.min = nanoseconds
+            if nanoseconds > self.max:
+                self.max = nanoseconds
+            self.count += 1
+            self.sum += nanoseconds
+
+    def quantile(self, q: float) -> float:
+        """
+                Returns an estimate of the value below which a share q of the values fall.
+
+                Args:
+                    q (float): The share, between 0 and 1.
+
+                Returns:
+                    float: The middle of the bucket holding that value, in nanoseconds; 0 if empty.
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, round(q * self.count))
+            seen = 0
+            for bucket in sorted(self._buckets):
+                seen += self._buckets[bucket]
+                if seen >= rank:
+                    break
+            low, high = _bucket_bounds(bucket)
+            return min(max((low + high) / 2, self.min), self.max)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        return [(f'{self.name}{{quantile="0.5"}}', self.quantile(0.5) / 1e9),
+                (f'{self.name}{{quantile="0.99"}}', self.quantile(0.99) / 1e9),
+                (f"{self.name}_sum", self.sum / 1e9),
+                (f"{self.name}_count", self.count)]
+
+
+def _bucket_bounds(bucket: int) -> Tuple[int, int]:
+    if bucket < 8:
+        return bucket, bucket
+    shift, mantissa = (bucket >> 3) - 1, 8 + (bucket & 7)
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+        The counters and histograms of a process, by name.
+
+        Methods:
+            counter(name, help_text, label) -> Counter: Returns the counter with that name, creating it.
+            histogram(name, help_text) -> Histogram: Returns the histogram with that name, creating it.
+            export_text() -> str: Returns every metric in text form.
+            reset(): Forgets every metric.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = kind(name, *args)
+            elif not isinstance(metric, kind):
+                raise ValueError(f"Metric '{name}' is not a {kind.__name__.lower()}.")
+            return metric
+
+    def counter(self, name: str, help_text: str = "", label: Optional[str] = None) -> Counter:
+        return self._get(Counter, name, help_text, label)
+
+    def histogram(self, name: str, help_text: str = "") -> Histogram:
+        return self._get(Histogram, name, help_text)
+
+    def export_text(self) -> str:
+        """
+                Returns every metric as "# HELP" and "# TYPE" comments followed by one
+                "name value" line per sample, sorted by metric name.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            kind = "counter" if isinstance(metric, Counter) else "summary"
+            if metric.help_text:
+                lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample} {value if isinstance(value, int) else format(value, '.9g')}"
+                         for sample, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+_originals: List[Tuple[object, str, Callable]] = []
+_enabled = False
+_perf_counter_ns = time.perf_counter_ns
+
+
+def is_enabled() -> bool:
+    """
+        Returns True if the store's hot paths are instrumented.
+    """
+    return _enabled
+
+
+def instrument(owner, attribute: str, histogram_name: str, registry: MetricsRegistry = REGISTRY):
+    """
+        Replaces a function of a class or module with a wrapper recording its duration, until disable().
+
+        Args:
+            owner: The class or module holding the function.
+            attribute (str): The name of the function.
+            histogram_name (str): The histogram the durations are recorded in.
+            registry (MetricsRegistry): The registry holding the histogram.
+    """
+    function = getattr(owner, attribute)
+    histogram = registry.histogram(histogram_name, f"Duration of {attribute}.")
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = _perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.record(_perf_counter_ns() - start)
+    _replace(owner, attribute, timed)
+
+
+def _replace(owner, attribute: str, wrapper: Callable):
+    _originals.append((owner, attribute, owner.__dict__[attribute]))
+    setattr(owner, attribute, wrapper)
+
+
+def enable(registry: MetricsRegistry = REGISTRY):
+    """
+        Instruments Store.order, Store.process_orders, Product.buy and Product.get_price_cents.
+
+        Records their durations, the number of accepted and rejected orders, the number of sold
+        lines priced with each promotion, and the units sold of each product. Quotes and other
+        pricing that sells nothing are timed but not counted.
+        Does nothing if instrumentation is already enabled.
+    """
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    perf_counter_ns = _perf_counter_ns
+    orders = registry.counter("orders_total", "Orders accepted.")
+    rejected = registry.counter("orders_rejected_total", "Orders that could not be filled.")
+    sold = registry.counter("units_sold_total", "Units sold, by product.", label="sku")
+    promotion_hits = registry.counter("promotion_hits_total", "Sold lines priced with a promotion.",
+                                      label="promotion")
+    order_latency = registry.histogram("store_order_seconds", "Duration of Store.order.")
+    batch_latency = registry.histogram("store_process_orders_seconds", "Duration of Store.process_orders.")
+    buy_latency = registry.histogram("product_buy_seconds", "Duration of Product.buy.")
+    promotion_latency = registry.histogram("promotion_apply_seconds", "Duration of pricing a line with a promotion.")
+
+    order = Store.order
+    process_orders = Store.process_orders
+    buy = Product.buy
+    get_price_cents = Product.get_price_cents
+
+    def count_sale(shopping_list):
+        orders.inc()
+        for product, quantity in shopping_list:
+            sold.inc(quantity, product.name)
+            if product.promotion is not None:
+                promotion_hits.inc(1, product.promotion.name)
+
+    @functools.wraps(order)
+    def timed_order(self, shopping_list, held=None):
+        start = perf_counter_ns()
+        try:
+            total_price = order(self, shopping_list, held)
+        except ValueError:
+            rejected.inc()
+            raise
+        finally:
+            order_latency.record(perf_counter_ns() - start)
+        count_sale(shopping_list)
+        return total_price
+
+    @functools.wraps(process_orders)
+    def timed_process_orders(self, batch, priority=None):
+        start = perf_counter_ns()
+        try:
+            results = process_orders(self, batch, priority)
+        finally:
+            batch_latency.record(perf_counter_ns() - start)
+        for shopping_list, result in zip(batch, results):
+            if result.error is not None:
+                rejected.inc()
+            else:
+                count_sale(shopping_list)
+        return results
+
+    @functools.wraps(buy)
+    def timed_buy(self, quantity):
+        start = perf_counter_ns()
+        try:
+            total_price = buy(self, quantity)
+        finally:
+            buy_latency.record(perf_counter_ns() - start)
+        sold.inc(quantity, self.name)
+        if self.promotion is not None:
+            promotion_hits.inc(1, self.promotion.name)
+        return total_price
+
+    @functools.wraps(get_price_cents)
+    def timed_get_price_cents(self, quantity):
+        if self.promotion is None:
+            return get_price_cents(self, quantity)
+        start = perf_counter_ns()
+        try:
+            return get_price_cents(self, quantity)
+        finally:
+            promotion_latency.record(perf_counter_ns() - start)
+
+    _replace(Store, "order", timed_order)
+    _replace(Store, "process_orders", timed_process_orders)
+    _replace(Product, "buy", timed_buy)
+    _replace(Product, "get_price_cents", timed_get_price_cents)
+
+
+def disable():
+    """
+        Restores every function replaced by enable() or instrument(). The recorded metrics are kept.
+    """
+    global _enabled
+    _enabled = False
+    while _originals:
+        owner, attribute, original = _originals.pop()
+        setattr(owner, attribute, original)
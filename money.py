@@ -0,0 +1,82 @@
+"""
+    Money as integer cents.
+
+    Prices and totals are kept as whole numbers of cents, so adding up any number of
+    orders is exact. Where a promotion produces a fraction of a cent, it is rounded half
+    up, once, on the total of the line: never per item.
+"""
+
+
+def to_cents(amount) -> int:
+    """
+        Converts an amount of money to whole cents, rounding half a cent up.
+
+        Args:
+            amount (int, float, str or Decimal): The amount, in currency units. Floats are
+                read by their shortest decimal form, so 249.99 becomes 24999 cents.
+
+        Returns:
+            int: The amount in cents.
+    """
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float):
+        # Unless the amount is close to half a cent, the nearest whole cent is unambiguous.
+        scaled = amount * 100
+        cents = round(scaled)
+        if abs(scaled - cents) < 0.49:
+            return cents
+    # decimal is only imported when needed, since it slows down startup.
+    from decimal import Decimal, ROUND_HALF_UP
+    return int((Decimal(repr(amount) if isinstance(amount, float) else amount) * 100)
+               .quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> float:
+    """
+        Converts cents to currency units, as the nearest float.
+    """
+    return cents / 100
+
+
+def format_cents(cents: int) -> str:
+    """
+        Formats cents as a currency amount with two decimals, such as "1450.00".
+    """
+    sign = "-" if cents < 0 else ""
+    whole, fraction = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{fraction:02d}"
+
+
+def divide_half_up(numerator: int, denominator: int) -> int:
+    """
+        Divides two non-negative integers, rounding half up.
+    """
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def to_basis_points(percent) -> int:
+    """
+        Converts a percentage to hundredths of a percent, so that 12.5 becomes 1250.
+
+        Raises:
+            ValueError: If the percentage is finer than a hundredth of a percent.
+    """
+    basis_points = to_cents(percent)
+    if isinstance(percent, int):
+        return basis_points
+    from decimal import Decimal
+    if Decimal(basis_points) != Decimal(repr(percent) if isinstance(percent, float) else percent) * 100:
+        raise ValueError("Percent cannot be finer than a hundredth of a percent.")
+    return basis_points
+
+
+def percent_off(cents: int, basis_points: int) -> int:
+    """
+        Returns an amount after a discount, rounding half a cent up.
+
+        Args:
+            cents (int): The amount before the discount.
+            basis_points (int): The discount, in hundredths of a percent.
+    """
+    return divide_half_up(cents * (10_000 - basis_points), 10_000)
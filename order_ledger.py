@@ -0,0 +1,389 @@
+"""
+    Order history with sales rollups.
+
+    An OrderLedger attached to a store records every line of every accepted order: when it
+    was sold, the order it belongs to, the product, the quantity, its list price, the price
+    charged and the promotion applied. Lines are appended to columnar segments of typed
+    arrays. The open segment keeps running totals of units, revenue and discount per product
+    and per promotion as lines are appended; when it is full, they are added to the totals of
+    every earlier segment and kept as one column per total, indexed by product or promotion.
+    A query over a time window then subtracts the totals before its first segment from the
+    totals through its last, and only scans the rows of the one or two segments at its edges.
+
+    Full segments are written to disk with their totals, oldest first, once more than
+    memory_segments of them are held. Their rows are read back only when a query window cuts
+    through them, and their totals only when a window starts or ends at them, so memory holds
+    the rows and totals of at most memory_segments segments however long the ledger runs.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from collections import namedtuple
+from collections.abc import Callable, Sequence
+
+from money import from_cents
+from products import Product
+from store import Store
+
+# Column name and array type code, in the order they are written to disk.
+COLUMNS = (("time", "d"), ("order", "q"), ("sku", "i"), ("quantity", "q"), ("list_cents", "q"),
+           ("charged_cents", "q"), ("promotion", "i"))
+SEGMENT_HEADER = struct.Struct("<QQQ")  # row count, then the number of totals of each rollup
+ROLLUPS = ("by_sku", "by_promotion")
+PENDING_ROWS = 1024
+NO_PROMOTION = 0
+
+
+class SalesSummary(namedtuple("SalesSummary", ["units", "revenue", "discount"])):
+    """
+        The sales of a product or promotion over a time window.
+
+        Attributes:
+            units (int): The units sold.
+            revenue (float): The amount charged for them.
+            discount (float): The amount taken off their list price by promotions and bundles.
+    """
+    __slots__ = ()
+
+
+class _Segment:
+    """
+        A run of ledger rows, held as one array per column or spilled to a file, with its rollups.
+    """
+    __slots__ = ("columns", "path", "rows", "first_time", "last_time", "by_sku", "by_promotion", "cumulative")
+
+    def __init__(self):
+        self.columns: dict[str, array] | None = {name: array(code) for name, code in COLUMNS}
+        self.path: str | None = None
+        self.rows = 0
+        self.first_time = float("inf")
+        self.last_time = float("-inf")
+        # Units, charged cents and list cents, by product or promotion id, while the segment is open.
+        self.by_sku: dict[int, list[int]] | None = {}
+        self.by_promotion: dict[int, list[int]] | None = {}
+        # Once sealed, the same totals over this segment and every earlier one, as columns by id,
+        # until they are written to disk with the rows.
+        self.cumulative: dict[str, tuple[array, array, array]] | None = None
+
+    def spill(self, path: str):
+        with open(path, "wb") as file:
+            file.write(SEGMENT_HEADER.pack(self.rows, *(len(self.cumulative[rollup][0]) for rollup in ROLLUPS)))
+            for name, _ in COLUMNS:
+                self.columns[name].tofile(file)
+            for rollup in ROLLUPS:
+                for column in self.cumulative[rollup]:
+                    column.tofile(file)
+        self.path = path
+        self.columns = None
+        self.cumulative = None
+
+    def read_columns(self) -> dict[str, array]:
+        if self.columns is not None:
+            return self.columns
+        with open(self.path, "rb") as file:
+            data = file.read()
+        rows, _, _ = SEGMENT_HEADER.unpack_from(data)
+        offset = SEGMENT_HEADER.size
+        columns = {}
+        for name, code in COLUMNS:
+            column = array(code)
+            size = rows * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+            columns[name] = column
+        return columns
+
+    def read_cumulative(self, rollup: str) -> tuple[array, array, array]:
+        if self.cumulative is not None:
+            return self.cumulative[rollup]
+        with open(self.path, "rb") as file:
+            rows, *sizes = SEGMENT_HEADER.unpack(file.read(SEGMENT_HEADER.size))
+            offset = SEGMENT_HEADER.size + rows * sum(array(code).itemsize for _, code in COLUMNS)
+            for name, size in zip(ROLLUPS, sizes):
+                if name == rollup:
+                    break
+                offset += 3 * size * array("q").itemsize
+            file.seek(offset)
+            columns = (array("q"), array("q"), array("q"))
+            for column in columns:
+                column.fromfile(file, size)
+        return columns
+
+
+def _add(totals: dict[int, list[int]], key: int, units: int, charged_cents: int, list_cents: int):
+    total = totals.get(key)
+    if total is None:
+        totals[key] = [units, charged_cents, list_cents]
+    else:
+        total[0] += units
+        total[1] += charged_cents
+        total[2] += list_cents
+
+
+class OrderLedger:
+    """
+        An append-only history of the lines of a store's orders, with sales queries.
+
+        Attributes:
+            segment_rows (int): The number of rows per segment.
+            memory_segments (int): The number of segments kept in memory; older ones are written to disk.
+            directory (str): The directory holding the segments written to disk.
+
+        Methods:
+            attach(store): Starts recording the orders of a store.
+            record(lines): Appends the lines of one order.
+            sales_by_sku(start, end) -> Dict[str, SalesSummary]: Sums the sales of each product.
+            sales_by_promotion(start, end) -> Dict[str, SalesSummary]: Sums the sales made under each promotion.
+            top_sellers(n, start, end, by) -> List[Tuple[str, SalesSummary]]: Returns the best selling products.
+            close(): Deletes the segments written to disk.
+    """
+
+    def __init__(self, directory: str | None = None, segment_rows: int = 65_536, memory_segments: int = 4,
+                 clock: Callable[[], float] = time.time):
+        if segment_rows <= 0:
+            raise ValueError("Segment rows must be greater than zero.")
+        if memory_segments <= 0:
+            raise ValueError("At least one segment must be kept in memory.")
+        self.segment_rows = segment_rows
+        self.memory_segments = memory_segments
+        self._owns_directory = directory is None
+        self.directory = tempfile.mkdtemp(prefix="ledger-") if directory is None else directory
+        self._clock = clock
+        self._segments: list[_Segment] = [_Segment()]
+        # Rows recorded but not yet moved into columns, which is done in batches.
+        self._pending: list[tuple] = []
+        self._spilled = 0
+        self._orders = 0
+        self._sku_ids: dict[str, int] = {}
+        self._skus: list[str] = []
+        self._promotion_ids: dict[str, int] = {}
+        self._promotions: list[str | None] = [None]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(segment.rows for segment in self._segments) + len(self._pending)
+
+    def attach(self, store: Store):
+        """
+                Starts recording the orders a store accepts, including reservation checkouts.
+
+                Args:
+                    store (Store): The store to record.
+        """
+        store.ledger = self
+
+    def record(self, lines: Sequence[tuple[Product, int, int]]):
+        """
+                Appends the lines of one order.
+
+                Args:
+                    lines (Sequence[Tuple[Product, int, int]]): Each line's product, quantity and the price
+                        charged for it in cents, including its share of any bundle discount.
+        """
+        now = self._clock()
+        with self._lock:
+            order = self._orders
+            self._orders += 1
+            append = self._pending.append
+            for product, quantity, charged_cents in lines:
+                sku = self._sku_ids.get(product.name)
+                if sku is None:
+                    sku = self._sku_ids[product.name] = len(self._skus)
+                    self._skus.append(product.name)
+                promotion = NO_PROMOTION
+                if product.promotion is not None:
+                    promotion = self._promotion_ids.get(product.promotion.name)
+                    if promotion is None:
+                        promotion = self._promotion_ids[product.promotion.name] = len(self._promotions)
+                        self._promotions.append(product.promotion.name)
+                append((now, order, sku, quantity, product.price_cents * quantity, charged_cents, promotion))
+            if len(self._pending) >= PENDING_ROWS:
+                self._flush()
+
+    def _flush(self):
+        """
+                Moves the pending rows into the columns and totals of the open segment, sealing it
+                whenever it is full. The lock must be held.
+        """
+        pending = self._pending
+        self._pending = []
+        while pending:
+            segment = self._segments[-1]
+            if segment.rows >= self.segment_rows:
+                segment = self._seal()
+            room = self.segment_rows - segment.rows
+            rows, pending = pending[:room], pending[room:]
+            values = list(zip(*rows))
+            for (name, _), column in zip(COLUMNS, values):
+                segment.columns[name].extend(column)
+            segment.rows += len(rows)
+            segment.first_time = min(segment.first_time, min(values[0]))
+            segment.last_time = max(segment.last_time, max(values[0]))
+            by_sku, by_promotion = segment.by_sku, segment.by_promotion
+            for _, _, sku, quantity, list_cents, charged_cents, promotion in rows:
+                _add(by_sku, sku, quantity, charged_cents, list_cents)
+                _add(by_promotion, promotion, quantity, charged_cents, list_cents)
+
+    def _seal(self) -> _Segment:
+        """
+                Starts a new segment, writing the oldest one held in memory to disk if there are too many.
+        """
+        full = self._segments[-1]
+        previous = self._segments[-2] if len(self._segments) > 1 else None
+        full.cumulative = {}
+        for rollup in ROLLUPS:
+            size = len(self._skus) if rollup == "by_sku" else len(self._promotions)
+            if previous is None:
+                columns = (array("q"), array("q"), array("q"))
+            else:
+                columns = tuple(array("q", column) for column in previous.read_cumulative(rollup))
+            for column in columns:
+                column.extend(array("q", [0]) * (size - len(column)))
+            for key, total in getattr(full, rollup).items():
+                for field in range(3):
+                    columns[field][key] += total[field]
+            full.cumulative[rollup] = columns
+        full.by_sku = full.by_promotion = None
+        segment = _Segment()
+        self._segments.append(segment)
+        if len(self._segments) - self._spilled > self.memory_segments:
+            self._segments[self._spilled].spill(os.path.join(self.directory, f"segment-{self._spilled:06d}.bin"))
+            self._spilled += 1
+        return segment
+
+    def _totals(self, rollup: str, column: str, start: float | None, end: float | None) -> dict[int, list[int]]:
+        """
+                Adds up units, charged and list cents by the ids of a column, over the rows sold
+                from start, included, to end, excluded.
+        """
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        totals: dict[int, list[int]] = {}
+        with self._lock:
+            self._flush()
+            segments = self._segments
+            # Runs of sealed segments inside the window are added up from the cumulative totals.
+            run_start = None
+            for index, segment in enumerate(segments):
+                sealed = segment.by_sku is None
+                inside = segment.rows and start <= segment.first_time and segment.last_time < end
+                if sealed and inside:
+                    if run_start is None:
+                        run_start = index
+                    continue
+                if run_start is not None:
+                    self._add_run(totals, rollup, run_start, index - 1)
+                    run_start = None
+                if not segment.rows or segment.last_time < start or segment.first_time >= end:
+                    continue
+                if inside:
+                    for key, (units, charged_cents, list_cents) in getattr(segment, rollup).items():
+                        _add(totals, key, units, charged_cents, list_cents)
+                    continue
+                columns = segment.read_columns()
+                for sold, key, units, charged_cents, list_cents in zip(
+                        columns["time"], columns[column], columns["quantity"], columns["charged_cents"],
+                        columns["list_cents"]):
+                    if start <= sold < end:
+                        _add(totals, key, units, charged_cents, list_cents)
+            if run_start is not None:
+                self._add_run(totals, rollup, run_start, len(segments) - 1)
+        return totals
+
+    def _add_run(self, totals: dict[int, list[int]], rollup: str, first: int, last: int):
+        """
+                Adds the totals of the sealed segments first to last, inclusive, to totals.
+        """
+        upper = self._segments[last].read_cumulative(rollup)
+        lower = self._segments[first - 1].read_cumulative(rollup) if first else None
+        size = len(upper[0])
+        if lower is None:
+            lower = (array("q", [0]) * size,) * 3
+        elif len(lower[0]) < size:
+            lower = tuple(column + array("q", [0]) * (size - len(column)) for column in lower)
+        for key, units, charged_cents, list_cents, units_before, charged_before, list_before in zip(
+                range(size), *upper, *lower):
+            if units != units_before or charged_cents != charged_before or list_cents != list_before:
+                _add(totals, key, units - units_before, charged_cents - charged_before, list_cents - list_before)
+
+    @staticmethod
+    def _summary(total: list[int]) -> SalesSummary:
+        units, charged_cents, list_cents = total
+        return SalesSummary(units, from_cents(charged_cents), from_cents(list_cents - charged_cents))
+
+    def sales_by_sku(self, start: float | None = None, end: float | None = None) -> dict[str, SalesSummary]:
+        """
+                Returns the sales of each product over a time window.
+
+                Args:
+                    start (float, optional): The start of the window, included, on the ledger's clock.
+                    end (float, optional): The end of the window, excluded.
+
+                Returns:
+                    Dict[str, SalesSummary]: The units, revenue and discount of each product sold, by name.
+        """
+        return {self._skus[sku]: self._summary(total)
+                for sku, total in self._totals("by_sku", "sku", start, end).items()}
+
+    def sales_by_promotion(self, start: float | None = None, end: float | None = None
+                           ) -> dict[str | None, SalesSummary]:
+        """
+                Returns the sales made under each promotion over a time window, to compare how well
+                promotions sell. Lines sold without a promotion are under None.
+
+                Args:
+                    start (float, optional): The start of the window, included, on the ledger's clock.
+                    end (float, optional): The end of the window, excluded.
+
+                Returns:
+                    Dict[str, SalesSummary]: The units, revenue and discount of each promotion, by name.
+        """
+        return {self._promotions[promotion]: self._summary(total)
+                for promotion, total in self._totals("by_promotion", "promotion", start, end).items()}
+
+    def top_sellers(self, n: int = 10, start: float | None = None, end: float | None = None,
+                    by: str = "units") -> list[tuple[str, SalesSummary]]:
+        """
+                Returns the products that sold the most over a time window.
+
+                Args:
+                    n (int): The number of products to return.
+                    start (float, optional): The start of the window, included, on the ledger's clock.
+                    end (float, optional): The end of the window, excluded.
+                    by (str): "units" or "revenue".
+
+                Returns:
+                    List[Tuple[str, SalesSummary]]: The names and sales of the products, best first.
+
+                Raises:
+                    ValueError: If by is invalid.
+        """
+        if by not in ("units", "revenue"):
+            raise ValueError(f"Cannot rank products by {by!r}.")
+        field = 0 if by == "units" else 1
+        totals = self._totals("by_sku", "sku", start, end)
+        best = heapq.nsmallest(n, totals.items(), key=lambda item: (-item[1][field], item[0]))
+        return [(self._skus[sku], self._summary(total)) for sku, total in best]
+
+    def close(self):
+        """
+                Deletes the segments written to disk, and their directory if the ledger created it,
+                and empties the ledger.
+        """
+        with self._lock:
+            for segment in self._segments[:self._spilled]:
+                if os.path.exists(segment.path):
+                    os.remove(segment.path)
+            self._segments = [_Segment()]
+            self._pending = []
+            self._spilled = 0
+            if self._owns_directory:
+                shutil.rmtree(self.directory, ignore_errors=True)
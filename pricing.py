@@ -0,0 +1,146 @@
+"""
+    Batch pricing of promotions over NumPy arrays.
+
+    Each promotion class has a vectorized counterpart that prices whole arrays of
+    (price, quantity) pairs in one pass and gives exactly the same results as calling
+    its apply_promotion_cents once per pair. Prices and totals are int64 cents; a batch
+    whose arithmetic could overflow int64 is priced with Python integers instead, which
+    are exact at any size but slower. NumPy is only needed by this module.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from products import Product, Promotion, SecondHalfPrice, ThirdOneFree, PercentDiscount
+
+VectorizedPromotion = Callable[[Promotion, np.ndarray, np.ndarray], np.ndarray]
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+_vectorized: Dict[Type[Promotion], Tuple[VectorizedPromotion, int]] = {}
+
+
+def register_vectorized(promotion_class: Type[Promotion], headroom: int = 1):
+    """
+        Decorator registering the vectorized counterpart of a promotion class.
+
+        Args:
+            promotion_class (Type[Promotion]): The promotion class the function prices.
+            headroom (int): How many times price * quantity the function's largest intermediate
+                value can be, which tells when int64 arithmetic could overflow.
+    """
+    def decorator(function: VectorizedPromotion) -> VectorizedPromotion:
+        _vectorized[promotion_class] = (function, headroom)
+        return function
+    return decorator
+
+
+def _list_price(promotion: None, prices: np.ndarray, quantities: np.ndarray) -> np.ndarray:
+    return prices * quantities
+
+
+@register_vectorized(SecondHalfPrice, headroom=2)
+def _second_half_price(promotion: SecondHalfPrice, prices: np.ndarray, quantities: np.ndarray) -> np.ndarray:
+    full_price_items = quantities // 2
+    half_price_items = quantities - full_price_items
+    discounted = (full_price_items * prices) + (half_price_items * prices + 1) // 2
+    return np.where(quantities <= 1, prices * quantities, discounted)
+
+
+@register_vectorized(ThirdOneFree)
+def _third_one_free(promotion: ThirdOneFree, prices: np.ndarray, quantities: np.ndarray) -> np.ndarray:
+    paid_items = quantities - quantities // 3
+    return np.where(quantities <= 2, prices * quantities, paid_items * prices)
+
+
+@register_vectorized(PercentDiscount, headroom=20_001)
+def _percent_discount(promotion: PercentDiscount, prices: np.ndarray, quantities: np.ndarray) -> np.ndarray:
+    # Half up division, as money.percent_off.
+    return (2 * prices * quantities * (10_000 - promotion.basis_points) + 10_000) // 20_000
+
+
+def price_batch(promotion: Optional[Promotion], prices: Sequence[int], quantities: Sequence[int]) -> np.ndarray:
+    """
+        Prices many (price, quantity) pairs under a single promotion.
+
+        Args:
+            promotion (Promotion, optional): The promotion to apply, or None for list price.
+            prices (Sequence[int]): Unit prices in cents.
+            quantities (Sequence[int]): Quantities, one per price.
+
+        Returns:
+            np.ndarray: The total price of each pair in cents, as int64, or as Python integers
+                (dtype object) if the batch could overflow int64.
+
+        Raises:
+            ValueError: If the arrays differ in length or the promotion has no vectorized counterpart.
+    """
+    prices = _as_cents(prices)
+    quantities = _as_cents(quantities)
+    if prices.shape != quantities.shape:
+        raise ValueError("Prices and quantities must have the same length.")
+    if promotion is None:
+        function, headroom = _list_price, 1
+    else:
+        for promotion_class in type(promotion).__mro__:
+            if promotion_class in _vectorized:
+                function, headroom = _vectorized[promotion_class]
+                break
+        else:
+            raise ValueError(f"No vectorized pricing for {type(promotion).__name__}.")
+    if prices.size and prices.dtype != object and quantities.dtype != object:
+        bound = _magnitude(prices) * _magnitude(quantities) * headroom
+        if bound > _INT64_MAX:
+            prices, quantities = prices.astype(object), quantities.astype(object)
+    elif prices.dtype != quantities.dtype:
+        prices, quantities = prices.astype(object), quantities.astype(object)
+    return function(promotion, prices, quantities)
+
+
+def _magnitude(values: np.ndarray) -> int:
+    # The largest absolute value, without the temporary array of np.abs.
+    return max(int(values.max()), -int(values.min()))
+
+
+def _as_cents(values: Sequence[int]) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.int64)
+    except OverflowError:
+        # Too large for int64 already.
+        return np.asarray(values, dtype=object)
+
+
+def price_products(products: Sequence[Product], quantities: Sequence[int]) -> np.ndarray:
+    """
+        Prices each product at the given quantity with its own promotion, grouping
+        products by promotion so each group is priced in a single vectorized call.
+
+        Args:
+            products (Sequence[Product]): The products to price.
+            quantities (Sequence[int]): The quantity of each product.
+
+        Returns:
+            np.ndarray: The total price of each product in cents, in input order.
+    """
+    quantities = _as_cents(quantities)
+    if len(products) != len(quantities):
+        raise ValueError("Products and quantities must have the same length.")
+    try:
+        prices = np.fromiter((product.price_cents for product in products), dtype=np.int64, count=len(products))
+    except OverflowError:
+        prices = np.asarray([product.price_cents for product in products], dtype=object)
+    groups: Dict[int, List[int]] = {}
+    promotions: Dict[int, Optional[Promotion]] = {}
+    for index, product in enumerate(products):
+        key = id(product.promotion)
+        groups.setdefault(key, []).append(index)
+        promotions[key] = product.promotion
+    results = []
+    for key, indices in groups.items():
+        indices = np.asarray(indices)
+        results.append((indices, price_batch(promotions[key], prices[indices], quantities[indices])))
+    # Python integers if any group needed them.
+    totals = np.empty(len(products), dtype=np.result_type(np.int64, *(group for _, group in results)))
+    for indices, group_totals in results:
+        totals[indices] = group_totals
+    return totals
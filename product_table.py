@@ -0,0 +1,126 @@
+from array import array
+from typing import Dict, Iterator, List
+
+from money import to_cents
+from products import Product, check_product_details
+
+
+class ProductTable:
+    """
+        Columnar storage for a large number of products.
+
+        Prices, quantities and active flags are kept in typed arrays, one row per product,
+        instead of in one Python object per product. Rows are read and changed through
+        ProductRow views, which behave like Product and can be added to a Store. Each row has at
+        most one view, made when the row is first read, so every reader sees the same promotion
+        and listeners.
+
+        Attributes:
+            names (List[str]): The name of each row.
+            prices (array): The price of each row in cents, as 64-bit integers.
+            quantities (array): The quantity of each row, as 64-bit integers.
+            active (bytearray): 1 if the row is active, 0 otherwise.
+
+        Methods:
+            append(name, price, quantity) -> ProductRow: Adds a row and returns a view of it.
+            row(index) -> ProductRow: Returns the view of an existing row.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.prices = array("q")
+        self.quantities = array("q")
+        self.active = bytearray()
+        self._views: Dict[int, ProductRow] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator["ProductRow"]:
+        return (self.row(index) for index in range(len(self.names)))
+
+    def append(self, name: str, price: float, quantity: int) -> "ProductRow":
+        """
+                Adds a product row to the table.
+
+                Args:
+                    name (str): The name of the product. Must not be empty.
+                    price (float): The price of the product. Must not be negative.
+                    quantity (int): The initial quantity of the product. Must not be negative.
+
+                Returns:
+                    ProductRow: The view of the new row.
+
+                Raises:
+                    ValueError: If name is empty, or if price or quantity are negative.
+        """
+        check_product_details(name, price, quantity)
+        self.names.append(name)
+        self.prices.append(to_cents(price))
+        self.quantities.append(quantity)
+        self.active.append(1)
+        return self.row(len(self.names) - 1)
+
+    def row(self, index: int) -> "ProductRow":
+        """
+                Returns the view of an existing row, made on the first call for the row.
+
+                Args:
+                    index (int): The row number.
+
+                Returns:
+                    ProductRow: The view of the row; the same object on every call.
+        """
+        view = self._views.get(index)
+        if view is None:
+            if not 0 <= index < len(self.names):
+                raise IndexError("Row index out of range.")
+            view = self._views[index] = ProductRow(self, index)
+        return view
+
+
+class ProductRow(Product):
+    """
+        A Product whose name, price, quantity and active flag live in a row of a ProductTable.
+
+        Only the promotion, holds and listeners are stored on the view itself, so a view holds no
+        copy of the row's data. Views are made by ProductTable.row, which keeps one per row: a
+        second view of the same row would not share them. A view is only made for the rows that
+        are read, and one for every row takes more memory than a plain Product.
+    """
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: ProductTable, row: int):
+        self._table = table
+        self._row = row
+        self._held = 0
+        self.promotion = None
+        self._listeners = ()
+
+    @property
+    def name(self) -> str:
+        return self._table.names[self._row]
+
+    @property
+    def _price(self) -> int:
+        return self._table.prices[self._row]
+
+    @_price.setter
+    def _price(self, cents: int):
+        self._table.prices[self._row] = cents
+
+    @property
+    def _quantity(self) -> int:
+        return self._table.quantities[self._row]
+
+    @_quantity.setter
+    def _quantity(self, quantity: int):
+        self._table.quantities[self._row] = quantity
+
+    @property
+    def active(self) -> bool:
+        return bool(self._table.active[self._row])
+
+    @active.setter
+    def active(self, active: bool):
+        self._table.active[self._row] = active
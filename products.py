@@ -1,4 +1,23 @@
 from abc import ABC, abstractmethod
+from operator import attrgetter
+from types import MemberDescriptorType
+
+from money import divide_half_up, format_cents, from_cents, percent_off, to_basis_points, to_cents
+
+
+def check_product_details(name, price, quantity):
+    """
+        Validates the details of a new product.
+
+        Raises:
+            ValueError: If name is empty, or if price or quantity are negative.
+    """
+    if not name:
+        raise ValueError("Name cannot be empty.")
+    if price < 0:
+        raise ValueError("Price cannot be negative.")
+    if quantity < 0:
+        raise ValueError("Quantity cannot be negative.")
 
 
 class Product:
@@ -6,21 +25,31 @@ class Product:
        A class representing a product in a store.
 
        Attributes:
-           name (str): The name of the product.
+           name (str): The name of the product. It cannot change while the product is in a store.
            price (float): The price of the product.
            _quantity (int): The quantity of the product in stock.
+           _held (int): The part of the stock reserved for carts, which only they can buy.
            active (bool): The status of the product, whether it is active or not.
 
        Methods:
            get_quantity() -> float: Returns the current quantity of the product.
            set_quantity(quantity): Sets the product's quantity and deactivates it if the quantity is zero.
+           get_available() -> int: Returns the quantity that is not reserved.
+           get_held() -> int: Returns the quantity reserved for carts.
+           set_held(held): Sets the quantity reserved for carts.
            is_active() -> bool: Returns the active status of the product.
            activate(): Activates the product.
            deactivate(): Deactivates the product.
+           add_listener(listener): Registers a callback notified when the product's state changes.
+           remove_listener(listener): Unregisters a previously added callback.
            show() -> str: Returns a string representation of the product's details.
+           validate_purchase(quantity): Checks that a quantity can be bought without buying it.
+           get_price(quantity) -> float: Returns the price of a quantity, with the promotion applied.
+           get_price_cents(quantity) -> int: The same price, in whole cents.
            buy(quantity) -> float: Processes a purchase of the product,
            reducing its quantity and returning the total price.
     """
+    __slots__ = ("_name", "_price", "_quantity", "_held", "active", "promotion", "_listeners")
 
     def __init__(self, name, price, quantity):
         """
@@ -34,18 +63,26 @@ class Product:
                 Raises:
                     ValueError: If name is empty, or if price or quantity are negative.
         """
-        if not name:
-            raise ValueError("Name cannot be empty.")
-        if price < 0:
-            raise ValueError("Price cannot be negative.")
-        if quantity < 0:
-            raise ValueError("Quantity cannot be negative.")
+        check_product_details(name, price, quantity)
 
-        self.name = name
-        self.price = price
+        self._name = name
+        self._price = to_cents(price)
         self._quantity = quantity
+        self._held = 0
         self.active = True
         self.promotion = None
+        self._listeners = ()
+
+    def _set_name(self, name: str):
+        if self._listeners:
+            raise ValueError("Cannot rename a product while it is in a store.")
+        if not name:
+            raise ValueError("Name cannot be empty.")
+        self._name = name
+
+    # Stores index products by name, so a name only changes while no store is listening.
+    # The getter is a C function, since the name is read on every order.
+    name = property(attrgetter("_name"), _set_name, doc="The name of the product.")
 
     def get_quantity(self) -> float:
         """
@@ -56,6 +93,35 @@ class Product:
         """
         return self._quantity
 
+    @property
+    def price(self) -> float:
+        """
+                The list price of the product. It is kept in whole cents; see price_cents.
+        """
+        return from_cents(self._price)
+
+    @price.setter
+    def price(self, price):
+        if price < 0:
+            raise ValueError("Price cannot be negative.")
+        self.price_cents = to_cents(price)
+
+    @property
+    def price_cents(self) -> int:
+        """
+                The list price of the product in cents.
+        """
+        return self._price
+
+    @price_cents.setter
+    def price_cents(self, cents: int):
+        if cents < 0:
+            raise ValueError("Price cannot be negative.")
+        old_cents = self._price
+        self._price = cents
+        if old_cents != cents:
+            self._notify("price", old_cents, cents)
+
     def set_quantity(self, quantity):
         """
                 Sets the quantity of the product. Deactivates the product if the quantity is zero.
@@ -68,10 +134,42 @@ class Product:
         """
         if quantity < 0:
             raise ValueError("Quantity cannot be negative.")
+        old_quantity = self._quantity
         self._quantity = quantity
+        if old_quantity != quantity:
+            self._notify("quantity", old_quantity, quantity)
         if self._quantity == 0:
             self.deactivate()
 
+    def get_available(self) -> int:
+        """
+                Returns the quantity available to sell: the stock that is not reserved for carts.
+        """
+        return max(self._quantity - self._held, 0)
+
+    def get_held(self) -> int:
+        """
+                Returns the quantity reserved for carts.
+        """
+        return self._held
+
+    def set_held(self, held: int):
+        """
+                Sets the quantity reserved for carts, which validate_purchase no longer counts as available.
+
+                Args:
+                    held (int): The reserved quantity. Must not be negative.
+
+                Raises:
+                    ValueError: If held is negative.
+        """
+        if held < 0:
+            raise ValueError("Reserved quantity cannot be negative.")
+        old_held = self._held
+        self._held = held
+        if old_held != held:
+            self._notify("held", old_held, held)
+
     def is_active(self) -> bool:
         """
                 Checks if the product is active.
@@ -82,25 +180,105 @@ class Product:
         return self.active
 
     def activate(self):
-        self.active = True
+        if not self.active:
+            self.active = True
+            self._notify("active", False, True)
 
     def deactivate(self):
-        self.active = False
+        if self.active:
+            self.active = False
+            self._notify("active", True, False)
+
+    def add_listener(self, listener):
+        """
+                Registers a callback that is notified whenever the product's state changes.
+
+                Args:
+                    listener (callable): Called as listener(product, attribute, old_value, new_value).
+        """
+        self._listeners += (listener,)
+
+    def remove_listener(self, listener):
+        """
+                Unregisters a callback previously passed to add_listener.
+
+                Args:
+                    listener (callable): The callback to remove.
+        """
+        self._listeners = tuple(item for item in self._listeners if item != listener)
+
+    def __getstate__(self):
+        """
+                Returns the product's state for pickling. Listeners and reservations are left out,
+                since they belong to the store in this process.
+        """
+        state = {}
+        for cls in type(self).__mro__:
+            for slot in cls.__dict__.get("__slots__", ()):
+                if slot not in ("_listeners", "_held") \
+                        and isinstance(getattr(type(self), slot, None), MemberDescriptorType) and hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._held = 0
+        self._listeners = ()
+
+    def _notify(self, attribute, old_value, new_value):
+        for listener in self._listeners:
+            listener(self, attribute, old_value, new_value)
 
     def set_promotion(self, promotion: 'Promotion'):
         if promotion is not None and not isinstance(promotion, Promotion):
             raise ValueError("Promotion must be an instance of the Promotion class.")
+        old_promotion = self.promotion
         self.promotion = promotion
+        if old_promotion is not promotion:
+            self._notify("promotion", old_promotion, promotion)
 
-    def buy(self, quantity: int) -> float:
+    def validate_purchase(self, quantity: int, held: int = 0):
+        """
+                Checks that the given quantity can be bought, without changing the product.
+
+                Args:
+                    quantity (int): The quantity to buy.
+                    held (int): Units reserved for this buyer, which it may buy on top of the stock
+                        that is not reserved.
+
+                Raises:
+                    ValueError: If the quantity is not positive or exceeds the stock that is not reserved.
+        """
         if quantity <= 0:
             raise ValueError("Purchase quantity must be greater than zero.")
-        if quantity > self._quantity:
+        if quantity > self._quantity - self._held + min(held, self._held):
             raise ValueError("Not enough quantity available for purchase.")
 
-        total_price = quantity * self.price
+    def get_price(self, quantity: int) -> float:
+        """
+                Returns the total price of the given quantity, applying the product's promotion if it has one.
+
+                Args:
+                    quantity (int): The quantity to price.
+
+                Returns:
+                    float: The total price.
+        """
+        return from_cents(self.get_price_cents(quantity))
+
+    def get_price_cents(self, quantity: int) -> int:
+        """
+                Returns the total price of the given quantity in cents, applying the product's promotion
+                if it has one.
+        """
         if self.promotion:
-            total_price = self.promotion.apply_promotion(self, quantity)
+            return self.promotion.apply_promotion_cents(self, quantity)
+        return quantity * self._price
+
+    def buy(self, quantity: int) -> float:
+        self.validate_purchase(quantity)
+        total_price = self.get_price(quantity)
 
         new_quantity = self._quantity - quantity
         self.set_quantity(new_quantity)
@@ -111,16 +289,20 @@ class Product:
                 Returns a string representation of the product's details.
 
                 Returns:
-                    str: A string showing the product's name, price, and quantity.
+                    str: A string showing the product's name, price, quantity, the quantity available
+                    to sell if part of it is reserved, and promotion.
         """
+        available_info = f", Available: {self.get_available()}" if self._held else ""
         promotion_info = f", Promotion: {self.promotion.name}" if self.promotion else ""
-        return f"{self.name}, Price: ${self.price:.2f}, Quantity: {self._quantity}{promotion_info}"
+        return (f"{self.name}, Price: ${format_cents(self._price)}, Quantity: {self._quantity}{available_info}"
+                f"{promotion_info}")
 
 
 class NonStockedProduct(Product):
     """
     Represents a product that is not physically stocked in the store.
     """
+    __slots__ = ()
 
     def __init__(self, name: str, price: float):
         super().__init__(name, price, quantity=0)
@@ -136,6 +318,7 @@ class LimitedProduct(Product):
     """
     Represents a product that has a maximum purchase limit per order.
     """
+    __slots__ = ("maximum",)
 
     def __init__(self, name: str, price: float, quantity: int, maximum: int):
         super().__init__(name, price, quantity)
@@ -143,10 +326,10 @@ class LimitedProduct(Product):
             raise ValueError("Maximum purchase quantity must be greater than zero.")
         self.maximum = maximum
 
-    def buy(self, quantity: int) -> float:
+    def validate_purchase(self, quantity: int, held: int = 0):
         if quantity > self.maximum:
             raise ValueError(f"Cannot purchase more than {self.maximum} of '{self.name}' at once.")
-        return super().buy(quantity)
+        super().validate_purchase(quantity, held)
 
 
 # Promotion Classes
@@ -154,13 +337,19 @@ class LimitedProduct(Product):
 class Promotion(ABC):
     """
     Abstract base class for promotions.
+
+    Promotions price in whole cents. Fractions of a cent are rounded half up on the line
+    total, so the same line always costs the same whatever else is in the order.
     """
 
     def __init__(self, name):
         self.name = name
 
-    @abstractmethod
     def apply_promotion(self, product: 'Product', quantity) -> float:
+        return from_cents(self.apply_promotion_cents(product, quantity))
+
+    @abstractmethod
+    def apply_promotion_cents(self, product: 'Product', quantity) -> int:
         pass
 
 
@@ -168,14 +357,15 @@ class SecondHalfPrice(Promotion):
     """
         Promotion where every second item is at half price.
     """
-    def apply_promotion(self, product: 'Product', quantity) -> float:
+    def apply_promotion_cents(self, product: 'Product', quantity) -> int:
         if quantity <= 1:
-            return product.price * quantity
+            return product.price_cents * quantity
 
         full_price_items = quantity // 2
         half_price_items = quantity - full_price_items
 
-        total_price = (full_price_items * product.price) + (half_price_items * product.price * 0.5)
+        price_cents = product.price_cents
+        total_price = (full_price_items * price_cents) + divide_half_up(half_price_items * price_cents, 2)
         return total_price
 
 
@@ -183,14 +373,14 @@ class ThirdOneFree(Promotion):
     """
         Promotion where you get one free item for every two purchased.
     """
-    def apply_promotion(self, product: 'Product', quantity) -> float:
+    def apply_promotion_cents(self, product: 'Product', quantity) -> int:
         if quantity <= 2:
-            return product.price * quantity
+            return product.price_cents * quantity
 
         free_items = quantity // 3
         paid_items = quantity - free_items
 
-        total_price = paid_items * product.price
+        total_price = paid_items * product.price_cents
         return total_price
 
 
@@ -203,9 +393,10 @@ class PercentDiscount(Promotion):
         if not (0 < percent < 100):
             raise ValueError("Percent must be between 0 and 100.")
         self.percent = percent
+        self.basis_points = to_basis_points(percent)
 
-    def apply_promotion(self, product: 'Product', quantity) -> float:
-        return (product.price * quantity) * (1 - self.percent / 100)
+    def apply_promotion_cents(self, product: 'Product', quantity) -> int:
+        return percent_off(product.price_cents * quantity, self.basis_points)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,298 @@
+"""
+    Declarative promotions compiled to closed-form pricing functions.
+
+    A promotion is described by a plain dict, for example
+        {"type": "buy_n_get_m", "name": "3 for 2", "buy": 2, "free": 1}
+        {"type": "tiered", "name": "Volume", "tiers": [[10, 5], [100, 12]]}
+        {"type": "best_of", "name": "Best deal", "rules": [...]}
+    and compile_promotion turns it into a Promotion whose price for any quantity is computed
+    with a fixed number of arithmetic operations, so new kinds of deals need no new subclass.
+    Compiled functions price in whole cents, rounding half a cent up.
+    Bundles, which price several products together, are applied by Store.order.
+"""
+from __future__ import annotations
+from bisect import bisect_right
+from collections.abc import Callable, Sequence
+
+from money import divide_half_up, from_cents, percent_off, to_basis_points, to_cents
+from products import Product, Promotion
+
+PriceFunction = Callable[[int, int], int]
+
+
+class CompiledPromotion(Promotion):
+    """
+        A promotion priced by a compiled function of unit price in cents and quantity.
+    """
+
+    def __init__(self, name: str, price_function: PriceFunction, spec: dict):
+        super().__init__(name)
+        self.price_function = price_function
+        self.spec = spec
+
+    def apply_promotion_cents(self, product: 'Product', quantity) -> int:
+        return self.price_function(product.price_cents, quantity)
+
+    def __reduce__(self):
+        # The pricing function is a closure, which pickle cannot save; the spec rebuilds it.
+        return _recompile, (self.name, self.spec)
+
+
+def _recompile(name: str, spec: dict) -> CompiledPromotion:
+    promotion = compile_promotion(spec)
+    promotion.name = name
+    return promotion
+
+
+def _number(value, field: str, integer: bool = False):
+    """
+        Returns value, the content of a description field, if it is a number.
+
+        Raises:
+            ValueError: If value is missing or not a number, naming the field.
+    """
+    if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)):
+        raise ValueError(f"Promotion field {field!r} must be {'an integer' if integer else 'a number'}, "
+                         f"not {value!r}.")
+    return value
+
+
+def _list(value, field: str) -> list:
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"Promotion field {field!r} must be a list, not {value!r}.")
+    return value
+
+
+def _percent(spec: dict) -> PriceFunction:
+    percent = _number(spec.get("percent"), "percent")
+    if not 0 < percent < 100:
+        raise ValueError("Percent must be between 0 and 100.")
+    basis_points = to_basis_points(percent)
+    return lambda price, quantity: percent_off(price * quantity, basis_points)
+
+
+def _buy_n_get_m(spec: dict) -> PriceFunction:
+    buy, free = _number(spec.get("buy"), "buy", integer=True), _number(spec.get("free"), "free", integer=True)
+    if buy <= 0 or free <= 0:
+        raise ValueError("Buy and free quantities must be greater than zero.")
+    group = buy + free
+
+    def price_function(price, quantity):
+        remainder = quantity % group
+        paid_items = (quantity // group) * buy + (remainder if remainder < buy else buy)
+        return paid_items * price
+    return price_function
+
+
+def _second_half_price(spec: dict) -> PriceFunction:
+    def price_function(price, quantity):
+        if quantity <= 1:
+            return price * quantity
+        full_price_items = quantity // 2
+        half_price_items = quantity - full_price_items
+        return (full_price_items * price) + divide_half_up(half_price_items * price, 2)
+    return price_function
+
+
+def _tiered(spec: dict) -> PriceFunction:
+    tiers = []
+    for tier in _list(spec.get("tiers"), "tiers"):
+        if not isinstance(tier, (list, tuple)) or len(tier) != 2:
+            raise ValueError(f"Promotion field 'tiers' must hold [minimum, percent] pairs, not {tier!r}.")
+        tiers.append((int(_number(tier[0], "tiers")), _number(tier[1], "tiers")))
+    tiers.sort()
+    if any(not 0 <= percent < 100 for _, percent in tiers):
+        raise ValueError("Tier percents must be between 0 and 100.")
+    minimums = [minimum for minimum, _ in tiers]
+    basis_points = [to_basis_points(percent) for _, percent in tiers]
+
+    def price_function(price, quantity):
+        tier = bisect_right(minimums, quantity) - 1
+        if tier < 0:
+            return price * quantity
+        return percent_off(price * quantity, basis_points[tier])
+    return price_function
+
+
+def _best_of(spec: dict) -> PriceFunction:
+    functions = [_compile(rule) for rule in _list(spec.get("rules"), "rules")]
+    if not functions:
+        raise ValueError("A best_of promotion needs at least one rule.")
+    return lambda price, quantity: min(function(price, quantity) for function in functions)
+
+
+def _stacked(spec: dict) -> PriceFunction:
+    functions = [_compile(rule) for rule in _list(spec.get("rules"), "rules")]
+    if not functions:
+        raise ValueError("A stacked promotion needs at least one rule.")
+
+    def price_function(price, quantity):
+        # Each rule takes off the same share of the running total as it would of the list price.
+        # The shares are multiplied exactly and the result rounded once.
+        list_price = price * quantity
+        if list_price == 0:
+            return list_price
+        numerator, denominator = list_price, 1
+        for function in functions:
+            numerator *= function(price, quantity)
+            denominator *= list_price
+        return divide_half_up(numerator, denominator)
+    return price_function
+
+
+RULE_TYPES: dict[str, Callable[[dict], PriceFunction]] = {
+    "percent": _percent,
+    "buy_n_get_m": _buy_n_get_m,
+    "second_half_price": _second_half_price,
+    "tiered": _tiered,
+    "best_of": _best_of,
+    "stacked": _stacked,
+}
+
+
+def _compile(spec: dict) -> PriceFunction:
+    if not isinstance(spec, dict):
+        raise ValueError(f"A promotion description must be a dict, not {spec!r}.")
+    try:
+        compiler = RULE_TYPES[spec.get("type")]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unknown promotion type {spec.get('type')!r}.") from None
+    return compiler(spec)
+
+
+def compile_promotion(spec: dict) -> CompiledPromotion:
+    """
+        Compiles a promotion description into a Promotion.
+
+        Args:
+            spec (dict): The description, with a "type" from RULE_TYPES, a "name", and the
+                parameters of that type.
+
+        Returns:
+            CompiledPromotion: A promotion that can be set on any product.
+
+        Raises:
+            ValueError: If the description is invalid; the message names the offending field.
+    """
+    price_function = _compile(spec)
+    name = spec.get("name") or spec["type"]
+    if not isinstance(name, str):
+        raise ValueError(f"Promotion field 'name' must be a string, not {name!r}.")
+    return CompiledPromotion(name, price_function, spec)
+
+
+class Bundle:
+    """
+        A deal pricing a set of products together, such as a laptop with earbuds for a fixed price.
+
+        Whenever an order contains every product of the bundle in the required quantities, each
+        complete set is charged the bundle price and the remaining units their usual price, as
+        long as that is cheaper for the customer.
+
+        Attributes:
+            name (str): The name of the bundle.
+            items (Dict[str, int]): The quantity of each product, by product name, in one set.
+            price_cents (int): The price of one set in cents.
+    """
+
+    def __init__(self, name: str, items: dict[str, int], price: float):
+        if not items:
+            raise ValueError("A bundle needs at least one product.")
+        if any(quantity <= 0 for quantity in items.values()):
+            raise ValueError("Bundle quantities must be greater than zero.")
+        if price < 0:
+            raise ValueError("Price cannot be negative.")
+        self.name = name
+        self.items = dict(items)
+        self.price_cents = to_cents(price)
+
+    @property
+    def price(self) -> float:
+        """
+                The price of one set.
+        """
+        return from_cents(self.price_cents)
+
+    def apply(self, quantities: dict[Product, int], prices: dict[Product, int]) -> tuple[int, int]:
+        """
+                Prices as many complete sets of the bundle as the order holds.
+
+                Args:
+                    quantities (Dict[Product, int]): The units of each product not yet in a bundle.
+                    prices (Dict[Product, int]): The current price of those units in cents, updated in place.
+
+                Returns:
+                    Tuple[int, int]: The number of sets applied and their total price in cents.
+        """
+        products = {product.name: product for product in quantities}
+        if any(name not in products for name in self.items):
+            return 0, 0
+        sets = min(quantities[products[name]] // needed for name, needed in self.items.items())
+        if sets == 0:
+            return 0, 0
+        repriced = {products[name]: products[name].get_price_cents(quantities[products[name]] - sets * needed)
+                    for name, needed in self.items.items()}
+        if sum(repriced.values()) + sets * self.price_cents >= sum(prices[product] for product in repriced):
+            return 0, 0
+        for name, needed in self.items.items():
+            quantities[products[name]] -= sets * needed
+        prices.update(repriced)
+        return sets, sets * self.price_cents
+
+
+def _share(amount: int, weights: Sequence[int]) -> list[int]:
+    """
+        Splits an amount of cents in proportion to weights, giving the rounding to the last part.
+    """
+    base = sum(weights)
+    shares = [amount * weight // base if base else 0 for weight in weights[:-1]]
+    shares.append(amount - sum(shares))
+    return shares
+
+
+def price_with_bundles(lines: Sequence[tuple[Product, int, int]], bundles: list[Bundle]) -> tuple[int, list[int]]:
+    """
+        Applies bundles in order to priced order lines and returns what each line is charged.
+
+        The price of a bundle set is shared between its products in proportion to what their
+        units in the set would have cost, and a product's charge between its lines in proportion
+        to their price, so only the lines of bundles that applied are discounted and the charges
+        add up to the total.
+
+        Args:
+            lines (Sequence[Tuple[Product, int, int]]): Each line's product, quantity and price in cents.
+            bundles (List[Bundle]): The bundles to try.
+
+        Returns:
+            Tuple[int, List[int]]: The total price in cents, and the price charged for each line in
+            cents; the plain line prices if no bundle applies.
+    """
+    quantities: dict[Product, int] = {}
+    prices: dict[Product, int] = {}
+    for product, quantity, price in lines:
+        quantities[product] = quantities.get(product, 0) + quantity
+        prices[product] = prices.get(product, 0) + price
+    listed = dict(prices)
+    charges = dict(prices)
+    applied = False
+    for bundle in bundles:
+        before = dict(prices)
+        sets, total = bundle.apply(quantities, prices)
+        if not sets:
+            continue
+        applied = True
+        bundled = [product for product in prices if prices[product] != before[product]]
+        weights = [before[product] - prices[product] for product in bundled]
+        for product, weight, share in zip(bundled, weights, _share(total, weights)):
+            charges[product] += share - weight
+    if not applied:
+        return sum(price for _, _, price in lines), [price for _, _, price in lines]
+    by_product: dict[Product, list[int]] = {}
+    for index, (product, _, _) in enumerate(lines):
+        by_product.setdefault(product, []).append(index)
+    charged = [price for _, _, price in lines]
+    for product, indexes in by_product.items():
+        if charges[product] != listed[product]:
+            for index, share in zip(indexes, _share(charges[product], [lines[index][2] for index in indexes])):
+                charged[index] = share
+    return sum(charged), charged
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import OrderedDict
+
+from products import Product
+from store import Store
+
+
+class RenderCache:
+    """
+        Caches the display line of each product and the numbered listing of a store.
+
+        A product's line is dropped only when that product changes (price, quantity, active
+        flag or promotion) or leaves the store; the listing is dropped when any product does.
+        At most maxsize lines are kept, evicting the least recently used.
+
+        Attributes:
+            maxsize (int): The maximum number of product lines kept.
+            hits (int): The number of lines and listings served from the cache.
+            misses (int): The number of lines and listings that had to be rendered.
+            evictions (int): The number of lines dropped to make room.
+
+        Methods:
+            line(product) -> str: Returns product.show(), from the cache when possible.
+            listing() -> str: Returns the numbered listing of the store's active products.
+            stats() -> Dict[str, int]: Returns the cache counters.
+            close(): Stops following the store's changes.
+    """
+
+    def __init__(self, store: Store, maxsize: int = 100_000):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be greater than zero.")
+        self._store = weakref.ref(store)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lines: "OrderedDict[Product, str]" = OrderedDict()
+        self._listing: str | None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        store.add_listener(self._on_change)
+
+    @property
+    def store(self) -> Store:
+        """
+                The store whose products are rendered. The cache does not keep it alive.
+        """
+        store = self._store()
+        if store is None:
+            raise ValueError("The store of this cache no longer exists.")
+        return store
+
+    def _on_change(self, product: Product, attribute: str, old_value, new_value):
+        with self._lock:
+            self._generation += 1
+            self._lines.pop(product, None)
+            self._listing = None
+
+    def line(self, product: Product) -> str:
+        """
+                Returns the display line of a product.
+
+                Args:
+                    product (Product): A product of the store.
+
+                Returns:
+                    str: The same string as product.show().
+        """
+        with self._lock:
+            line = self._lines.get(product)
+            if line is not None:
+                self._lines.move_to_end(product)
+                self.hits += 1
+                return line
+            self.misses += 1
+            generation = self._generation
+        line = product.show()
+        with self._lock:
+            # A change while rendering may have made the line stale; it is not kept then.
+            if generation == self._generation:
+                self._lines[product] = line
+                if len(self._lines) > self.maxsize:
+                    self._lines.popitem(last=False)
+                    self.evictions += 1
+        return line
+
+    def listing(self) -> str:
+        """
+                Returns the numbered listing of the store's active products, one per line,
+                as shown by the store menu.
+        """
+        with self._lock:
+            if self._listing is not None:
+                self.hits += 1
+                return self._listing
+            self.misses += 1
+            generation = self._generation
+        listing = "\n".join(f"{ids}. {self.line(product)}"
+                            for ids, product in enumerate(self.store.get_all_products(), start=1))
+        with self._lock:
+            if generation == self._generation:
+                self._listing = listing
+        return listing
+
+    def stats(self) -> dict[str, int]:
+        """
+                Returns the hit, miss and eviction counters and the number of cached lines.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._lines)}
+
+    def close(self):
+        """
+                Stops following the store's changes and empties the cache.
+        """
+        self.store.remove_listener(self._on_change)
+        with self._lock:
+            self._lines.clear()
+            self._listing = None
+
+
+_caches: "weakref.WeakKeyDictionary[Store, RenderCache]" = weakref.WeakKeyDictionary()
+
+
+def cache_for(store) -> RenderCache | None:
+    """
+        Returns the shared render cache of a store, creating it on first use.
+
+        Args:
+            store: A Store, or another object offering the store interface.
+
+        Returns:
+            RenderCache: The store's cache, or None if the store does not report changes.
+    """
+    if not isinstance(store, Store):
+        return None
+    cache = _caches.get(store)
+    if cache is None:
+        cache = _caches.setdefault(store, RenderCache(store))
+    return cache
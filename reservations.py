@@ -0,0 +1,185 @@
+"""
+    Time-limited stock reservations for shopping carts.
+
+    A cart places holds on products while it is being filled. Held units are no longer
+    available to anyone else: Product.validate_purchase, and so Store.order, only sell the
+    stock that is not held, and Product.show reports what is left. Checking a cart out turns
+    its holds into a sale; holds that are not checked out in time expire and their units
+    become available again. Expiry runs on a TimerWheel advanced by each call, and by the
+    store before every order, quote or listing (see Store.add_housekeeping), so expired holds
+    never block a sale; it needs no thread and never scans the outstanding holds.
+"""
+from __future__ import annotations
+import threading
+import time
+import weakref
+from collections.abc import Callable, Hashable
+
+from products import Product, LimitedProduct
+from store import Store
+from timer_wheel import Timer, TimerWheel
+
+
+class ReservationManager:
+    """
+        Holds stock of a store's products for carts, for a limited time.
+
+        Attributes:
+            ttl (float): How long a hold lasts, in seconds, from the last time its cart changed it.
+
+        Methods:
+            hold(cart, product, quantity): Reserves more units of a product for a cart.
+            release(cart, product=None): Gives a cart's holds back, for one product or all of them.
+            holds(cart) -> Dict[Product, int]: Returns the quantities held by a cart.
+            checkout(cart) -> float: Buys everything a cart holds and returns the total price.
+            expire() -> int: Releases the holds that have expired.
+    """
+
+    def __init__(self, store: Store, ttl: float = 900.0, clock: Callable[[], float] = time.monotonic,
+                 tick: float = 1.0):
+        if ttl <= 0:
+            raise ValueError("Reservation time must be greater than zero.")
+        self._store = store
+        self.ttl = ttl
+        self._clock = clock
+        self._wheel = TimerWheel(clock(), tick=tick)
+        self._carts: dict[Hashable, dict[Product, tuple[int, Timer]]] = {}
+        self._lock = threading.Lock()
+        store.add_housekeeping(self.expire)
+
+    def __len__(self) -> int:
+        return len(self._wheel)
+
+    def hold(self, cart: Hashable, product: Product, quantity: int):
+        """
+                Reserves units of a product for a cart, on top of what the cart already holds,
+                and restarts the cart's time for that product.
+
+                Args:
+                    cart: Any hashable key identifying the cart.
+                    product (Product): A product of the store.
+                    quantity (int): The units to add to the hold.
+
+                Raises:
+                    ValueError: If the product is not active, or not enough of it is available,
+                        or a cart of a limited product would hold more than its maximum.
+        """
+        if quantity <= 0:
+            raise ValueError("Quantity must be greater than zero.")
+        self.expire()
+        with self._lock:
+            held, timer = self._carts.get(cart, {}).get(product, (0, None))
+            try:
+                # Checkout buys the whole hold in one line.
+                if isinstance(product, LimitedProduct) and held + quantity > product.maximum:
+                    raise ValueError(f"Cannot purchase more than {product.maximum} of '{product.name}' at once.")
+                self._store.hold(product, quantity)
+            except ValueError as e:
+                raise ValueError(f"Failed to reserve {quantity} of product '{product.name}': {e}")
+            if timer is not None:
+                self._wheel.cancel(timer)
+            timer = self._wheel.schedule(self._clock() + self.ttl, (cart, product))
+            self._carts.setdefault(cart, {})[product] = (held + quantity, timer)
+
+    def release(self, cart: Hashable, product: Product | None = None):
+        """
+                Gives back what a cart holds of a product, or of every product if none is given.
+        """
+        with self._lock:
+            lines = self._carts.get(cart, {})
+            released = [(item, self._pop(cart, item)) for item in ([product] if product else list(lines))
+                        if item in lines]
+        self._give_back(released)
+
+    def holds(self, cart: Hashable) -> dict[Product, int]:
+        """
+                Returns the quantity of each product a cart holds.
+        """
+        self.expire()
+        with self._lock:
+            return {product: held for product, (held, _) in self._carts.get(cart, {}).items()}
+
+    def checkout(self, cart: Hashable) -> float:
+        """
+                Buys everything a cart holds, as one all-or-nothing order, and ends its holds.
+
+                Args:
+                    cart: The key of the cart.
+
+                Returns:
+                    float: The total price of the order.
+
+                Raises:
+                    ValueError: If the cart holds nothing, or the order fails; the holds are kept then,
+                        and their time restarts.
+        """
+        self.expire()
+        with self._lock:
+            # The holds leave the wheel, so they cannot expire while the order runs.
+            held = {product: self._pop(cart, product) for product in list(self._carts.get(cart, ()))}
+        if not held:
+            raise ValueError("The cart holds no products.")
+        try:
+            return self._store.order(list(held.items()), held=held)
+        except ValueError:
+            with self._lock:
+                deadline = self._clock() + self.ttl
+                for product, quantity in held.items():
+                    more, timer = self._carts.get(cart, {}).get(product, (0, None))
+                    if timer is not None:
+                        self._wheel.cancel(timer)
+                    timer = self._wheel.schedule(deadline, (cart, product))
+                    self._carts.setdefault(cart, {})[product] = (quantity + more, timer)
+            raise
+
+    def expire(self) -> int:
+        """
+                Releases every hold whose time is up.
+
+                Returns:
+                    int: The number of holds released.
+        """
+        if not len(self._wheel):
+            return 0
+        with self._lock:
+            released = []
+            for cart, product in self._wheel.advance(self._clock()):
+                released.append((product, self._pop(cart, product)))
+        self._give_back(released)
+        return len(released)
+
+    def _pop(self, cart: Hashable, product: Product) -> int:
+        """
+                Forgets a cart's hold on a product and returns its quantity. The lock must be held.
+        """
+        lines = self._carts[cart]
+        held, timer = lines.pop(product)
+        self._wheel.cancel(timer)
+        if not lines:
+            del self._carts[cart]
+        return held
+
+    def _give_back(self, released: list[tuple[Product, int]]):
+        for product, held in released:
+            self._store.release_hold(product, held)
+
+
+_managers: "weakref.WeakKeyDictionary[Store, ReservationManager]" = weakref.WeakKeyDictionary()
+
+
+def reservations_for(store) -> ReservationManager | None:
+    """
+        Returns the shared reservation manager of a store, creating it on first use.
+
+        Args:
+            store: A Store, or another object offering the store interface.
+
+        Returns:
+            ReservationManager: The store's manager, or None if the store cannot hold stock.
+    """
+    if not isinstance(store, Store):
+        return None
+    manager = _managers.get(store)
+    if manager is None:
+        manager = _managers.setdefault(store, ReservationManager(store))
+    return manager
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterator
+from heapq import heapify, heappop
+
+from sorted_index import SortedIndex
+
+
+def trigrams(text: str) -> set[str]:
+    """
+        Returns the set of three-character substrings of a text.
+    """
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+
+class NameIndex:
+    """
+        A search index over product names, matching case-insensitively.
+
+        Prefix queries use names kept in sorted order, so they cost a binary search plus the
+        matches. Substring queries use an inverted index from each three-character substring
+        to the names containing it: the posting sets of the query's trigrams are intersected,
+        starting with the smallest, and only the survivors are checked. Fuzzy queries rank
+        names by how many of the query's trigrams they share, which tolerates typos.
+
+        Members are integers, such as a product's position in its store, added in increasing
+        order. Queries yield their matches lazily, so a caller that stops after a page of
+        results does not pay for the rest.
+
+        Methods:
+            add(member, name): Adds a name to the index.
+            discard(member): Removes a name from the index.
+            prefix(query) -> Iterator[int]: Yields members whose name starts with query, in name order.
+            substring(query) -> Iterator[int]: Yields members whose name contains query, in member order.
+            fuzzy(query, min_share) -> Iterator[int]: Yields members sharing at least min_share of the
+                query's trigrams, best first.
+    """
+
+    def __init__(self):
+        self._names: dict[int, str] = {}
+        self._sorted = SortedIndex()
+        self._postings: dict[str, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, member: int, name: str):
+        folded = name.casefold()
+        self._names[member] = folded
+        self._sorted.set(member, folded)
+        for gram in trigrams(folded):
+            self._postings.setdefault(gram, set()).add(member)
+
+    def discard(self, member: int):
+        folded = self._names.pop(member, None)
+        if folded is None:
+            return
+        self._sorted.discard(member)
+        for gram in trigrams(folded):
+            postings = self._postings[gram]
+            postings.discard(member)
+            if not postings:
+                del self._postings[gram]
+
+    def prefix(self, query: str) -> Iterator[int]:
+        query = query.casefold()
+        for name, member in self._sorted.scan((query, -1)):
+            if not name.startswith(query):
+                return
+            yield member
+
+    def substring(self, query: str) -> Iterator[int]:
+        query = query.casefold()
+        names = self._names
+        postings = sorted((self._postings.get(gram, set()) for gram in trigrams(query)), key=len)
+        if not postings or len(postings[0]) * 4 > len(names):
+            # Too short to have a trigram, or common enough that scanning the names in order
+            # finds a page of matches sooner than intersecting the postings.
+            return (member for member, name in names.items() if query in name)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+        return iter(sorted(member for member in candidates if query in names[member]))
+
+    def fuzzy(self, query: str, min_share: float = 0.5) -> Iterator[int]:
+        query = query.casefold()
+        grams = trigrams(query)
+        if not grams:
+            return self.substring(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        needed = max(1, int(len(grams) * min_share))
+        # A heap orders the matches as they are taken, instead of sorting every one of them.
+        matches = [(-count, member) for member, count in shared.items() if count >= needed]
+        heapify(matches)
+        return (heappop(matches)[1] for _ in range(len(matches)))
@@ -0,0 +1,196 @@
+"""
+    Asyncio order server for a Store, and a blocking client for it.
+
+    The protocol is one JSON object per line in each direction. Requests:
+        {"command": "list"}
+        {"command": "page", "limit": 20, "cursor": null, "sort_by": "price", ...filters of Store.get_page}
+        {"command": "search", "query": "pixel", "limit": 20, "mode": "substring"}
+        {"command": "total"}
+        {"command": "get", "name": "MacBook Air M2"}
+        {"command": "order", "items": [["MacBook Air M2", 2], ...]}
+    Every response has "ok"; failed requests carry an "error" message instead of a result.
+"""
+import asyncio
+import json
+import socket
+from typing import List, Tuple
+
+from render_cache import cache_for
+from store import ProductPage, Store
+
+PAGE_OPTIONS = {"limit", "cursor", "sort_by", "descending", "min_price", "max_price", "in_stock", "has_promotion",
+                "name_prefix"}
+
+
+def _renderer(store: Store):
+    render_cache = cache_for(store)
+    return render_cache.line if render_cache is not None else lambda product: product.show()
+
+
+def handle_request(store: Store, request: dict) -> dict:
+    """
+        Runs one protocol request against the store.
+
+        Args:
+            store (Store): The store to serve.
+            request (dict): The decoded request.
+
+        Returns:
+            dict: The response to send back.
+    """
+    if not isinstance(request, dict):
+        return {"ok": False, "error": "Request must be a JSON object."}
+    command = request.get("command")
+    try:
+        if command == "list":
+            render = _renderer(store)
+            return {"ok": True, "products": [{"name": product.name, "line": render(product)}
+                                             for product in store.get_all_products()]}
+        if command == "page":
+            render = _renderer(store)
+            options = {key: value for key, value in request.items() if key in PAGE_OPTIONS}
+            page = store.get_page(**options)
+            return {"ok": True, "products": [{"name": product.name, "line": render(product)}
+                                             for product in page.products],
+                    "next_cursor": page.next_cursor}
+        if command == "search":
+            render = _renderer(store)
+            products = store.search(request["query"], limit=int(request.get("limit", 20)),
+                                    mode=request.get("mode", "substring"))
+            return {"ok": True, "products": [{"name": product.name, "line": render(product)} for product in products]}
+        if command == "total":
+            return {"ok": True, "total": store.get_total_quantity()}
+        if command == "get":
+            product = store.get_product(request["name"])
+            return {"ok": True, "name": product.name, "line": _renderer(store)(product)}
+        if command == "order":
+            shopping_list = [(store.get_product(name), int(quantity)) for name, quantity in request["items"]]
+            return {"ok": True, "total_price": store.order(shopping_list)}
+    except (ValueError, TypeError, KeyError) as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": False, "error": f"Unknown command: {command!r}."}
+
+
+async def _serve_client(store: Store, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "Request is not valid JSON."}
+            else:
+                try:
+                    if isinstance(request, dict) and request.get("command") == "order" and store.journal is not None:
+                        # Journaled orders may wait on fsync, which must not stall other clients.
+                        response = await asyncio.to_thread(handle_request, store, request)
+                    else:
+                        response = handle_request(store, request)
+                except Exception as e:
+                    # A request that fails unexpectedly gets an error; the connection stays open.
+                    response = {"ok": False, "error": f"Internal error: {e}"}
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(store: Store, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+    """
+        Starts serving the store on a TCP socket.
+
+        Args:
+            store (Store): The store to serve.
+            host (str): The address to listen on.
+            port (int): The port to listen on; 0 picks a free port.
+
+        Returns:
+            asyncio.AbstractServer: The running server.
+    """
+    return await asyncio.start_server(lambda reader, writer: _serve_client(store, reader, writer),
+                                      host, port, backlog=4096)
+
+
+def serve(store: Store, host: str = "127.0.0.1", port: int = 8765):
+    """
+        Serves the store until the process is interrupted.
+    """
+    async def run():
+        server = await start_server(store, host, port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+class RemoteProduct:
+    """
+        A product as listed by a remote store: its name and its display line.
+    """
+
+    def __init__(self, name: str, line: str = ""):
+        self.name = name
+        self.line = line
+
+    def show(self) -> str:
+        return self.line
+
+
+class RemoteStore:
+    """
+        A blocking client that offers the parts of the Store interface used by the CLI
+        (get_all_products, get_page, search, get_product, get_total_quantity and order) over a server connection.
+    """
+
+    def __init__(self, host: str, port: int):
+        self._socket = socket.create_connection((host, port))
+        self._reader = self._socket.makefile("rb")
+
+    def _call(self, request: dict) -> dict:
+        self._socket.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection.")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response
+
+    def get_all_products(self) -> List[RemoteProduct]:
+        return [RemoteProduct(item["name"], item["line"]) for item in self._call({"command": "list"})["products"]]
+
+    def get_page(self, **options) -> ProductPage:
+        response = self._call({"command": "page", **options})
+        next_cursor = tuple(response["next_cursor"]) if response["next_cursor"] is not None else None
+        return ProductPage([RemoteProduct(item["name"], item["line"]) for item in response["products"]], next_cursor)
+
+    def search(self, query: str, limit: int = 20, mode: str = "substring") -> List[RemoteProduct]:
+        response = self._call({"command": "search", "query": query, "limit": limit, "mode": mode})
+        return [RemoteProduct(item["name"], item["line"]) for item in response["products"]]
+
+    def get_product(self, name: str) -> RemoteProduct:
+        response = self._call({"command": "get", "name": name})
+        return RemoteProduct(response["name"], response["line"])
+
+    def get_total_quantity(self) -> int:
+        return self._call({"command": "total"})["total"]
+
+    def order(self, shopping_list: List[Tuple[RemoteProduct, int]]) -> float:
+        items = [[product.name, quantity] for product, quantity in shopping_list]
+        return self._call({"command": "order", "items": items})["total_price"]
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+        Splits a "host:port" string, or a bare port, into a host and a port.
+    """
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
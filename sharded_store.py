@@ -0,0 +1,208 @@
+"""
+    A store split across worker processes.
+
+    Products are assigned to shards by a hash of their name, and each shard is a Store
+    running in its own process, so orders for different shards are processed on different
+    cores. ShardedStore is the coordinator: it offers the Store interface, sends orders that
+    touch a single shard straight to it, and runs orders that span shards as a two-phase
+    reserve/commit so they stay all-or-nothing.
+"""
+import itertools
+import multiprocessing
+import pickle
+import threading
+import zlib
+from contextlib import ExitStack
+from typing import Dict, List, Tuple
+
+from money import from_cents
+from products import Product
+from store import PreparedOrder, Store
+
+
+def shard_of(name: str, shards: int) -> int:
+    """
+        Returns the shard a product name belongs to. The hash is stable across processes.
+    """
+    return zlib.crc32(name.encode("utf-8")) % shards
+
+
+class _Shard:
+    """
+        The part of the catalog served by one worker process, with the reservations of
+        cross-shard orders that have been prepared but not yet committed or aborted.
+    """
+
+    def __init__(self, products: List[Product]):
+        self.store = Store(products)
+        self.reservations: Dict[int, PreparedOrder] = {}
+
+    def lines(self, items: List[Tuple[str, int]]) -> List[Tuple[Product, int]]:
+        return [(self.store.get_product(name), quantity) for name, quantity in items]
+
+    def order(self, items):
+        return self.store.order(self.lines(items))
+
+    def prepare(self, transaction: int, items):
+        prepared = self.store.prepare_order(self.lines(items))
+        self.reservations[transaction] = prepared
+        return prepared.total_cents
+
+    def commit(self, transaction: int):
+        self.store.commit_order(self.reservations.pop(transaction))
+
+    def abort(self, transaction: int):
+        prepared = self.reservations.pop(transaction, None)
+        if prepared is not None:
+            self.store.abort_order(prepared)
+
+    def products(self):
+        return self.store.get_all_products()
+
+    def total(self):
+        return self.store.get_total_quantity()
+
+    def get(self, name: str):
+        return self.store.get_product(name)
+
+
+def _shard_main(connection, products: bytes):
+    shard = _Shard(pickle.loads(products))
+    while True:
+        command, args = connection.recv()
+        if command == "stop":
+            connection.close()
+            return
+        try:
+            connection.send((True, getattr(shard, command)(*args)))
+        except ValueError as e:
+            connection.send((False, str(e)))
+        except Exception as e:
+            # Any other failure is reported too, so the worker keeps serving its shard.
+            connection.send((False, f"{type(e).__name__}: {e}"))
+
+
+class ShardedStore:
+    """
+        A coordinator offering the Store interface over products sharded across worker processes.
+
+        Products returned by get_all_products and get_product are copies; pass them, or any
+        product with the same name, to order.
+
+        Methods:
+            get_product(name: str) -> Product: Returns a copy of the product with the given name.
+            get_total_quantity() -> int: Returns the total quantity of all products in every shard.
+            get_all_products() -> List[Product]: Returns copies of all active products, in catalog order.
+            order(shopping_list: List[Tuple[Product, int]]) -> float: Processes an order & returns total price.
+            close(): Stops the worker processes.
+    """
+
+    def __init__(self, initial_products: List[Product], workers: int = 2):
+        """
+                Starts the worker processes and hands each one its share of the products.
+
+                Args:
+                    initial_products (List[Product]): The products of the store.
+                    workers (int): The number of worker processes.
+        """
+        if workers <= 0:
+            raise ValueError("The number of workers must be greater than zero.")
+        self.workers = workers
+        self._positions = {product.name: position for position, product in enumerate(initial_products)}
+        if len(self._positions) != len(initial_products):
+            raise ValueError("Product names must be unique.")
+        shards: List[List[Product]] = [[] for _ in range(workers)]
+        for product in initial_products:
+            shards[shard_of(product.name, workers)].append(product)
+        self._connections = []
+        self._processes = []
+        self._locks = [threading.Lock() for _ in range(workers)]
+        self._transactions = itertools.count()
+        for shard_products in shards:
+            parent, child = multiprocessing.Pipe()
+            # Products are pickled explicitly so that a forked worker does not inherit the
+            # listeners of a store in this process.
+            process = multiprocessing.Process(target=_shard_main, args=(child, pickle.dumps(shard_products)),
+                                              daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _call_many(self, calls: Dict[int, Tuple[str, tuple]]) -> Dict[int, Tuple[bool, object]]:
+        """
+            Sends one command to each of several shards and waits for all the replies. Shard
+            connections are locked in index order, so concurrent callers cannot deadlock.
+        """
+        with ExitStack() as stack:
+            for shard in sorted(calls):
+                stack.enter_context(self._locks[shard])
+            for shard, call in calls.items():
+                self._connections[shard].send(call)
+            return {shard: self._connections[shard].recv() for shard in calls}
+
+    def _call(self, shard: int, command: str, *args):
+        ok, result = self._call_many({shard: (command, args)})[shard]
+        if not ok:
+            raise ValueError(result)
+        return result
+
+    def get_product(self, name: str) -> Product:
+        return self._call(shard_of(name, self.workers), "get", name)
+
+    def get_total_quantity(self) -> int:
+        replies = self._call_many({shard: ("total", ()) for shard in range(self.workers)})
+        return sum(result for _, result in replies.values())
+
+    def get_all_products(self) -> List[Product]:
+        replies = self._call_many({shard: ("products", ()) for shard in range(self.workers)})
+        products = [product for _, result in replies.values() for product in result]
+        return sorted(products, key=lambda product: self._positions[product.name])
+
+    def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
+        """
+            Processes an order, purchasing the specified quantities of products.
+
+            An order within one shard is processed by that shard directly. An order across
+            shards is first reserved in every shard involved; if any shard rejects its part,
+            the other reservations are released, otherwise they are all committed.
+
+            Raises:
+                ValueError: If any line of the order cannot be completed.
+        """
+        items_by_shard: Dict[int, List[Tuple[str, int]]] = {}
+        for product, quantity in shopping_list:
+            items_by_shard.setdefault(shard_of(product.name, self.workers), []).append((product.name, quantity))
+        if not items_by_shard:
+            return 0.0
+        if len(items_by_shard) == 1:
+            shard, items = next(iter(items_by_shard.items()))
+            return self._call(shard, "order", items)
+
+        transaction = next(self._transactions)
+        replies = self._call_many({shard: ("prepare", (transaction, items))
+                                   for shard, items in items_by_shard.items()})
+        errors = [result for ok, result in replies.values() if not ok]
+        decision = "abort" if errors else "commit"
+        self._call_many({shard: (decision, (transaction,)) for shard, (ok, _) in replies.items() if ok})
+        if errors:
+            raise ValueError(errors[0])
+        return from_cents(sum(result for _, result in replies.values()))
+
+    def close(self):
+        """
+            Stops the worker processes.
+        """
+        for lock, connection in zip(self._locks, self._connections):
+            with lock:
+                if not connection.closed:
+                    connection.send(("stop", ()))
+                    connection.close()
+        for process in self._processes:
+            process.join()
@@ -0,0 +1,223 @@
+"""
+    Binary snapshots of a Store.
+
+    A snapshot keeps every product's class, name, price in cents, quantity, purchase limit, active flag
+    and promotion in a columnar file: a fixed header, then one typed column per field, then
+    the NUL-separated names and the promotions. Loading memory-maps the file and reads each
+    column with a zero-copy cast, and products are rebuilt without running the constructor's
+    validation again, since the data was valid when it was saved. The store then indexes them
+    in bulk, with the garbage collector paused: the new objects are all kept, and would
+    otherwise be traced over and over while the heap grows.
+"""
+import gc
+import json
+import mmap
+import os
+import struct
+from array import array
+from contextlib import contextmanager
+from typing import Dict, List, Type
+
+from products import Product, NonStockedProduct, LimitedProduct, Promotion, SecondHalfPrice, ThirdOneFree, \
+    PercentDiscount
+from promotion_engine import CompiledPromotion, compile_promotion
+from store import Store
+
+MAGIC = b"BBSNAP02"
+HEADER = struct.Struct("<8sQQQ")  # magic, product count, names size, promotions size
+
+PRODUCT_KINDS: List[Type[Product]] = [Product, NonStockedProduct, LimitedProduct]
+
+PROMOTION_TYPES: Dict[str, Type[Promotion]] = {
+    promotion_class.__name__: promotion_class
+    for promotion_class in (SecondHalfPrice, ThirdOneFree, PercentDiscount, CompiledPromotion)
+}
+
+
+def register_promotion_type(promotion_class: Type[Promotion]) -> Type[Promotion]:
+    """
+        Allows promotions of the given class to be saved in snapshots. Can be used as a class decorator.
+
+        Args:
+            promotion_class (Type[Promotion]): A promotion class whose state is its instance attributes.
+    """
+    PROMOTION_TYPES[promotion_class.__name__] = promotion_class
+    return promotion_class
+
+
+def _product_kind(product: Product) -> int:
+    for kind in range(len(PRODUCT_KINDS) - 1, -1, -1):
+        if isinstance(product, PRODUCT_KINDS[kind]):
+            return kind
+    raise ValueError(f"Cannot save {type(product).__name__} in a snapshot.")
+
+
+def _encode_promotion(promotion: Promotion) -> dict:
+    type_name = type(promotion).__name__
+    if PROMOTION_TYPES.get(type_name) is not type(promotion):
+        raise ValueError(f"Cannot save promotion type {type_name} in a snapshot.")
+    if isinstance(promotion, CompiledPromotion):
+        # The pricing function is code; the description it was compiled from rebuilds it.
+        return {"type": type_name, "name": promotion.name, "spec": promotion.spec}
+    return {"type": type_name, "state": vars(promotion)}
+
+
+def _decode_promotion(data: dict) -> Promotion:
+    if "spec" in data:
+        promotion = compile_promotion(data["spec"])
+        promotion.name = data["name"]
+        return promotion
+    promotion_class = PROMOTION_TYPES.get(data.get("type"))
+    if promotion_class is None:
+        raise ValueError(f"Unknown promotion type {data.get('type')!r} in snapshot.")
+    promotion = object.__new__(promotion_class)
+    vars(promotion).update(data["state"])
+    return promotion
+
+
+def save_snapshot(store: Store, path: str):
+    """
+        Saves every product of the store, active or not, to a snapshot file.
+
+        The file is written next to the target and moved into place, so an interrupted
+        save never leaves a partial snapshot behind.
+
+        Args:
+            store (Store): The store to save.
+            path (str): The file to write.
+
+        Raises:
+            ValueError: If a product or promotion type cannot be saved.
+    """
+    products = store.products
+    kinds = bytearray()
+    active = bytearray()
+    prices = array("q")
+    quantities = array("q")
+    maxima = array("q")
+    promotion_indexes = array("i")
+    names = []
+    promotions: List[dict] = []
+    promotion_ids: Dict[int, int] = {}
+
+    for product in products:
+        kinds.append(_product_kind(product))
+        active.append(product.is_active())
+        prices.append(product.price_cents)
+        quantities.append(product.get_quantity())
+        maxima.append(getattr(product, "maximum", 0))
+        if product.promotion is None:
+            promotion_indexes.append(-1)
+        else:
+            if id(product.promotion) not in promotion_ids:
+                promotion_ids[id(product.promotion)] = len(promotions)
+                promotions.append(_encode_promotion(product.promotion))
+            promotion_indexes.append(promotion_ids[id(product.promotion)])
+        if "\0" in product.name:
+            raise ValueError(f"Cannot save product name containing a NUL character: {product.name!r}.")
+        names.append(product.name)
+
+    names = "\0".join(names).encode("utf-8")
+    promotions_blob = json.dumps(promotions).encode("utf-8")
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(products), len(names), len(promotions_blob)))
+        for column in (prices, quantities, maxima, promotion_indexes):
+            file.write(column.tobytes())
+        file.write(kinds)
+        file.write(active)
+        file.write(names)
+        file.write(promotions_blob)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_snapshot(path: str, **store_options) -> Store:
+    """
+        Loads a store from a snapshot file.
+
+        Args:
+            path (str): The snapshot file.
+            **store_options: Extra keyword arguments passed to Store.
+
+        Returns:
+            Store: A store with the saved products, in their saved order.
+
+        Raises:
+            ValueError: If the file is not a snapshot, or holds a promotion this program cannot rebuild.
+    """
+    with _gc_paused(), open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            products = _read_products(view)
+        finally:
+            view.release()
+        return Store(products, **store_options)
+
+
+@contextmanager
+def _gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read_products(view: memoryview) -> List[Product]:
+    if len(view) < HEADER.size:
+        raise ValueError("File is not a store snapshot.")
+    magic, count, names_size, promotions_size = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("File is not a store snapshot.")
+
+    offset = HEADER.size
+    columns = []
+
+    def column(format_code: str, item_size: int):
+        nonlocal offset
+        data = view[offset:offset + count * item_size].cast(format_code)
+        columns.append(data)
+        offset += count * item_size
+        return data
+
+    # The columns are views of the mapped file, which cannot be closed until they are released.
+    try:
+        prices = column("q", 8)
+        quantities = column("q", 8)
+        maxima = column("q", 8)
+        promotion_indexes = column("i", 4)
+        kinds = column("B", 1)
+        active = column("B", 1)
+        names = bytes(view[offset:offset + names_size])
+        offset += names_size
+        promotions = [_decode_promotion(data)
+                      for data in json.loads(bytes(view[offset:offset + promotions_size]).decode("utf-8"))]
+
+        names = names.decode("utf-8").split("\0") if count else []
+        # A promotion index of -1 reads the None after the last promotion.
+        promotions.append(None)
+        new = object.__new__
+        products = []
+        append = products.append
+        for kind, name, price, quantity, maximum, is_active, promotion_index in zip(
+                kinds.tolist(), names, prices.tolist(), quantities.tolist(), maxima.tolist(), active.tolist(),
+                promotion_indexes.tolist()):
+            product = new(PRODUCT_KINDS[kind])
+            product._name = name
+            product._price = price
+            product._quantity = quantity
+            product.active = is_active == 1
+            product.promotion = promotions[promotion_index]
+            product._held = 0
+            product._listeners = ()
+            if kind == 2:
+                product.maximum = maximum
+            append(product)
+    finally:
+        for data in columns:
+            data.release()
+    return products
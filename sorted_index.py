@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterable, Iterator
+
+Key = tuple[object, int]
+
+_MISSING = object()
+
+
+class SortedIndex:
+    """
+        Keeps integer members sorted by a value, for ordered scans that can start anywhere.
+
+        Members are sorted by the key (value, member), so members with equal values keep a
+        stable order and every key is unique, which makes a key usable as a scan cursor.
+        Changes are recorded in O(1) and applied to the sorted list on the next scan, so a
+        burst of changes costs at most one re-sort instead of one list insertion each.
+
+        Methods:
+            set(member, value): Adds a member or changes its value.
+            update(items): Sets many (member, value) pairs at once.
+            discard(member): Removes a member if present.
+            scan(after=None, reverse=False) -> Iterator[Key]: Yields keys in order, starting past a key.
+    """
+
+    def __init__(self):
+        self._keys: list[Key] = []
+        self._values: dict[int, object] = {}
+        self._stale: dict[int, object | None] = {}
+        self._resort = False
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def set(self, member: int, value):
+        """
+                Adds a member with the given value, or changes the value of an existing member.
+        """
+        if member not in self._stale:
+            self._stale[member] = self._values.get(member, _MISSING)
+        self._values[member] = value
+
+    def update(self, items: Iterable[tuple[int, object]]):
+        """
+                Sets many (member, value) pairs at once, as set would one by one.
+        """
+        items = dict(items)
+        if len(items) * 8 > len(self._keys):
+            # The next scan re-sorts everything anyway, so the old values are not needed.
+            if self._values:
+                self._values.update(items)
+            else:
+                self._values = items
+            self._resort = True
+            return
+        for member, value in items.items():
+            self.set(member, value)
+
+    def discard(self, member: int):
+        """
+                Removes a member from the index if it is present.
+        """
+        if member not in self._values:
+            return
+        if member not in self._stale:
+            self._stale[member] = self._values[member]
+        del self._values[member]
+
+    def _flush(self):
+        if not self._stale and not self._resort:
+            return
+        if self._resort or len(self._stale) * 8 > len(self._keys):
+            self._keys = sorted((value, member) for member, value in self._values.items())
+            self._resort = False
+        else:
+            keys = self._keys
+            for member, old_value in self._stale.items():
+                if old_value is not _MISSING:
+                    del keys[bisect_left(keys, (old_value, member))]
+                if member in self._values:
+                    insort(keys, (self._values[member], member))
+        self._stale.clear()
+
+    def scan(self, after: Key | None = None, reverse: bool = False) -> Iterator[Key]:
+        """
+                Yields (value, member) keys in ascending order, or descending if reverse is True,
+                starting with the first key past the given one.
+
+                The index must not change while the scan is running.
+
+                Args:
+                    after (Key, optional): The key to start after, typically the last key of the previous page.
+                    reverse (bool): Scan from the largest value down.
+        """
+        self._flush()
+        keys = self._keys
+        if reverse:
+            index = len(keys) if after is None else bisect_left(keys, after)
+            for position in range(index - 1, -1, -1):
+                yield keys[position]
+        else:
+            index = 0 if after is None else bisect_right(keys, after)
+            for position in range(index, len(keys)):
+                yield keys[position]
+
@@ -0,0 +1,163 @@
+"""
+    Stock level notifications for asyncio subscribers.
+
+    A StockMonitor follows a store's quantity changes and tells its subscribers when a product
+    runs low, sells out, or is restocked, so nothing has to poll the catalog. Each subscriber
+    reads the events from its own bounded asyncio queue; changes made in other threads, such
+    as orders served by a thread pool, are handed to the subscriber's event loop. A subscriber
+    that falls behind loses its oldest events rather than slowing the store down.
+
+    The monitor only follows the store while it has subscribers, and a quantity change that
+    does not cross a threshold is dismissed with two comparisons, so Product.buy and
+    Store.order cost the same as without it.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import namedtuple
+from collections.abc import AsyncIterator
+
+from products import Product
+from store import Store
+
+LOW_STOCK = "low_stock"
+OUT_OF_STOCK = "out_of_stock"
+RESTOCKED = "restocked"
+
+
+class StockEvent(namedtuple("StockEvent", ["kind", "product", "quantity"])):
+    """
+        A product's stock crossing a level.
+
+        Attributes:
+            kind (str): LOW_STOCK when the quantity falls to the product's threshold or below
+                (or comes back from zero to no more than it), OUT_OF_STOCK when it reaches zero,
+                and RESTOCKED when it rises above the threshold.
+            product (Product): The product.
+            quantity (int): Its new quantity.
+    """
+    __slots__ = ()
+
+
+class StockMonitor:
+    """
+        Sends the stock events of a store's products to asyncio subscribers.
+
+        Attributes:
+            low_stock (int): The quantity at or below which products count as low on stock,
+                unless set_threshold gave them their own.
+            dropped (int): The number of events dropped because a subscriber's queue was full.
+
+        Methods:
+            set_threshold(product, threshold): Sets the low-stock threshold of one product.
+            subscribe(maxsize=1000) -> asyncio.Queue: Returns a queue receiving every event.
+            unsubscribe(queue): Stops sending events to a queue.
+            events(maxsize=1000): Yields the events as they come, as an async iterator.
+            close(): Drops every subscriber.
+    """
+
+    def __init__(self, store: Store, low_stock: int = 10):
+        if low_stock < 0:
+            raise ValueError("Low stock threshold cannot be negative.")
+        self._store = store
+        self.low_stock = low_stock
+        self.dropped = 0
+        self._thresholds: dict[str, int] = {}
+        self._subscribers: tuple[tuple[asyncio.AbstractEventLoop, asyncio.Queue], ...] = ()
+        self._lock = threading.Lock()
+
+    def set_threshold(self, product: Product, threshold: int | None):
+        """
+                Sets the quantity at or below which a product counts as low on stock.
+
+                Args:
+                    product (Product): The product.
+                    threshold (int, optional): Its threshold; None to use low_stock again.
+        """
+        if threshold is None:
+            self._thresholds.pop(product.name, None)
+        elif threshold < 0:
+            raise ValueError("Low stock threshold cannot be negative.")
+        else:
+            self._thresholds[product.name] = threshold
+
+    def subscribe(self, maxsize: int = 1000) -> asyncio.Queue:
+        """
+                Returns a new queue that receives every event from now on. Must be called from
+                the event loop the queue will be read in.
+
+                Args:
+                    maxsize (int): The number of unread events kept; older ones are dropped past it.
+
+                Returns:
+                    asyncio.Queue: The queue of StockEvent.
+        """
+        if maxsize <= 0:
+            raise ValueError("Queue size must be greater than zero.")
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._subscribers:
+                self._store.add_listener(self._on_change)
+            self._subscribers += ((loop, queue),)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """
+                Stops sending events to a queue returned by subscribe.
+        """
+        with self._lock:
+            subscribers = tuple(item for item in self._subscribers if item[1] is not queue)
+            if self._subscribers and not subscribers:
+                self._store.remove_listener(self._on_change)
+            self._subscribers = subscribers
+
+    async def events(self, maxsize: int = 1000) -> AsyncIterator[StockEvent]:
+        """
+                Yields every event from now on, until the iteration is stopped.
+        """
+        queue = self.subscribe(maxsize)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+
+    def close(self):
+        """
+                Drops every subscriber and stops following the store.
+        """
+        with self._lock:
+            if self._subscribers:
+                self._store.remove_listener(self._on_change)
+            self._subscribers = ()
+
+    def _on_change(self, product: Product, attribute: str, old_value, new_value):
+        if attribute != "quantity":
+            return
+        threshold = self._thresholds.get(product.name, self.low_stock)
+        if old_value > threshold and new_value > threshold:
+            return
+        if new_value == 0:
+            kind = OUT_OF_STOCK if old_value else None
+        elif new_value <= threshold:
+            kind = LOW_STOCK if old_value > threshold or old_value == 0 else None
+        else:
+            kind = RESTOCKED
+        if kind is not None:
+            self._emit(StockEvent(kind, product, new_value))
+
+    def _emit(self, event: StockEvent):
+        for loop, queue in self._subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop is closed.
+                self.unsubscribe(queue)
+
+    def _deliver(self, queue: asyncio.Queue, event: StockEvent):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(event)
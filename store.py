@@ -1,29 +1,175 @@
-from typing import List, Tuple
-from products import Product
+from __future__ import annotations
+
+import math
+import operator
+import threading
+import warnings
+from collections import namedtuple
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from money import from_cents, to_cents
+from products import NonStockedProduct, Product
+from promotion_engine import Bundle, price_with_bundles
+from search import NameIndex
+from sorted_index import SortedIndex
+
+LOCK_STRIPES = 64
+QUOTE_CACHE_SIZE = 4096
+
+
+class OrderResult(namedtuple("OrderResult", ["total_price", "error"])):
+    """
+        The outcome of one order in a batch: the total price if it was accepted,
+        otherwise the reason it was rejected.
+
+        Attributes:
+            total_price (float, optional): The total price of the order.
+            error (str, optional): Why the order was rejected.
+    """
+    __slots__ = ()
+
+
+class PreparedOrder(namedtuple("PreparedOrder", ["total_cents", "lines", "taken"])):
+    """
+        An order whose stock has been taken by Store.prepare_order, waiting for
+        Store.commit_order or Store.abort_order.
+
+        Attributes:
+            total_cents (int): The total price of the order in cents.
+            lines (List[Tuple[Product, int, int]]): Each line's product, quantity and price charged in cents.
+            taken (Tuple[Tuple[Product, int, bool], ...]): The units taken from each product, and
+                whether the product was active before.
+    """
+    __slots__ = ()
+
+
+class QuoteLine(namedtuple("QuoteLine", ["product", "quantity", "list_price", "price", "promotion"])):
+    """
+        One line of a quote.
+
+        Attributes:
+            product (Product): The product of the line.
+            quantity (int): The quantity ordered.
+            list_price (float): The price of the quantity before any promotion.
+            price (float): The price of the quantity with the product's promotion.
+            promotion (str, optional): The name of the promotion applied, if any.
+    """
+    __slots__ = ()
+
+
+class Quote(namedtuple("Quote", ["lines", "bundle_discount", "total_price"])):
+    """
+        The price an order would have now, line by line.
+
+        Attributes:
+            lines (Tuple[QuoteLine, ...]): The lines of the order, in the order given.
+            bundle_discount (float): The amount taken off the lines by bundles.
+            total_price (float): What Store.order would charge.
+    """
+    __slots__ = ()
+
+
+class ProductPage(namedtuple("ProductPage", ["products", "next_cursor"])):
+    """
+        One page of a product listing, and the cursor to pass back for the next page,
+        or None if this is the last page.
+
+        Attributes:
+            products (List[Product]): The products of the page.
+            next_cursor (Tuple, optional): The cursor of the next page.
+    """
+    __slots__ = ()
 
 
 class Store:
     """
         A class representing a store that manages a collection of products.
 
+        Products are indexed by name, so lookups and removals take constant time, and the
+        set of active products is kept up to date as products are activated or deactivated
+        instead of being filtered on every call. Inventory totals are maintained the same way,
+        by applying each change as it happens, so reading them never scans the catalog.
+
         Attributes:
-            products (List[Product]): A list of products available in the store.
+            products (Tuple[Product, ...]): The products of the store, as a read-only tuple.
+            journal (OrderJournal, optional): If set, the stock changes of every order are written to it
+                before they are applied, and the order returns once they are on disk. See journal.OrderJournal.
+            ledger (OrderLedger, optional): If set, the lines of every accepted order are recorded in it.
+                See order_ledger.OrderLedger.
 
         Methods:
             add_product(product: Product): Adds a product to the store's inventory.
+            add_products(products, skip_duplicates=False) -> List[Product]: Adds many products at once.
             remove_product(product: Product): Removes a product from the store's inventory.
+            get_product(name: str) -> Product: Returns the product with the given name.
+            add_bundle(bundle: Bundle): Adds a deal pricing several products together in orders.
             get_total_quantity() -> int: Returns the total quantity of all products in the store.
+            get_stock_value() -> float: Returns the value of all stock at list price.
+            get_active_count() -> int: Returns the number of active products.
+            check_aggregates(): Recounts the inventory totals and checks them against the running ones.
             get_all_products() -> List[Product]: Returns a list of all active products in the store.
+            get_page(limit, cursor, sort_by, ...filters) -> ProductPage: Returns one page of a sorted, filtered listing.
+            iter_products(...filters) -> Iterator[Product]: Yields a sorted, filtered listing page by page.
+            search(query, limit, mode) -> List[Product]: Finds products by name prefix, substring or fuzzy match.
             order(shopping_list: List[Tuple[Product, int]]) -> float:Processes an order from store & returns total price
+            process_orders(batch) -> List[OrderResult]: Processes a batch of orders with one stock update per product.
+            prepare_order(shopping_list) -> PreparedOrder: Takes the stock of an order, to be committed or aborted.
+            commit_order(prepared): Completes a prepared order.
+            abort_order(prepared): Puts the stock of a prepared order back.
+            quote(shopping_list) -> Quote: Prices an order line by line without buying anything.
+            restock(deliveries) -> int: Adds stock to many products at once, reactivating sold-out ones.
+            hold(product, quantity): Reserves units of a product so that orders can no longer take them.
+            release_hold(product, quantity): Makes reserved units available again.
+            add_housekeeping(callback): Registers work to run before the store reads availability.
     """
-    def __init__(self, initial_products: List[Product]):
+    def __init__(self, initial_products: list[Product], debug: bool = False):
         """
                 Initializes the Store with a list of products.
 
                 Args:
                     initial_products (List[Product]): A list of products to be added to the store's inventory.
+                    debug (bool): If True, the running inventory totals are checked against a full
+                        recount after every change. This is slow and meant for tests.
+        """
+        self.debug = debug
+        self.journal = None
+        self.ledger = None
+        self._listeners: list[Callable[[Product, str, object, object], None]] = []
+        self._version = 0
+        # The store version at each product's last change, and at the last change of the bundles,
+        # which tell when a cached quote is out of date.
+        self._changed: dict[Product, int] = {}
+        self._bundles_changed = 0
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._state_lock = threading.RLock()
+        self._catalog: dict[str, Product] = {}
+        # The positions of the active products, so they list in catalog order.
+        self._active = SortedIndex()
+        self._positions: dict[str, int] = {}
+        self._by_position: dict[int, Product] = {}
+        self._sort_indexes = {"position": SortedIndex(), "price": SortedIndex(), "quantity": SortedIndex()}
+        self._name_index: NameIndex | None = None
+        # Built on the first search, under its own lock, while the catalog changes made
+        # meanwhile are logged here as (position, name or None) to be replayed.
+        self._name_index_lock = threading.Lock()
+        self._name_changes: list[tuple[int, str | None]] | None = None
+        self._bundles: list[Bundle] = []
+        self._next_position = 0
+        self._total_quantity = 0
+        self._stock_value = 0
+        self._quotes: dict[tuple, tuple[int, Quote | str]] = {}
+        self._quote_lock = threading.Lock()
+        self._housekeeping: list[Callable[[], object]] = []
+        self.add_products(initial_products)
+
+    @property
+    def products(self) -> tuple[Product, ...]:
         """
-        self.products = initial_products
+                Returns every product in the store, active or not, in the order they were added.
+                Use add_product and remove_product to change them.
+        """
+        with self._state_lock:
+            return tuple(self._catalog.values())
 
     def add_product(self, product: Product):
         """
@@ -31,8 +177,77 @@ class Store:
 
                 Args:
                     product (Product): The product to be added.
+
+                Raises:
+                    ValueError: If another product with the same name is already in the store.
+        """
+        self.add_products([product])
+
+    def add_products(self, products: Iterable[Product], skip_duplicates: bool = False) -> list[Product]:
         """
-        self.products.append(product)
+                Adds many products under a single lock, checking the totals once at the end.
+
+                Args:
+                    products (Iterable[Product]): The products to add, in order.
+                    skip_duplicates (bool): Leave out products whose name is already in the store, or
+                        earlier in products, instead of failing.
+
+                Returns:
+                    List[Product]: The products left out, which is empty unless skip_duplicates is True.
+
+                Raises:
+                    ValueError: If a name is already in the store and skip_duplicates is False. The
+                        products before it are added.
+        """
+        # The products are checked one by one, then every index is updated in bulk.
+        listener = self._on_product_change
+        catalog = self._catalog
+        new: dict[str, Product] = {}
+        skipped = []
+        error = None
+        with self._state_lock:
+            for product in products:
+                name = product.name
+                if name in catalog or name in new:
+                    if skip_duplicates:
+                        skipped.append(product)
+                        continue
+                    error = ValueError(f"Product '{name}' is already in the store.")
+                    break
+                new[name] = product
+            added = list(new.values())
+            start = self._next_position
+            # One int object per position, shared by every index.
+            positions = list(range(start, start + len(added)))
+            prices = [product.price_cents for product in added]
+            quantities = [product.get_quantity() for product in added]
+            catalog.update(new)
+            self._positions.update(zip(new, positions))
+            self._by_position.update(zip(positions, added))
+            self._active.update((position, position) for position, product in zip(positions, added) if product.active)
+            self._sort_indexes["position"].update(zip(positions, positions))
+            self._sort_indexes["price"].update(zip(positions, prices))
+            self._sort_indexes["quantity"].update(zip(positions, quantities))
+            if self._name_index is not None:
+                for position, name in zip(positions, new):
+                    self._name_index.add(position, name)
+            elif self._name_changes is not None:
+                self._name_changes.extend(zip(positions, new))
+            for product in added:
+                product.add_listener(listener)
+            self._next_position += len(added)
+            self._total_quantity += sum(quantities)
+            self._stock_value += sum(map(operator.mul, prices, quantities))
+            self._version += len(added)
+            self._changed.update(dict.fromkeys(added, self._version))
+            for store_listener in self._listeners:
+                for product in added:
+                    store_listener(product, "added", None, None)
+            if self.debug:
+                self.check_aggregates()
+        if error is not None:
+            raise error
+        return skipped
 
     def remove_product(self, product: Product):
         """
@@ -41,7 +256,74 @@ class Store:
                 Args:
                     product (Product): The product to be removed.
         """
-        self.products = [item for item in self.products if item != product]
+        with self._state_lock:
+            if self._catalog.get(product.name) is not product:
+                return
+            del self._catalog[product.name]
+            position = self._positions.pop(product.name)
+            del self._by_position[position]
+            for index in self._sort_indexes.values():
+                index.discard(position)
+            if self._name_index is not None:
+                self._name_index.discard(position)
+            elif self._name_changes is not None:
+                self._name_changes.append((position, None))
+            self._active.discard(position)
+            self._total_quantity -= product.get_quantity()
+            self._stock_value -= product.price_cents * product.get_quantity()
+            product.remove_listener(self._on_product_change)
+            self._version += 1
+            del self._changed[product]
+            for listener in self._listeners:
+                listener(product, "removed", None, None)
+            if self.debug:
+                self.check_aggregates()
+
+    def add_bundle(self, bundle: Bundle):
+        """
+                Adds a bundle deal, applied to every order holding its products. Bundles are
+                tried in the order they were added.
+
+                Args:
+                    bundle (Bundle): The bundle to add.
+
+                Raises:
+                    ValueError: If a product of the bundle is not in the store.
+        """
+        with self._state_lock:
+            for name in bundle.items:
+                self.get_product(name)
+            self._bundles.append(bundle)
+            self._version += 1
+            self._bundles_changed = self._version
+
+    def remove_bundle(self, bundle: Bundle):
+        """
+                Removes a bundle deal added with add_bundle.
+        """
+        with self._state_lock:
+            if bundle in self._bundles:
+                self._bundles.remove(bundle)
+                self._version += 1
+                self._bundles_changed = self._version
+
+    def get_product(self, name: str) -> Product:
+        """
+                Looks up a product by its name.
+
+                Args:
+                    name (str): The name of the product.
+
+                Returns:
+                    Product: The product with the given name.
+
+                Raises:
+                    ValueError: If no product with that name is in the store.
+        """
+        try:
+            return self._catalog[name]
+        except KeyError:
+            raise ValueError(f"Product '{name}' is not in the store.") from None
 
     def get_total_quantity(self) -> int:
         """
@@ -50,24 +332,344 @@ class Store:
                 Returns:
                     int: The total quantity of all products.
         """
-        return sum(product.get_quantity() for product in self.products)
+        return self._total_quantity
+
+    def get_stock_value(self) -> float:
+        """
+                Returns the value of all products in the store at their list price.
+
+                Returns:
+                    float: The sum of price times quantity over all products.
+        """
+        return from_cents(self._stock_value)
+
+    def get_active_count(self) -> int:
+        """
+                Returns the number of active products in the store.
 
-    def get_all_products(self) -> List[Product]:
+                Returns:
+                    int: The number of active products.
+        """
+        return len(self._active)
+
+    def check_aggregates(self):
+        """
+                Recounts the inventory totals over the whole catalog and compares them with the
+                running totals.
+
+                Raises:
+                    RuntimeError: If a running total does not match the recount.
+        """
+        with self._state_lock:
+            total_quantity = sum(product.get_quantity() for product in self._catalog.values())
+            stock_value = sum(product.price_cents * product.get_quantity() for product in self._catalog.values())
+            active_count = sum(1 for product in self._catalog.values() if product.is_active())
+            if total_quantity != self._total_quantity:
+                raise RuntimeError(f"Total quantity is {self._total_quantity}, recount gives {total_quantity}.")
+            if stock_value != self._stock_value:
+                raise RuntimeError(f"Stock value is {self._stock_value}, recount gives {stock_value}.")
+            if active_count != len(self._active):
+                raise RuntimeError(f"Active count is {len(self._active)}, recount gives {active_count}.")
+
+    def get_all_products(self) -> list[Product]:
         """
-                Retrieves a list of all active products in the store.
+                Retrieves a list of all active products in the store. Products whose stock is partly
+                reserved for carts report the rest through get_available() and show().
 
                 Returns:
                     List[Product]: A list of active products.
         """
-        return [product for product in self.products if product.is_active()]
+        if self._housekeeping:
+            self._housekeep()
+        with self._state_lock:
+            by_position = self._by_position
+            return [by_position[position] for _, position in self._active.scan()]
+
+    def get_page(self, limit: int = 20, cursor: tuple[object, int] | None = None, sort_by: str | None = None,
+                 descending: bool = False, min_price: float | None = None, max_price: float | None = None,
+                 in_stock: bool | None = None, has_promotion: bool | None = None,
+                 name_prefix: str | None = None, include_inactive: bool = False) -> ProductPage:
+        """
+                Returns one page of the store's products, filtered and sorted.
+
+                Products are read from indexes kept sorted by catalog order, price and quantity, so
+                a page costs time in proportion to the products it scans, not to the catalog size.
+                The cursor is a position in the sort order, so pages stay consistent when products
+                before the cursor change.
+
+                Args:
+                    limit (int): The maximum number of products on the page.
+                    cursor (Tuple, optional): The next_cursor of the previous page; None for the first page.
+                    sort_by (str, optional): "price" or "quantity"; None keeps the order products were added in.
+                        Ties are kept in the order products were added in, reversed when descending.
+                    descending (bool): Sort from the largest value down.
+                    min_price (float, optional): Only include products costing at least this much.
+                    max_price (float, optional): Only include products costing at most this much.
+                    in_stock (bool, optional): Only include products with (True) or without (False) stock.
+                    has_promotion (bool, optional): Only include products with (True) or without (False) a promotion.
+                    name_prefix (str, optional): Only include products whose name starts with this, ignoring case.
+                    include_inactive (bool): Include inactive products too.
+
+                Returns:
+                    ProductPage: The products of the page and the cursor of the next page.
+
+                Raises:
+                    ValueError: If sort_by or limit is invalid.
+        """
+        if limit <= 0:
+            raise ValueError("Page limit must be greater than zero.")
+        if self._housekeeping:
+            self._housekeep()
+        index = self._sort_indexes.get(sort_by or "position")
+        if index is None or sort_by == "position":
+            raise ValueError(f"Cannot sort products by {sort_by!r}.")
+        prefix = name_prefix.casefold() if name_prefix else None
+        # Prices are indexed in cents.
+        min_price = to_cents(min_price) if min_price is not None else None
+        max_price = to_cents(max_price) if max_price is not None else None
+
+        def matches(product: Product) -> bool:
+            return ((include_inactive or product.is_active())
+                    and (min_price is None or product.price_cents >= min_price)
+                    and (max_price is None or product.price_cents <= max_price)
+                    and (in_stock is None or (product.get_quantity() > 0) == in_stock)
+                    and (has_promotion is None or (product.promotion is not None) == has_promotion)
+                    and (prefix is None or product.name.casefold().startswith(prefix)))
+
+        after = tuple(cursor) if cursor is not None else None
+        # Sorted by price, a price range is a contiguous run of the index: start at one end
+        # of it and stop past the other.
+        stop_at = None
+        if sort_by == "price":
+            start_at, stop_at = (max_price, min_price) if descending else (min_price, max_price)
+            if after is None and start_at is not None:
+                after = (start_at, math.inf) if descending else (start_at, -1)
+        products = []
+        next_cursor = None
+        with self._state_lock:
+            for key in index.scan(after, descending):
+                if stop_at is not None and (key[0] < stop_at if descending else key[0] > stop_at):
+                    break
+                product = self._by_position[key[1]]
+                if matches(product):
+                    products.append(product)
+                    if len(products) == limit:
+                        next_cursor = key
+                        break
+        return ProductPage(products, next_cursor)
+
+    def iter_products(self, page_size: int = 256, **filters) -> Iterator[Product]:
+        """
+                Yields the store's products one page at a time, so the whole catalog is never
+                copied at once.
+
+                Args:
+                    page_size (int): The number of products fetched per page.
+                    **filters: The sorting and filtering arguments of get_page.
+        """
+        cursor = None
+        while True:
+            page = self.get_page(limit=page_size, cursor=cursor, **filters)
+            yield from page.products
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    def search(self, query: str, limit: int = 20, mode: str = "substring",
+               include_inactive: bool = False) -> list[Product]:
+        """
+                Finds products by name, ignoring case.
+
+                The name index is built on the first search and then kept up to date as products
+                are added and removed. Orders go on while it is built.
+
+                Args:
+                    query (str): The text to look for.
+                    limit (int): The maximum number of products returned.
+                    mode (str): "prefix" for names starting with the query, "substring" for names
+                        containing it, or "fuzzy" for names containing something close to it.
+                    include_inactive (bool): Include inactive products too.
+
+                Returns:
+                    List[Product]: The matching products; by name for prefix searches, best match
+                    first for fuzzy searches, and in catalog order otherwise.
+
+                Raises:
+                    ValueError: If the mode is unknown.
+        """
+        if mode not in ("prefix", "substring", "fuzzy"):
+            raise ValueError(f"Unknown search mode {mode!r}.")
+        name_index = self._name_index
+        if name_index is None:
+            name_index = self._build_name_index()
+        with self._state_lock:
+            members = getattr(name_index, mode)(query)
+            products = []
+            for position in members:
+                product = self._by_position[position]
+                if include_inactive or product.is_active():
+                    products.append(product)
+                    if len(products) == limit:
+                        break
+            return products
+
+    def _build_name_index(self) -> NameIndex:
+        """
+                Builds the name index outside the state lock, then replays the catalog changes made
+                while it was built.
+        """
+        with self._name_index_lock:
+            if self._name_index is not None:
+                return self._name_index
+            with self._state_lock:
+                names = list(self._positions.items())
+                self._name_changes = []
+            name_index = NameIndex()
+            for name, position in names:
+                name_index.add(position, name)
+            with self._state_lock:
+                for position, name in self._name_changes:
+                    if name is None:
+                        name_index.discard(position)
+                    else:
+                        name_index.add(position, name)
+                self._name_changes = None
+                self._name_index = name_index
+            return name_index
+
+    def _on_product_change(self, product: Product, attribute: str, old_value, new_value):
+        """
+                Keeps the active-products index and inventory totals in sync with product changes.
+        """
+        with self._state_lock:
+            self._version += 1
+            self._changed[product] = self._version
+            if attribute == "quantity":
+                self._total_quantity += new_value - old_value
+                self._stock_value += product.price_cents * (new_value - old_value)
+                self._sort_indexes["quantity"].set(self._positions[product.name], new_value)
+            elif attribute == "price":
+                self._stock_value += (new_value - old_value) * product.get_quantity()
+                self._sort_indexes["price"].set(self._positions[product.name], new_value)
+            elif attribute == "active":
+                self._update_active(product, new_value)
+            if self.debug:
+                self.check_aggregates()
+            for listener in self._listeners:
+                listener(product, attribute, old_value, new_value)
+
+    @property
+    def version(self) -> int:
+        """
+                A counter that changes whenever a product is added, removed or changed.
+        """
+        return self._version
 
-    def order(self, shopping_list: List[Tuple[Product, int]]) -> float:
+    def add_listener(self, listener: Callable[[Product, str, object, object], None]):
+        """
+                Registers a callback notified of every change to the store's products.
+
+                The callback is called as listener(product, attribute, old_value, new_value), with the
+                attributes products report ("quantity", "price", "held", "active", "promotion"), plus
+                "added" and "removed" when a product enters or leaves the store. Prices are reported in
+                cents. It runs while the store is locked, so it must be quick and must not call back
+                into the store.
+
+                Args:
+                    listener (callable): The callback to register.
+        """
+        with self._state_lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Product, str, object, object], None]):
+        """
+                Unregisters a callback previously passed to add_listener.
+        """
+        with self._state_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _update_active(self, product: Product, active: bool):
+        position = self._positions[product.name]
+        if active:
+            self._active.set(position, position)
+        else:
+            self._active.discard(position)
+
+    def add_housekeeping(self, callback: Callable[[], object]):
+        """
+                Registers a callback run before the store reads what is available: at the start of
+                order, process_orders, quote, get_page and get_all_products. Reservation managers use
+                it to release expired holds before they can block a sale. The callback runs before
+                any lock is taken, so it may call back into the store.
+
+                Args:
+                    callback (callable): Called with no arguments.
+        """
+        with self._state_lock:
+            self._housekeeping.append(callback)
+
+    def remove_housekeeping(self, callback: Callable[[], object]):
+        """
+                Unregisters a callback previously passed to add_housekeeping.
+        """
+        with self._state_lock:
+            if callback in self._housekeeping:
+                self._housekeeping.remove(callback)
+
+    def _housekeep(self):
+        for callback in self._housekeeping:
+            callback()
+
+    def hold(self, product: Product, quantity: int):
+        """
+                Reserves units of a product, on top of those already reserved, so that orders can
+                no longer take them. Release them with release_hold, or buy them by passing them
+                as held to order.
+
+                Args:
+                    product (Product): A product of the store.
+                    quantity (int): The units to reserve.
+
+                Raises:
+                    ValueError: If the product is not active or not enough of it is available.
+        """
+        locks = self._acquire(((product, quantity),))
+        try:
+            if not product.is_active():
+                raise ValueError(f"Product '{product.name}' is not active and cannot be reserved.")
+            product.validate_purchase(quantity)
+            product.set_held(product.get_held() + quantity)
+        finally:
+            self._release(locks)
+
+    def release_hold(self, product: Product, quantity: int):
+        """
+                Makes units reserved with hold available to every order again.
+
+                Raises:
+                    ValueError: If fewer units than that are reserved.
+        """
+        locks = self._acquire(((product, quantity),))
+        try:
+            product.set_held(product.get_held() - quantity)
+        finally:
+            self._release(locks)
+
+    def order(self, shopping_list: list[tuple[Product, int]], held: dict[Product, int] | None = None) -> float:
         """
             Processes an order, purchasing the specified quantities of products.
 
+            The order is all-or-nothing: every line is checked before any stock is taken, and
+            if one line fails no product is changed. The products in the order are locked for
+            the duration, so concurrent orders cannot oversell them, while orders for other
+            products proceed in parallel.
+
             Args:
                 shopping_list (List[Tuple[Product, int]]): A list of tuples where each tuple contains a product and
                 the quantity to purchase.
+                held (Dict[Product, int], optional): Units of the ordered products reserved with hold for
+                    this order. They are released as the order takes its stock, and stay reserved if it fails.
 
             Returns:
                 float: The total price of the order.
@@ -75,17 +677,362 @@ class Store:
             Raises:
                 ValueError: If a product in the order is not active or if the purchase cannot be completed.
         """
-        total_price = 0.0
+        if self._housekeeping:
+            self._housekeep()
+        locks = self._acquire(shopping_list)
+        try:
+            total_cents, demand, lines = self._prepare_order(shopping_list, held=held)
+            if held:
+                for product, quantity in held.items():
+                    product.set_held(max(product.get_held() - quantity, 0))
+            ticket = self._take_stock(demand)
+        finally:
+            self._release(locks)
+        self._wait_durable(ticket)
+        self._after_commit((lines,))
+        return from_cents(total_cents)
+
+    def process_orders(self, batch: list[list[tuple[Product, int]]],
+                       priority: Callable[[list[tuple[Product, int]]], object] | None = None) -> list[OrderResult]:
+        """
+            Processes many orders at once, taking stock from each product only once for the whole batch.
+
+            Orders are served in batch order, or in ascending order of priority(order) if a priority
+            function is given. Each order is all-or-nothing: it is accepted only if all of its lines
+            can be filled from the stock left by the orders served before it. A rejected order takes
+            no stock, so later orders may still be filled.
+
+            Args:
+                batch (List[List[Tuple[Product, int]]]): The shopping lists to process.
+                priority (Callable, optional): Returns a sort key for an order; lower keys are served first.
+
+            Returns:
+                List[OrderResult]: One result per order, in the same order as the batch.
+        """
+        if self._housekeeping:
+            self._housekeep()
+        results: list[OrderResult | None] = [None] * len(batch)
+        indices = range(len(batch))
+        if priority is not None:
+            indices = sorted(indices, key=lambda index: priority(batch[index]))
+        accepted = []
+        locks = self._acquire([line for shopping_list in batch for line in shopping_list])
+        try:
+            taken: dict[Product, int] = {}
+            for index in indices:
+                try:
+                    total_cents, demand, lines = self._prepare_order(batch[index], taken)
+                except ValueError as e:
+                    results[index] = OrderResult(None, str(e))
+                    continue
+                for product, quantity in demand.items():
+                    taken[product] = taken.get(product, 0) + quantity
+                results[index] = OrderResult(from_cents(total_cents), None)
+                accepted.append(lines)
+            ticket = self._take_stock(taken)
+        finally:
+            self._release(locks)
+        self._wait_durable(ticket)
+        self._after_commit(accepted)
+        return results
+
+    def prepare_order(self, shopping_list: list[tuple[Product, int]]) -> PreparedOrder:
+        """
+            Checks and prices an order as Store.order would, and takes its stock, without
+            completing it yet. The first phase of an order that must agree with other stores.
+
+            Args:
+                shopping_list (List[Tuple[Product, int]]): The products and quantities to purchase.
+
+            Returns:
+                PreparedOrder: The order, to pass to commit_order or abort_order.
+
+            Raises:
+                ValueError: If the order could not be completed. No stock is taken.
+        """
+        if self._housekeeping:
+            self._housekeep()
+        locks = self._acquire(shopping_list)
+        try:
+            total_cents, demand, lines = self._prepare_order(shopping_list)
+            taken = tuple((product, quantity, product.is_active()) for product, quantity in demand.items())
+            ticket = self._take_stock(demand)
+        finally:
+            self._release(locks)
+        self._wait_durable(ticket)
+        return PreparedOrder(total_cents, lines, taken)
+
+    def commit_order(self, prepared: PreparedOrder):
+        """
+            Completes an order prepared with prepare_order, recording it as Store.order would.
+        """
+        self._after_commit((prepared.lines,))
+
+    def abort_order(self, prepared: PreparedOrder):
+        """
+            Cancels an order prepared with prepare_order, putting its stock back and reactivating
+            the products it sold out.
+        """
+        locks = self._acquire([(product, quantity) for product, quantity, _ in prepared.taken])
+        try:
+            ticket = self._take_stock({product: -quantity for product, quantity, _ in prepared.taken})
+            for product, _, was_active in prepared.taken:
+                if was_active:
+                    product.activate()
+        finally:
+            self._release(locks)
+        self._wait_durable(ticket)
+
+    def quote(self, shopping_list: list[tuple[Product, int]], held: dict[Product, int] | None = None) -> Quote:
+        """
+            Prices an order as Store.order would, without taking any stock.
+
+            The order is checked and priced by the same code as Store.order, so a quote fails
+            exactly when the order would. Quotes, and the reasons they fail, are cached by the
+            contents of the shopping list and held units, and kept until one of their products or
+            the bundles change, so asking again for the same cart costs a dictionary lookup even
+            while other products are being ordered.
+
+            Args:
+                shopping_list (List[Tuple[Product, int]]): The products and quantities to price.
+                held (Dict[Product, int], optional): Units of the products reserved with hold for this
+                    order, as passed to order.
+
+            Returns:
+                Quote: The price of each line, the bundle discount and the total.
+
+            Raises:
+                ValueError: If the order could not be completed now.
+        """
+        if self._housekeeping:
+            self._housekeep()
+        # The version is read first: a change while pricing leaves an entry that never matches.
+        version = self._version
+        cart = tuple(shopping_list)
+        try:
+            key = (cart, tuple(held.items())) if held else cart
+            cached = self._quotes.get(key)
+        except TypeError:
+            # Lines given as lists.
+            cart = tuple((product, quantity) for product, quantity in shopping_list)
+            key = (cart, tuple(held.items())) if held else cart
+            cached = self._quotes.get(key)
+        result = None
+        if cached is not None and cached[0] >= self._bundles_changed:
+            # The entry holds while none of its products has changed since it was priced.
+            result = cached[1]
+            changed = self._changed
+            for product, _ in cart:
+                if changed.get(product, math.inf) > cached[0]:
+                    result = None
+                    break
+        if result is None:
+            try:
+                locks = self._acquire(cart)
+                try:
+                    lines, lines_cents, _ = self._price_lines(cart, held=held)
+                    total_cents = price_with_bundles(lines, self._bundles)[0] if self._bundles else lines_cents
+                finally:
+                    self._release(locks)
+                result = Quote(tuple(QuoteLine(product, quantity, from_cents(product.price_cents * quantity),
+                                               from_cents(line_cents),
+                                               product.promotion.name if product.promotion else None)
+                                     for product, quantity, line_cents in lines),
+                               from_cents(lines_cents - total_cents), from_cents(total_cents))
+            except ValueError as e:
+                result = str(e)
+            with self._quote_lock:
+                self._quotes.pop(key, None)
+                self._quotes[key] = (version, result)
+                if len(self._quotes) > QUOTE_CACHE_SIZE:
+                    # The oldest entry goes first.
+                    del self._quotes[next(iter(self._quotes))]
+        if isinstance(result, str):
+            raise ValueError(result)
+        return result
+
+    def restock(self, deliveries: Iterable[tuple[Product, int]]) -> int:
+        """
+            Adds stock to many products in one update.
+
+            Products that were sold out are reactivated, since set_quantity deactivated them when
+            they reached zero; products deactivated while they still had stock stay inactive. The
+            deliveries are all-or-nothing: every line is checked before any product changes. The
+            new quantities are written to the journal, if there is one, as one record.
+
+            Args:
+                deliveries (Iterable[Tuple[Product, int]]): Each product and the quantity to add to it.
+
+            Returns:
+                int: The number of products reactivated.
+
+            Raises:
+                ValueError: If a product is not in the store or cannot hold stock, or a quantity is not positive.
+        """
+        added: dict[Product, int] = {}
+        for product, quantity in deliveries:
+            if self._catalog.get(product.name) is not product:
+                raise ValueError(f"Product '{product.name}' is not in the store.")
+            if isinstance(product, NonStockedProduct):
+                raise ValueError(f"Product '{product.name}' is not stocked and cannot be restocked.")
+            if quantity <= 0:
+                raise ValueError("Restock quantity must be greater than zero.")
+            added[product] = added.get(product, 0) + quantity
+        locks = self._acquire(list(added.items()))
+        ticket = None
+        try:
+            with self._state_lock:
+                changes = [(product, product.get_quantity(), product.get_quantity() + quantity)
+                           for product, quantity in added.items()]
+                if self.journal is not None and changes:
+                    ticket = self.journal.record([(product.name, new_quantity)
+                                                  for product, _, new_quantity in changes])
+                sold_out = [product for product, old_quantity, _ in changes
+                            if old_quantity == 0 and not product.is_active()]
+                for product, _, new_quantity in changes:
+                    product.set_quantity(new_quantity)
+                for product in sold_out:
+                    product.activate()
+        finally:
+            self._release(locks)
+        self._wait_durable(ticket)
+        self._after_commit()
+        return len(sold_out)
+
+    def _take_stock(self, demand: dict[Product, int]) -> int | None:
+        """
+            Applies the stock changes of a validated order, logging them to the journal first if there is one.
+            Returns the ticket of the journal record, to pass to _wait_durable once the locks are released.
+        """
+        changes = [(product, product.get_quantity() - quantity) for product, quantity in demand.items()]
+        ticket = None
+        if self.journal is not None and changes:
+            ticket = self.journal.record([(product.name, new_quantity) for product, new_quantity in changes])
+        for product, new_quantity in changes:
+            product.set_quantity(new_quantity)
+        return ticket
+
+    def _wait_durable(self, ticket: int | None):
+        """
+            Waits until a journal record is on disk, outside the stripe locks, so that the orders
+            waiting at the same time share one fsync.
+        """
+        journal = self.journal
+        if ticket is not None and journal is not None:
+            journal.wait_durable(ticket)
+
+    def _after_commit(self, orders: Iterable[list[tuple[Product, int, int]]] = ()):
+        """
+            Records committed orders in the ledger and compacts the journal when it is due.
+
+            The orders have already taken their stock, so a failure here is reported as a
+            warning instead of failing them; a compaction that fails is tried again after the
+            next order.
+        """
+        if self.ledger is not None:
+            for lines in orders:
+                try:
+                    self.ledger.record(lines)
+                except Exception as e:
+                    warnings.warn(f"Could not record an order in the ledger: {e}", RuntimeWarning)
+        if self.journal is not None:
+            try:
+                if self.journal.compaction_due():
+                    self.journal.compact()
+            except Exception as e:
+                warnings.warn(f"Could not compact the journal: {e}", RuntimeWarning)
+
+    def _prepare_order(self, shopping_list: list[tuple[Product, int]],
+                       taken: dict[Product, int] | None = None, held: dict[Product, int] | None = None
+                       ) -> tuple[int, dict[Product, int], list[tuple[Product, int, int]]]:
+        """
+            Validates and prices an order without changing any product.
+
+            Args:
+                shopping_list (List[Tuple[Product, int]]): The order to check.
+                taken (Dict[Product, int], optional): Stock already promised to other orders, which is
+                    not available to this one.
+                held (Dict[Product, int], optional): Units reserved for this order, which it may buy.
+
+            Returns:
+                Tuple[int, Dict[Product, int], List[Tuple[Product, int, int]]]: The total price in cents,
+                    the quantity to take from each product, and each line's product, quantity and the
+                    price charged for it in cents, with its share of any bundle applied.
+
+            Raises:
+                ValueError: If any line of the order cannot be completed.
+        """
+        lines, total_cents, demand = self._price_lines(shopping_list, taken, held)
+        if self._bundles:
+            total_cents, charged = price_with_bundles(lines, self._bundles)
+            lines = [(product, quantity, line_cents) for (product, quantity, _), line_cents in zip(lines, charged)]
+        return total_cents, demand, lines
+
+    def _price_lines(self, shopping_list: Iterable[tuple[Product, int]], taken: dict[Product, int] | None = None,
+                     held: dict[Product, int] | None = None
+                     ) -> tuple[list[tuple[Product, int, int]], int, dict[Product, int]]:
+        """
+            Validates and prices each line of an order, before bundles, as _prepare_order does.
+
+            Returns:
+                Tuple[List[Tuple[Product, int, int]], int, Dict[Product, int]]: Each line's product, quantity
+                    and price in cents, their total, and the quantity to take from each product.
+        """
+        total_cents = 0
+        demand: dict[Product, int] = {}
+        lines = []
         for product, quantity in shopping_list:
             if not product.is_active():
                 raise ValueError(f"Product '{product.name}' is not active and cannot be purchased.")
             if quantity <= 0:
                 raise ValueError("Quantity must be greater than zero.")
             try:
-                total_price += product.buy(quantity)
+                own = min(held.get(product, 0), product.get_held()) if held else 0
+                product.validate_purchase(quantity, own)
+                already_taken = demand.get(product, 0) + (taken.get(product, 0) if taken else 0)
+                if already_taken + quantity > product.get_available() + own:
+                    raise ValueError("Not enough quantity available for purchase.")
             except ValueError as e:
                 raise ValueError(f"Failed to buy {quantity} of product '{product.name}': {e}")
-        return total_price
+            line_cents = product.get_price_cents(quantity)
+            total_cents += line_cents
+            lines.append((product, quantity, line_cents))
+            demand[product] = demand.get(product, 0) + quantity
+        return lines, total_cents, demand
+
+    def _acquire(self, shopping_list: Sequence[tuple[Product, int]]) -> list[threading.Lock]:
+        """
+            Takes the lock stripes of the products in a shopping list, in index order so that
+            concurrent orders cannot deadlock. The locks returned must be given to _release.
+        """
+        locks = self._locks
+        if len(shopping_list) == 1:
+            lock = locks[hash(shopping_list[0][0].name) % LOCK_STRIPES]
+            lock.acquire()
+            return [lock]
+        acquired = [locks[stripe] for stripe in sorted({hash(product.name) % LOCK_STRIPES
+                                                        for product, _ in shopping_list})]
+        for lock in acquired:
+            lock.acquire()
+        return acquired
+
+    @staticmethod
+    def _release(locks: list[threading.Lock]):
+        for lock in locks:
+            lock.release()
+
+    @contextmanager
+    def locked_all(self):
+        """
+            Blocks every order while it is held, for work that needs a consistent view of the
+            whole store, such as taking a snapshot.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            self._release(self._locks)
 
 
 if __name__ == "__main__":
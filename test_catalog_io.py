@@ -0,0 +1,94 @@
+import io
+import pytest
+from catalog_io import export_catalog, import_catalog, parse_row
+from products import Product, NonStockedProduct, LimitedProduct, SecondHalfPrice, PercentDiscount
+from promotion_engine import compile_promotion
+from store import Store
+
+
+def make_store():
+    products = [
+        Product("MacBook Air M2", price=1450, quantity=100),
+        Product("Bose QuietComfort Earbuds", price=249.99, quantity=500),
+        NonStockedProduct("Windows License", price=125),
+        LimitedProduct("Shipping, express", price=10, quantity=250, maximum=1),
+        Product("Google Pixel 7 ✓", price=500, quantity=5),
+    ]
+    half_price = SecondHalfPrice("Second Half price!")
+    products[0].set_promotion(half_price)
+    products[1].set_promotion(half_price)
+    products[2].set_promotion(PercentDiscount("30% off!", percent=30))
+    products[3].set_promotion(compile_promotion({"type": "tiered", "name": "Volume", "tiers": [[10, 5]]}))
+    products[4].deactivate()
+    return Store(products)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_export_import_round_trip(tmp_path, suffix):
+    """Test that an exported catalog imports back with the same products, in chunks."""
+    store = make_store()
+    path = tmp_path / f"catalog{suffix}"
+    assert export_catalog(store, path, chunk_size=2) == 5
+
+    loaded = Store([], debug=True)
+    report = import_catalog(loaded, path, chunk_size=2)
+    assert (report.loaded, report.rejected, report.errors) == (5, 0, [])
+    assert [type(product) for product in loaded.products] == [type(product) for product in store.products]
+    assert [product.show() for product in loaded.products] == [product.show() for product in store.products]
+    assert [product.is_active() for product in loaded.products] == [product.is_active() for product in store.products]
+    assert loaded.get_product("Shipping, express").maximum == 1
+    assert loaded.products[0].promotion is loaded.products[1].promotion
+    assert loaded.get_product("Shipping, express").get_price_cents(1) == 1000
+
+
+def test_bad_rows_are_reported_and_skipped():
+    """Test that invalid and duplicate rows are reported by line without stopping the import."""
+    catalog = io.StringIO(
+        "kind,name,price,quantity,maximum,promotion\n"
+        ",Mouse,25,10,,\n"
+        ",,25,10,,\n"
+        ",Keyboard,-1,10,,\n"
+        ",Cable,abc,10,,\n"
+        "limited,Service,10,5,,\n"
+        "limited,Support,10,5,0,\n"
+        "non_stocked,License,10,3,,\n"
+        "gadget,Widget,10,3,,\n"
+        ',Monitor,200,2,,"{""type"": ""percent"", ""percent"": 120}"\n'
+        ',Mouse,30,1,,\n'
+        ',Webcam,80,4,,"{""type"": ""percent"", ""name"": ""10%"", ""percent"": 10}"\n')
+    store = Store([Product("Keyboard", price=50, quantity=1)])
+    report = import_catalog(store, catalog, file_format="csv", chunk_size=3)
+
+    assert report.loaded == 2
+    assert [line for line, _ in report.errors] == [3, 4, 5, 6, 7, 8, 9, 10, 11]
+    messages = [message for _, message in report.errors]
+    assert messages[0] == "Name cannot be empty."
+    assert messages[1] == "Price cannot be negative."
+    assert messages[2] == "Price must be a number."
+    assert messages[4] == "Maximum purchase quantity must be greater than zero."
+    assert messages[7] == "Percent must be between 0 and 100."
+    assert messages[8] == "Product 'Mouse' is already in the store."
+    assert store.get_product("Webcam").get_price(1) == 72
+    assert store.get_total_quantity() == 15
+
+
+def test_jsonl_rows_and_error_limit():
+    """Test that invalid JSON lines are rejected and only max_errors of them are kept."""
+    catalog = io.StringIO('{"name": "Mouse", "price": 25, "quantity": 10}\n\nnot json\n[1, 2]\n'
+                          '{"name": "Pad", "price": 5, "quantity": 2.5}\n')
+    store = Store([])
+    report = import_catalog(store, catalog, file_format="jsonl", max_errors=2)
+    assert (report.loaded, report.rejected) == (1, 3)
+    assert [line for line, _ in report.errors] == [3, 4]
+
+
+def test_parse_row_and_format_errors(tmp_path):
+    """Test that rows are validated as the constructors do, and unusable files raise."""
+    with pytest.raises(ValueError, match="Quantity cannot be negative"):
+        parse_row({"name": "Mouse", "price": "25", "quantity": "-1"})
+    with pytest.raises(ValueError, match="must be finite"):
+        parse_row({"name": "Mouse", "price": "nan"})
+    with pytest.raises(ValueError, match="no price column"):
+        import_catalog(Store([]), io.StringIO("name,quantity\nMouse,1\n"), file_format="csv")
+    with pytest.raises(ValueError, match="Cannot tell the catalog format"):
+        import_catalog(Store([]), tmp_path / "catalog.txt")
@@ -0,0 +1,147 @@
+import os
+import random
+import shutil
+import threading
+import time
+import journal
+from products import Product, LimitedProduct
+from journal import OrderJournal, open_store
+from promotion_engine import compile_promotion
+from snapshot import save_snapshot
+from store import Store
+
+
+def make_products():
+    return [Product(f"Product {index}", price=10 + index, quantity=50) for index in range(5)] + \
+        [LimitedProduct("Shipping", price=10, quantity=40, maximum=1)]
+
+
+def quantities(store):
+    return {product.name: (product.get_quantity(), product.is_active()) for product in store.products}
+
+
+def test_journal_recovers_after_restart(tmp_path):
+    """Test that orders made after the last snapshot are recovered from the journal."""
+    snapshot_path, journal_path = str(tmp_path / "store.snapshot"), str(tmp_path / "store.journal")
+    store = open_store(snapshot_path, journal_path, make_products())
+    store.order([(store.get_product("Product 0"), 50), (store.get_product("Shipping"), 1)])
+    store.process_orders([[(store.get_product("Product 1"), 3)], [(store.get_product("Product 2"), 99)]])
+    expected = quantities(store)
+    store.journal.close()
+
+    recovered = open_store(snapshot_path, journal_path)
+    assert quantities(recovered) == expected
+    assert recovered.get_product("Product 0") not in recovered.get_all_products()
+
+
+def test_journal_recovers_restock(tmp_path):
+    """Test that a restock is journaled, reactivated products included."""
+    snapshot_path, journal_path = str(tmp_path / "store.snapshot"), str(tmp_path / "store.journal")
+    store = open_store(snapshot_path, journal_path, make_products())
+    store.order([(store.get_product("Product 0"), 50), (store.get_product("Product 1"), 50)])
+    store.get_product("Product 1").deactivate()
+    save_snapshot(store, snapshot_path)
+    store.restock([(store.get_product("Product 0"), 5), (store.get_product("Product 2"), 5)])
+    expected = quantities(store)
+    store.journal.close()
+
+    recovered = open_store(snapshot_path, journal_path)
+    assert quantities(recovered) == expected
+    assert recovered.get_product("Product 0").is_active()
+
+
+def test_journal_compaction(tmp_path):
+    """Test that the journal is emptied into a snapshot once it passes its size threshold."""
+    snapshot_path, journal_path = str(tmp_path / "store.snapshot"), str(tmp_path / "store.journal")
+    store = open_store(snapshot_path, journal_path, make_products(), compact_at=200)
+    for _ in range(40):
+        store.order([(store.get_product("Product 3"), 1)])
+    assert os.path.getsize(journal_path) < 200
+    expected = quantities(store)
+    store.journal.close()
+    assert quantities(open_store(snapshot_path, journal_path)) == expected
+
+
+def test_journal_compaction_with_compiled_promotion(tmp_path):
+    """Test that a store whose products have compiled promotions keeps taking orders across compactions."""
+    snapshot_path, journal_path = str(tmp_path / "store.snapshot"), str(tmp_path / "store.journal")
+    products = make_products()
+    products[3].set_promotion(compile_promotion({"type": "percent", "name": "10% off", "percent": 10}))
+    store = open_store(snapshot_path, journal_path, products, compact_at=200)
+    for _ in range(40):
+        store.order([(store.get_product("Product 3"), 1)])
+    assert os.path.getsize(journal_path) < 200
+    store.journal.close()
+    recovered = open_store(snapshot_path, journal_path)
+    assert recovered.get_product("Product 3").get_quantity() == 10
+    assert recovered.get_product("Product 3").promotion.name == "10% off"
+
+
+def test_recovery_from_truncated_journal(tmp_path):
+    """Test that a journal cut off at any offset recovers exactly the orders written before the cut."""
+    snapshot_path, journal_path = str(tmp_path / "store.snapshot"), str(tmp_path / "store.journal")
+    store = Store(make_products())
+    save_snapshot(store, snapshot_path)
+    journal = OrderJournal(journal_path)
+    journal.attach(store)
+
+    rng = random.Random(8)
+    products = store.products
+    states = [(0, quantities(store))]
+    for _ in range(200):
+        try:
+            store.order([(product, rng.randint(1, 3)) for product in rng.sample(products, rng.randint(1, 3))])
+        except ValueError:
+            continue
+        states.append((journal.size(), quantities(store)))
+    journal.close()
+
+    with open(journal_path, "rb") as file:
+        data = file.read()
+    for cut in [rng.randrange(len(data) + 1) for _ in range(60)] + [0, len(data)]:
+        case_journal = str(tmp_path / "case.journal")
+        with open(case_journal, "wb") as file:
+            file.write(data[:cut])
+        shutil.copy(snapshot_path, str(tmp_path / "case.snapshot"))
+        recovered = open_store(str(tmp_path / "case.snapshot"), case_journal)
+        expected = [state for end, state in states if end <= cut][-1]
+        assert quantities(recovered) == expected
+        recovered.journal.close()
+        # The damaged tail is cut off, so the recovered journal can be appended to.
+        assert os.path.getsize(case_journal) == max(end for end, _ in states if end <= cut)
+
+
+def test_concurrent_orders_share_fsyncs(tmp_path, monkeypatch):
+    """Test that concurrent orders return only once their record is on disk, with fewer fsyncs than orders."""
+    snapshot_path, journal_path = str(tmp_path / "store.snapshot"), str(tmp_path / "store.journal")
+    store = open_store(snapshot_path, journal_path, make_products())
+    order_journal = store.journal
+    fsyncs = []
+    tickets = threading.local()
+    not_durable = []
+
+    def slow_fsync(file_number):
+        fsyncs.append(file_number)
+        time.sleep(0.01)
+    monkeypatch.setattr(journal.os, "fsync", slow_fsync)
+
+    record = order_journal.record
+
+    def remember_ticket(changes):
+        tickets.last = record(changes)
+        return tickets.last
+    monkeypatch.setattr(order_journal, "record", remember_ticket)
+
+    def place_order(index):
+        store.order([(store.get_product(f"Product {index % 5}"), 1)])
+        if order_journal._synced < tickets.last:
+            not_durable.append(index)
+
+    threads = [threading.Thread(target=place_order, args=(index,)) for index in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not not_durable
+    assert order_journal._synced == 40
+    assert len(fsyncs) < 40
@@ -0,0 +1,84 @@
+import pytest
+from main import make_order
+from products import Product, SecondHalfPrice
+from store import Store
+
+
+def make_store():
+    products = [Product(f"Item {index:02d}", price=(index * 37) % 50 + 1, quantity=index % 7) for index in range(40)]
+    for product in products[::5]:
+        product.set_promotion(SecondHalfPrice("Second Half price!"))
+    return Store(products)
+
+
+def collect_pages(store, limit, **filters):
+    pages = []
+    cursor = None
+    while True:
+        page = store.get_page(limit=limit, cursor=cursor, **filters)
+        pages.append(page.products)
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"sort_by": "price"},
+    {"sort_by": "price", "descending": True},
+    {"sort_by": "quantity", "in_stock": True},
+    {"sort_by": "price", "min_price": 10, "max_price": 30},
+    {"sort_by": "price", "descending": True, "min_price": 10, "max_price": 30},
+    {"has_promotion": True, "include_inactive": True},
+    {"name_prefix": "item 1"},
+])
+def test_pages_match_full_sort(filters):
+    """Test that paging through a filtered, sorted listing gives the same products as sorting everything."""
+    store = make_store()
+    pages = collect_pages(store, 6, **filters)
+    assert all(len(page) <= 6 for page in pages)
+
+    expected = [product for product in store.products
+                if (filters.get("include_inactive") or product.is_active())
+                and product.price >= filters.get("min_price", 0)
+                and product.price <= filters.get("max_price", 1000)
+                and (not filters.get("in_stock") or product.get_quantity() > 0)
+                and (not filters.get("has_promotion") or product.promotion is not None)
+                and product.name.lower().startswith(filters.get("name_prefix", ""))]
+    if "sort_by" in filters:
+        key = {"price": lambda product: product.price, "quantity": lambda product: product.get_quantity()}
+        expected.sort(key=key[filters["sort_by"]], reverse=filters.get("descending", False))
+    assert [product for page in pages for product in page] == expected
+    assert list(store.iter_products(page_size=4, **filters)) == expected
+
+
+def test_sorted_listing_follows_changes():
+    """Test that the sorted indexes follow price and quantity changes and removals."""
+    store = make_store()
+    cheapest = store.get_page(limit=1, sort_by="price").products[0]
+    cheapest.price = 1000
+    assert store.get_page(limit=1, sort_by="price", descending=True).products == [cheapest]
+    store.remove_product(cheapest)
+    assert cheapest not in store.iter_products(sort_by="price")
+
+    fullest = store.get_page(limit=1, sort_by="quantity", descending=True).products[0]
+    store.order([(fullest, fullest.get_quantity())])
+    assert fullest not in store.iter_products(sort_by="quantity")
+    assert store.get_page(limit=1, sort_by="quantity", include_inactive=True).products[0].get_quantity() == 0
+
+
+def test_get_page_rejects_unknown_sort():
+    """Test that an unknown sort key raises an exception."""
+    with pytest.raises(ValueError, match="Cannot sort products by 'name'."):
+        make_store().get_page(sort_by="name")
+
+
+def test_order_numbers_refer_to_pages_shown(monkeypatch, capsys):
+    """Test that the order menu pages through the products and resolves numbers against the pages shown."""
+    products = [Product(f"Item {index:02d}", price=10, quantity=5) for index in range(30)]
+    store = Store(products)
+    answers = iter(["", "25", "2", "Item 03", "1", "", ""])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    make_order(store)
+    assert "Order made! Total payment: $30.00" in capsys.readouterr().out
+    assert products[24].get_quantity() == 3 and products[3].get_quantity() == 4
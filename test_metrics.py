@@ -0,0 +1,70 @@
+import pytest
+import metrics
+from metrics import Histogram, MetricsRegistry
+from products import Product, PercentDiscount
+from reservations import ReservationManager
+from store import Store
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    metrics.enable(registry)
+    yield registry
+    metrics.disable()
+
+
+def test_histogram_quantiles():
+    """Test that quantiles are estimated within the bucket resolution."""
+    histogram = Histogram("latency")
+    for value in range(1, 10_001):
+        histogram.record(value)
+    assert histogram.quantile(0.5) == pytest.approx(5000, rel=0.07)
+    assert histogram.quantile(0.99) == pytest.approx(9900, rel=0.07)
+    assert histogram.quantile(1) <= 10_000
+    assert Histogram("empty").quantile(0.5) == 0
+
+
+def test_disabled_instrumentation_restores_methods(registry):
+    """Test that disabling puts the original methods back."""
+    assert metrics.is_enabled()
+    assert Store.order.__code__.co_filename.endswith("metrics.py")
+    metrics.disable()
+    assert not metrics.is_enabled()
+    assert Store.order.__code__.co_filename.endswith("store.py")
+    assert Product.buy.__code__.co_filename.endswith("products.py")
+
+
+def test_orders_rejections_promotions_and_sales_are_counted(registry):
+    """Test the order, rejected order, promotion and units sold counters."""
+    mac = Product("MacBook Air M2", price=1450, quantity=10)
+    bose = Product("Bose QuietComfort Earbuds", price=250, quantity=500)
+    bose.set_promotion(PercentDiscount("30% off!", percent=30))
+    store = Store([mac, bose])
+    store.order([(mac, 2), (bose, 3)])
+    store.quote([(bose, 5)])
+    with pytest.raises(ValueError):
+        store.order([(bose, 1), (mac, 100)])
+    store.process_orders([[(mac, 1)], [(mac, 50)]])
+    bose.buy(1)
+    assert registry.counter("orders_total").value() == 2
+    assert registry.counter("orders_rejected_total").value() == 2
+    assert registry.counter("units_sold_total").value("MacBook Air M2") == 3
+    assert registry.counter("units_sold_total").value("Bose QuietComfort Earbuds") == 4
+    assert registry.counter("promotion_hits_total").value("30% off!") == 2
+    assert registry.histogram("store_order_seconds").count == 2
+    text = registry.export_text()
+    assert 'units_sold_total{sku="MacBook Air M2"} 3' in text
+    assert 'store_order_seconds{quantile="0.99"}' in text
+    assert "orders_total 2" in text
+
+
+def test_checkout_is_counted_as_an_order(registry):
+    """Test that checking a cart out goes through the instrumented Store.order."""
+    mac = Product("MacBook Air M2", price=1450, quantity=10)
+    store = Store([mac])
+    reservations = ReservationManager(store)
+    reservations.hold("cart", mac, 3)
+    reservations.checkout("cart")
+    assert registry.counter("orders_total").value() == 1
+    assert registry.counter("units_sold_total").value("MacBook Air M2") == 3
@@ -0,0 +1,47 @@
+import pytest
+from money import divide_half_up, format_cents, percent_off, to_basis_points, to_cents
+from products import Product, SecondHalfPrice, PercentDiscount
+from store import Store
+
+
+def test_to_cents():
+    """Test that amounts are converted to cents by their decimal value, rounding half up."""
+    assert to_cents(1450) == 145000
+    assert to_cents(0.1) == 10
+    assert to_cents(249.99) == 24999
+    assert to_cents(1.005) == 101
+    assert to_cents("19.994") == 1999
+    assert format_cents(101) == "1.01"
+    assert format_cents(-5) == "-0.05"
+
+
+def test_rounding_helpers():
+    """Test half-up division and percent discounts in basis points."""
+    assert [divide_half_up(n, 2) for n in (1, 2, 3)] == [1, 1, 2]
+    assert to_basis_points(12.5) == 1250
+    assert percent_off(999, 1250) == 874  # 874.125
+    assert percent_off(1001, 5000) == 501  # 500.5 rounds up
+    with pytest.raises(ValueError, match="hundredth of a percent"):
+        to_basis_points(12.345)
+
+
+def test_order_totals_are_exact():
+    """Test that many small prices add up without floating point drift."""
+    product = Product("Sticker", price=0.1, quantity=1000)
+    store = Store([product])
+    for _ in range(10):
+        assert store.order([(product, 1)]) == 0.1
+    assert store.order([(product, 3)]) == 0.3
+    assert store.get_stock_value() == 98.7  # a running float total drifts to 98.70000000000006
+    store.check_aggregates()
+
+
+def test_promotions_round_line_total_half_up():
+    """Test that promotions round the line total, not each item, to the cent."""
+    product = Product("Pen", price=0.99, quantity=100)
+    product.set_promotion(SecondHalfPrice("Second Half price!"))
+    assert product.get_price_cents(2) == 99 + 50  # 49.5 rounds up
+    assert product.get_price_cents(4) == 99 * 2 + 99
+    product.set_promotion(PercentDiscount("12.5% off!", percent=12.5))
+    assert product.get_price_cents(10) == 866  # 866.25
+    assert product.get_price(10) == 8.66
@@ -0,0 +1,101 @@
+import os
+import pytest
+from order_ledger import OrderLedger, SalesSummary
+from products import Product, SecondHalfPrice
+from promotion_engine import Bundle
+from reservations import ReservationManager
+from store import Store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_store():
+    products = [
+        Product("MacBook Air M2", price=1450, quantity=1000),
+        Product("Bose QuietComfort Earbuds", price=250, quantity=5000),
+        Product("Google Pixel 7", price=500, quantity=2500),
+    ]
+    products[1].set_promotion(SecondHalfPrice("Second Half price!"))
+    return Store(products)
+
+
+def test_ledger_records_orders_and_bundles(tmp_path):
+    """Test that order lines are recorded with their promotion, and charged prices add up to the totals."""
+    store = make_store()
+    mac, bose, pixel = store.products
+    store.add_bundle(Bundle("Mac with earbuds", {"MacBook Air M2": 1, "Bose QuietComfort Earbuds": 1}, price=1600))
+    ledger = OrderLedger(str(tmp_path))
+    ledger.attach(store)
+
+    totals = [store.order([(mac, 1), (bose, 1), (pixel, 1)]), store.order([(bose, 2)])]
+    totals += [result.total_price for result in store.process_orders([[(pixel, 2)], [(pixel, 9999)]])
+               if result.error is None]
+    manager = ReservationManager(store)
+    manager.hold("cart", pixel, 1)
+    totals.append(manager.checkout("cart"))
+
+    assert len(ledger) == 6
+    sales = ledger.sales_by_sku()
+    assert sales["Google Pixel 7"] == SalesSummary(4, 2000, 0)
+    assert sales["MacBook Air M2"].units == 1
+    assert sales["Bose QuietComfort Earbuds"].units == 3
+    assert sum(summary.revenue for summary in sales.values()) == pytest.approx(sum(totals))
+    assert sales["MacBook Air M2"].discount + sales["Bose QuietComfort Earbuds"].discount == pytest.approx(225)
+    by_promotion = ledger.sales_by_promotion()
+    assert by_promotion["Second Half price!"].units == 3
+    assert by_promotion[None].units == 5
+
+
+@pytest.mark.parametrize("memory_segments", [1, 2])
+def test_ledger_windows_and_spilled_segments(tmp_path, memory_segments):
+    """Test that window queries over rollups and spilled segments match a plain recount."""
+    store = make_store()
+    clock = FakeClock()
+    ledger = OrderLedger(str(tmp_path), segment_rows=4, memory_segments=memory_segments, clock=clock)
+    ledger.attach(store)
+    sold = []
+    for step in range(60):
+        clock.now = step
+        product = store.products[step % 3]
+        quantity = step % 4 + 1
+        store.order([(product, quantity)])
+        sold.append((step, product.name, quantity))
+
+    assert len(ledger) == 60
+    for start, end in ((None, None), (5, 31), (0, 1), (57.5, None), (100, 200)):
+        expected = {}
+        for when, name, quantity in sold:
+            if (start is None or when >= start) and (end is None or when < end):
+                expected[name] = expected.get(name, 0) + quantity
+        assert {name: summary.units for name, summary in ledger.sales_by_sku(start, end).items()} == expected
+
+    assert len(os.listdir(tmp_path)) == 15 - memory_segments
+    top = ledger.top_sellers(2, start=10, end=20)
+    assert [name for name, _ in top] == ["Bose QuietComfort Earbuds", "Google Pixel 7"]
+    assert ledger.top_sellers(1, by="revenue")[0][0] == "MacBook Air M2"
+    with pytest.raises(ValueError, match="Cannot rank"):
+        ledger.top_sellers(by="price")
+    ledger.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_bundle_discount_only_goes_to_bundles_that_applied(tmp_path):
+    """Test that a line whose product belongs to a bundle that did not apply is recorded at its own price."""
+    store = make_store()
+    mac, bose, pixel = store.products
+    store.add_bundle(Bundle("Mac with earbuds", {"MacBook Air M2": 1, "Bose QuietComfort Earbuds": 1}, price=1600))
+    store.add_bundle(Bundle("Pixel with Mac", {"Google Pixel 7": 2, "MacBook Air M2": 2}, price=1))
+    ledger = OrderLedger(str(tmp_path))
+    ledger.attach(store)
+
+    total = store.order([(mac, 1), (bose, 1), (pixel, 1)])
+    sales = ledger.sales_by_sku()
+    assert sales["Google Pixel 7"] == SalesSummary(1, 500, 0)
+    assert sales["MacBook Air M2"].revenue + sales["Bose QuietComfort Earbuds"].revenue == 1600
+    assert sum(summary.revenue for summary in sales.values()) == pytest.approx(total)
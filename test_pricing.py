@@ -0,0 +1,60 @@
+import random
+import pytest
+from products import Product, SecondHalfPrice, ThirdOneFree, PercentDiscount
+
+np = pytest.importorskip("numpy")
+from pricing import price_batch, price_products  # noqa: E402
+
+
+@pytest.mark.parametrize("promotion", [
+    None,
+    SecondHalfPrice("Second Half price!"),
+    ThirdOneFree("Third One Free!"),
+    PercentDiscount("30% off!", percent=30),
+    PercentDiscount("12.5% off!", percent=12.5),
+])
+def test_price_batch_matches_scalar_promotion(promotion):
+    """Test that vectorized pricing gives exactly the scalar apply_promotion_cents results."""
+    rng = random.Random(5)
+    prices = [rng.randint(0, 500_000) for _ in range(2000)]
+    quantities = [rng.randint(1, 200) for _ in range(2000)]
+    totals = price_batch(promotion, prices, quantities)
+    for price, quantity, total in zip(prices, quantities, totals):
+        product = Product("Item", price=price / 100, quantity=quantity)
+        product.set_promotion(promotion)
+        assert total == product.get_price_cents(quantity)
+
+
+def test_price_products_groups_by_promotion():
+    """Test that products with mixed promotions are each priced with their own promotion."""
+    products = [Product(f"Item {index}", price=100 + index, quantity=10) for index in range(9)]
+    promotions = [None, SecondHalfPrice("Half"), ThirdOneFree("Free"), PercentDiscount("Off", percent=15)]
+    for index, product in enumerate(products):
+        product.set_promotion(promotions[index % len(promotions)])
+    quantities = [index + 1 for index in range(9)]
+    totals = price_products(products, quantities)
+    assert list(totals) == [product.get_price_cents(quantity) for product, quantity in zip(products, quantities)]
+
+
+@pytest.mark.parametrize("promotion", [
+    None,
+    SecondHalfPrice("Second Half price!"),
+    ThirdOneFree("Third One Free!"),
+    PercentDiscount("12.5% off!", percent=12.5),
+])
+def test_prices_beyond_int64_stay_exact(promotion):
+    """Test that batches whose totals or intermediate values overflow int64 are priced exactly."""
+    product = Product("Jet", price=40_000_000_000, quantity=10 ** 9)
+    product.set_promotion(promotion)
+    quantities = [1, 3, 10 ** 6, 10 ** 9]
+    totals = price_batch(promotion, [product.price_cents] * len(quantities), quantities)
+    assert list(totals) == [product.get_price_cents(quantity) for quantity in quantities]
+    cheap = Product("Gum", price=1, quantity=10)
+    mixed = price_products([product, cheap], [10 ** 9, 3])
+    assert list(mixed) == [product.get_price_cents(10 ** 9), cheap.get_price_cents(3)]
+
+
+def test_price_batch_rejects_mismatched_lengths():
+    """Test that prices and quantities of different lengths raise an exception."""
+    with pytest.raises(ValueError, match="same length"):
+        price_batch(None, [1.0, 2.0], [1])
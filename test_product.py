@@ -112,5 +112,5 @@ def test_product_with_promotions():
     percent_discount_promo = PercentDiscount(name="30% off!", percent=30)
     product.set_promotion(percent_discount_promo)
     total_price = product.buy(2)  # 30% discount
-    assert total_price == (1450 * 2) * (1 - 0.30)
+    assert total_price == 2030  # exact to the cent
     assert product.get_quantity() == 0
@@ -0,0 +1,61 @@
+import pytest
+from products import Product, LimitedProduct, SecondHalfPrice
+from product_table import ProductTable
+from store import Store
+
+
+def test_products_have_no_instance_dict():
+    """Test that products use __slots__ instead of a per-instance dict."""
+    assert not hasattr(Product("MacBook Air M2", price=1450, quantity=100), "__dict__")
+    assert not hasattr(LimitedProduct("Shipping", price=10, quantity=250, maximum=1), "__dict__")
+
+
+def test_product_row_reads_and_writes_table():
+    """Test that a row view behaves like a product and stores its state in the table."""
+    table = ProductTable()
+    table.append("Google Pixel 7", price=500, quantity=250)
+    row = table.append("MacBook Air M2", price=1450, quantity=2)
+    assert len(table) == 2
+    assert row.name == "MacBook Air M2"
+    assert row.show() == "MacBook Air M2, Price: $1450.00, Quantity: 2"
+
+    row.set_promotion(SecondHalfPrice("Second Half price!"))
+    assert row.buy(2) == 1450 + 1450 * 0.5
+    assert table.quantities[1] == 0
+    assert table.active[1] == 0
+    assert table.row(1).is_active() is False
+
+
+def test_product_table_validates_rows():
+    """Test that rows are validated with the same rules as Product."""
+    table = ProductTable()
+    with pytest.raises(ValueError, match="Price cannot be negative."):
+        table.append("MacBook Air M2", price=-1, quantity=1)
+    assert len(table) == 0
+
+
+def test_store_with_product_rows():
+    """Test that a store can be built from table rows and keeps its totals in sync."""
+    table = ProductTable()
+    for index in range(10):
+        table.append(f"Product {index}", price=10, quantity=5)
+    store = Store(list(table), debug=True)
+    store.order([(store.get_product("Product 3"), 5)])
+    assert store.get_total_quantity() == 45
+    assert store.get_active_count() == 9
+
+
+def test_changes_through_a_fresh_row_reach_the_store():
+    """Test that every row() call returns the same view, so a store hears changes made through any of them."""
+    table = ProductTable()
+    for index in range(2):
+        table.append(f"Product {index}", price=10, quantity=5)
+    store = Store(list(table), debug=True)
+    assert table.row(1) is store.get_product("Product 1")
+
+    table.row(1).set_promotion(SecondHalfPrice("Second Half price!"))
+    assert store.get_product("Product 1").promotion is not None
+    table.row(1).buy(5)
+    store.check_aggregates()
+    assert store.get_total_quantity() == 5
+    assert store.get_active_count() == 1
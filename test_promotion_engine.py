@@ -0,0 +1,77 @@
+import random
+import pytest
+from products import Product, SecondHalfPrice, ThirdOneFree, PercentDiscount
+from promotion_engine import Bundle, compile_promotion
+from store import Store
+
+
+@pytest.mark.parametrize("classic, spec", [
+    (SecondHalfPrice("Second Half price!"), {"type": "second_half_price"}),
+    (ThirdOneFree("Third One Free!"), {"type": "buy_n_get_m", "buy": 2, "free": 1}),
+    (PercentDiscount("30% off!", percent=30), {"type": "percent", "percent": 30}),
+    (PercentDiscount("12.5% off!", percent=12.5), {"type": "percent", "percent": 12.5}),
+])
+def test_compiled_rules_match_classic_promotions(classic, spec):
+    """Test that compiled rules give exactly the prices of the existing promotion classes."""
+    compiled = compile_promotion(spec)
+    rng = random.Random(14)
+    for _ in range(2000):
+        product = Product("Item", price=rng.choice([rng.randint(1, 5000), round(rng.uniform(0, 5000), 2)]),
+                          quantity=10 ** 6)
+        quantity = rng.choice([rng.randint(0, 10), rng.randint(0, 10 ** 6)])
+        assert compiled.apply_promotion(product, quantity) == classic.apply_promotion(product, quantity)
+
+
+def test_new_rule_types():
+    """Test buy-N-get-M, tiered, best-of and stacked rules."""
+    product = Product("Item", price=10, quantity=1000)
+    assert compile_promotion({"type": "buy_n_get_m", "buy": 3, "free": 2}).apply_promotion(product, 12) == 80
+    tiered = compile_promotion({"type": "tiered", "tiers": [[10, 10], [100, 20]]})
+    assert [tiered.apply_promotion(product, quantity) for quantity in (9, 10, 100)] == [90, 90, 800]
+    best = compile_promotion({"type": "best_of", "rules": [{"type": "percent", "percent": 10},
+                                                           {"type": "buy_n_get_m", "buy": 1, "free": 1}]})
+    assert best.apply_promotion(product, 1) == 9
+    assert best.apply_promotion(product, 4) == 20
+    stacked = compile_promotion({"type": "stacked", "rules": [{"type": "percent", "percent": 50},
+                                                              {"type": "buy_n_get_m", "buy": 1, "free": 1}]})
+    assert stacked.apply_promotion(product, 4) == 10
+    product.set_promotion(best)
+    assert product.buy(4) == 20
+
+
+def test_invalid_rules():
+    """Test that invalid promotion descriptions raise an exception."""
+    with pytest.raises(ValueError, match="Unknown promotion type"):
+        compile_promotion({"type": "mystery"})
+    with pytest.raises(ValueError, match="between 0 and 100"):
+        compile_promotion({"type": "percent", "percent": 120})
+    with pytest.raises(ValueError, match="at least one rule"):
+        compile_promotion({"type": "best_of", "rules": []})
+    with pytest.raises(ValueError, match="'percent' must be a number"):
+        compile_promotion({"type": "percent"})
+    with pytest.raises(ValueError, match="'free' must be an integer"):
+        compile_promotion({"type": "buy_n_get_m", "buy": 2, "free": "1"})
+    with pytest.raises(ValueError, match="'tiers' must hold"):
+        compile_promotion({"type": "tiered", "tiers": [10, 5]})
+    with pytest.raises(ValueError, match="'rules' must be a list"):
+        compile_promotion({"type": "stacked", "rules": None})
+    with pytest.raises(ValueError, match="must be a dict"):
+        compile_promotion({"type": "best_of", "rules": ["percent"]})
+    with pytest.raises(ValueError, match="Unknown promotion type None"):
+        compile_promotion({"name": "No type"})
+
+
+def test_bundle_priced_in_order():
+    """Test that complete bundle sets get the bundle price and the rest their usual price."""
+    mac = Product("MacBook Air M2", price=1450, quantity=100)
+    bose = Product("Bose QuietComfort Earbuds", price=250, quantity=500)
+    bose.set_promotion(ThirdOneFree("Third One Free!"))
+    store = Store([mac, bose])
+    store.add_bundle(Bundle("Work from home", {"MacBook Air M2": 1, "Bose QuietComfort Earbuds": 1}, price=1500))
+    assert store.order([(mac, 2), (bose, 3)]) == 2 * 1500 + 250
+    assert store.order([(mac, 1)]) == 1450
+    # A bundle is not applied when the usual prices are cheaper.
+    store.add_bundle(Bundle("Bad deal", {"Bose QuietComfort Earbuds": 3}, price=1000))
+    assert store.order([(bose, 3)]) == 500
+    with pytest.raises(ValueError, match="not in the store"):
+        store.add_bundle(Bundle("Phone", {"Google Pixel 7": 1}, price=10))
@@ -0,0 +1,63 @@
+import pytest
+from products import Product, SecondHalfPrice
+from render_cache import RenderCache, cache_for
+from store import Store
+from main import listing_all_products
+
+
+def make_store():
+    return Store([Product(f"Product {index}", price=10 * (index + 1), quantity=5) for index in range(5)])
+
+
+def test_listing_is_cached_until_a_product_changes():
+    """Test that the listing is rendered once and re-rendered only after a change."""
+    store = make_store()
+    cache = RenderCache(store)
+    first = cache.listing()
+    assert first == "\n".join(f"{ids}. {product.show()}" for ids, product in enumerate(store.products, start=1))
+    assert cache.listing() is first
+    assert cache.stats() == {"hits": 1, "misses": 6, "evictions": 0, "size": 5}
+
+    product = store.get_product("Product 2")
+    store.order([(product, 1)])
+    assert "Product 2, Price: $30.00, Quantity: 4" in cache.listing()
+    # Only the changed product was rendered again.
+    assert cache.stats()["misses"] == 8
+
+
+@pytest.mark.parametrize("change", [
+    lambda product: product.set_quantity(3),
+    lambda product: setattr(product, "price", 99),
+    lambda product: product.set_promotion(SecondHalfPrice("Second Half price!")),
+    lambda product: product.deactivate(),
+])
+def test_line_invalidated_on_change(change):
+    """Test that a product's line is re-rendered after each kind of change."""
+    store = make_store()
+    cache = RenderCache(store)
+    product = store.get_product("Product 0")
+    cache.line(product)
+    change(product)
+    assert cache.line(product) == product.show()
+    assert cache.stats()["hits"] == 0
+
+
+def test_lru_eviction():
+    """Test that the cache keeps at most maxsize lines, dropping the least recently used."""
+    store = make_store()
+    cache = RenderCache(store, maxsize=2)
+    products = store.products
+    cache.line(products[0])
+    cache.line(products[1])
+    cache.line(products[0])
+    cache.line(products[2])
+    assert cache.stats()["evictions"] == 1
+    cache.line(products[0])
+    assert cache.stats()["hits"] == 2
+
+
+def test_main_listing_uses_shared_cache():
+    """Test that the menu listing goes through the store's shared cache."""
+    store = make_store()
+    assert listing_all_products(store) == listing_all_products(store)
+    assert cache_for(store).stats()["hits"] == 1
@@ -0,0 +1,117 @@
+import random
+import pytest
+from products import Product, LimitedProduct
+from reservations import ReservationManager
+from store import Store
+from timer_wheel import TimerWheel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_timer_wheel_expires_items_when_due():
+    """Test that items expire at their deadline, across levels, and cancelled ones never do."""
+    rng = random.Random(3)
+    wheel = TimerWheel(0.0, tick=1.0, slots=8, levels=3)
+    deadlines = {item: rng.uniform(0, 3000) for item in range(2000)}
+    timers = {item: wheel.schedule(deadline, item) for item, deadline in deadlines.items()}
+    for item in range(0, 2000, 5):
+        wheel.cancel(timers[item])
+        del deadlines[item]
+    now, expired = 0.0, set()
+    while now < 3100:
+        now += rng.uniform(0, 40)
+        for item in wheel.advance(now):
+            assert deadlines[item] <= now
+            expired.add(item)
+        assert all(item in expired for item, deadline in deadlines.items() if deadline <= now - 1)
+    assert expired == set(deadlines)
+    assert len(wheel) == 0
+
+
+def test_holds_limit_what_others_can_buy():
+    """Test that held units are not available to other buyers and are shown as such."""
+    mac = Product("MacBook Air M2", price=1450, quantity=10)
+    store = Store([mac])
+    reservations = ReservationManager(store, ttl=60, clock=FakeClock())
+    reservations.hold("cart 1", mac, 7)
+    assert mac.get_available() == 3
+    assert mac.show() == "MacBook Air M2, Price: $1450.00, Quantity: 10, Available: 3"
+    with pytest.raises(ValueError, match="Not enough quantity"):
+        store.order([(mac, 4)])
+    with pytest.raises(ValueError, match="Failed to reserve"):
+        reservations.hold("cart 2", mac, 4)
+    assert store.order([(mac, 3)]) == 4350
+    assert reservations.checkout("cart 1") == 7 * 1450
+    assert mac.get_quantity() == 0 and not mac.is_active()
+    assert len(reservations) == 0
+
+
+def test_holds_expire_and_release():
+    """Test that holds are given back when they expire or are released, and renewed when changed."""
+    mac = Product("MacBook Air M2", price=1450, quantity=10)
+    store = Store([mac])
+    clock = FakeClock()
+    reservations = ReservationManager(store, ttl=60, clock=clock)
+    reservations.hold("cart 1", mac, 2)
+    clock.now += 50
+    reservations.hold("cart 1", mac, 3)
+    reservations.hold("cart 2", mac, 4)
+    reservations.release("cart 2")
+    assert mac.get_available() == 5
+    clock.now += 20
+    assert reservations.holds("cart 1") == {mac: 5}
+    clock.now += 45
+    assert reservations.expire() == 1
+    assert mac.get_available() == 10
+    with pytest.raises(ValueError, match="holds no products"):
+        reservations.checkout("cart 1")
+
+
+def test_checkout_failure_keeps_holds():
+    """Test that a failed checkout changes nothing and limited products are capped per cart."""
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, maximum=2)
+    mac = Product("MacBook Air M2", price=1450, quantity=10)
+    store = Store([shipping, mac])
+    reservations = ReservationManager(store, ttl=60, clock=FakeClock())
+    reservations.hold("cart", shipping, 2)
+    with pytest.raises(ValueError, match="more than 2"):
+        reservations.hold("cart", shipping, 1)
+    reservations.hold("cart", mac, 1)
+    mac.deactivate()
+    with pytest.raises(ValueError, match="not active"):
+        reservations.checkout("cart")
+    assert reservations.holds("cart") == {shipping: 2, mac: 1}
+    assert shipping.get_available() == 248 and mac.get_quantity() == 10
+
+
+def test_store_releases_expired_holds_before_selling():
+    """Test that holds past their time stop blocking orders and quotes without calling the manager."""
+    mac = Product("MacBook Air M2", price=1450, quantity=10)
+    store = Store([mac])
+    clock = FakeClock()
+    reservations = ReservationManager(store, ttl=60, clock=clock)
+    reservations.hold("cart", mac, 8)
+    with pytest.raises(ValueError, match="Not enough quantity"):
+        store.quote([(mac, 5)])
+    clock.now += 61
+    assert store.quote([(mac, 5)]).total_price == 5 * 1450
+    assert store.order([(mac, 5)]) == 5 * 1450
+    assert len(reservations) == 0 and mac.get_held() == 0
+
+
+def test_quote_counts_the_carts_own_holds():
+    """Test that a quote given the cart's holds succeeds exactly when checkout would."""
+    mac = Product("MacBook Air M2", price=1450, quantity=5)
+    store = Store([mac])
+    reservations = ReservationManager(store, ttl=60, clock=FakeClock())
+    reservations.hold("cart", mac, 5)
+    with pytest.raises(ValueError, match="Not enough quantity"):
+        store.quote([(mac, 5)])
+    assert store.quote([(mac, 5)], held={mac: 5}).total_price == 5 * 1450
+    assert reservations.checkout("cart") == 5 * 1450
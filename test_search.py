@@ -0,0 +1,82 @@
+import pytest
+from products import Product
+from search import NameIndex
+from store import Store
+
+
+def make_store():
+    names = ["MacBook Air M2", "MacBook Pro 14", "Bose QuietComfort Earbuds", "Google Pixel 7", "Google Pixel 7 Pro",
+             "Pixel Buds", "Windows License", "Shipping"]
+    return Store([Product(name, price=100, quantity=5) for name in names])
+
+
+def names(products):
+    return [product.name for product in products]
+
+
+def test_prefix_search():
+    """Test that prefix search finds names starting with the query, ignoring case, in name order."""
+    store = make_store()
+    assert names(store.search("macbook", mode="prefix")) == ["MacBook Air M2", "MacBook Pro 14"]
+    assert names(store.search("GOOGLE PIXEL 7 ", mode="prefix")) == ["Google Pixel 7 Pro"]
+    assert store.search("Nokia", mode="prefix") == []
+
+
+def test_substring_search():
+    """Test that substring search finds names containing the query, in catalog order."""
+    store = make_store()
+    assert names(store.search("pixel")) == ["Google Pixel 7", "Google Pixel 7 Pro", "Pixel Buds"]
+    assert names(store.search("buds")) == ["Bose QuietComfort Earbuds", "Pixel Buds"]
+    assert names(store.search("ip")) == ["Shipping"]
+    assert names(store.search("pixel", limit=1)) == ["Google Pixel 7"]
+
+
+def test_fuzzy_search():
+    """Test that fuzzy search tolerates typos and ranks the closest names first."""
+    store = make_store()
+    assert names(store.search("quietcomfrt", mode="fuzzy")) == ["Bose QuietComfort Earbuds"]
+    assert store.search("pixl 7 pro", mode="fuzzy")[0].name == "Google Pixel 7 Pro"
+
+
+def test_search_follows_catalog_changes():
+    """Test that the index is updated when products are added, removed or sold out."""
+    store = make_store()
+    assert names(store.search("pixel buds")) == ["Pixel Buds"]
+    store.remove_product(store.get_product("Pixel Buds"))
+    store.add_product(Product("Pixel Watch", price=300, quantity=1))
+    assert names(store.search("pixel")) == ["Google Pixel 7", "Google Pixel 7 Pro", "Pixel Watch"]
+    store.order([(store.get_product("Pixel Watch"), 1)])
+    assert names(store.search("watch")) == []
+    assert names(store.search("watch", include_inactive=True)) == ["Pixel Watch"]
+
+
+def test_name_index_discard():
+    """Test that discarded names no longer match and empty posting sets are dropped."""
+    index = NameIndex()
+    index.add(1, "Pixel")
+    index.add(2, "Pixel Buds")
+    index.discard(2)
+    assert list(index.substring("buds")) == []
+    assert list(index.prefix("pix")) == [1]
+    assert len(index) == 1
+
+
+def test_unknown_search_mode():
+    """Test that an unknown search mode raises an exception."""
+    with pytest.raises(ValueError, match="Unknown search mode"):
+        make_store().search("pixel", mode="regex")
+
+
+def test_changes_during_index_build_are_kept(monkeypatch):
+    """Test that products added and removed while the name index is built are searchable as they end up."""
+    store = make_store()
+
+    class BusyNameIndex(NameIndex):
+        def add(self, member, name):
+            if name == "MacBook Air M2":
+                store.add_product(Product("Pixel Tablet", price=400, quantity=2))
+                store.remove_product(store.get_product("Pixel Buds"))
+            super().add(member, name)
+
+    monkeypatch.setattr("store.NameIndex", BusyNameIndex)
+    assert names(store.search("pixel")) == ["Google Pixel 7", "Google Pixel 7 Pro", "Pixel Tablet"]
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+import pytest
+from products import Product
+from server import handle_request, start_server, RemoteStore
+from store import Store
+
+
+async def send(reader, writer, request):
+    writer.write(json.dumps(request).encode("utf-8") + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+def test_concurrent_clients_do_not_oversell():
+    """Test that many concurrent clients ordering the same product get exactly the stock there is."""
+    store = Store([Product("MacBook Air M2", price=1450, quantity=300),
+                   Product("Google Pixel 7", price=500, quantity=5)])
+
+    async def client(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            return await send(reader, writer, {"command": "order", "items": [["MacBook Air M2", 1]]})
+        finally:
+            writer.close()
+
+    async def run():
+        server = await start_server(store)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(*(client(port) for _ in range(500)))
+
+    responses = asyncio.run(run())
+    assert sum(response["ok"] for response in responses) == 300
+    assert all("MacBook Air M2" in response["error"] for response in responses if not response["ok"])
+    assert store.get_total_quantity() == 5
+
+
+def test_protocol_commands():
+    """Test the list, total and order commands and error responses."""
+    store = Store([Product("MacBook Air M2", price=1450, quantity=3)])
+
+    async def run():
+        server = await start_server(store)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = [
+                await send(reader, writer, {"command": "list"}),
+                await send(reader, writer, {"command": "order", "items": [["MacBook Air M2", 2]]}),
+                await send(reader, writer, {"command": "total"}),
+                await send(reader, writer, {"command": "order", "items": [["Nokia", 1]]}),
+                await send(reader, writer, {"command": "fly"}),
+                await send(reader, writer, ["order"]),
+                await send(reader, writer, {"command": "search", "query": 5}),
+                await send(reader, writer, {"command": "total"}),
+            ]
+            writer.close()
+            return responses
+
+    listing, order, total, missing, unknown, not_object, broken, still_open = asyncio.run(run())
+    assert listing["products"] == [{"name": "MacBook Air M2", "line": "MacBook Air M2, Price: $1450.00, Quantity: 3"}]
+    assert order == {"ok": True, "total_price": 2900}
+    assert total == {"ok": True, "total": 1}
+    assert missing == {"ok": False, "error": "Product 'Nokia' is not in the store."}
+    assert unknown["ok"] is False
+    assert not_object == {"ok": False, "error": "Request must be a JSON object."}
+    assert broken["ok"] is False
+    assert still_open == {"ok": True, "total": 1}
+
+
+def test_remote_store_client():
+    """Test that the blocking client offers the Store methods used by the CLI."""
+    store = Store([Product("MacBook Air M2", price=1450, quantity=3)])
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(store))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        remote = RemoteStore("127.0.0.1", server.sockets[0].getsockname()[1])
+        products = remote.get_all_products()
+        assert products[0].show() == "MacBook Air M2, Price: $1450.00, Quantity: 3"
+        assert remote.order([(products[0], 1)]) == 1450
+        assert remote.get_total_quantity() == 2
+        assert remote.get_product("MacBook Air M2").show() == "MacBook Air M2, Price: $1450.00, Quantity: 2"
+        with pytest.raises(ValueError, match="Product 'Nokia' is not in the store."):
+            remote.get_product("Nokia")
+        remote.close()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+
+def test_requests_to_a_store_without_render_cache():
+    """Test that products are rendered with show when the served store has no render cache."""
+    class PlainStore:
+        def get_all_products(self):
+            return [Product("MacBook Air M2", price=1450, quantity=3)]
+
+    response = handle_request(PlainStore(), {"command": "list"})
+    assert response["products"] == [{"name": "MacBook Air M2", "line": "MacBook Air M2, Price: $1450.00, Quantity: 3"}]
@@ -0,0 +1,70 @@
+import pytest
+from products import Product, LimitedProduct, SecondHalfPrice
+from promotion_engine import compile_promotion
+from sharded_store import ShardedStore, shard_of
+from store import Store
+
+
+def make_products():
+    products = [Product(f"Product {index}", price=10 * (index + 1), quantity=20) for index in range(12)]
+    products.append(LimitedProduct("Shipping", price=10, quantity=250, maximum=1))
+    products[0].set_promotion(SecondHalfPrice("Second Half price!"))
+    return products
+
+
+def find_pair(products, same_shard, workers):
+    for first in products:
+        for second in products:
+            if first is not second and (shard_of(first.name, workers) == shard_of(second.name, workers)) == same_shard:
+                return first, second
+    raise AssertionError("No such pair.")
+
+
+def test_sharded_store_matches_store():
+    """Test that a sharded store lists, totals and prices orders like a single store."""
+    store = Store(make_products())
+    with ShardedStore(make_products(), workers=3) as sharded:
+        assert [product.show() for product in sharded.get_all_products()] == \
+            [product.show() for product in store.get_all_products()]
+        assert sharded.get_total_quantity() == store.get_total_quantity()
+
+        for same_shard in (True, False):
+            first, second = find_pair(sharded.get_all_products(), same_shard, 3)
+            expected = store.order([(store.get_product(first.name), 3), (store.get_product(second.name), 2)])
+            assert sharded.order([(first, 3), (second, 2)]) == expected
+        assert sharded.get_total_quantity() == store.get_total_quantity()
+        assert sharded.get_product("Product 0").show() == store.get_product("Product 0").show()
+
+
+def test_cross_shard_order_is_all_or_nothing():
+    """Test that a failure in one shard releases the stock reserved in the others."""
+    with ShardedStore(make_products(), workers=3) as sharded:
+        products = sharded.get_all_products()
+        first, second = find_pair(products, False, 3)
+        total = sharded.get_total_quantity()
+        with pytest.raises(ValueError, match="Not enough quantity"):
+            sharded.order([(first, 20), (second, 21)])
+        assert sharded.get_total_quantity() == total
+        # A product emptied by the aborted reservation is active again.
+        assert sharded.get_product(first.name).is_active()
+        assert sharded.order([(first, 20)]) == first.get_price(20)
+        assert not sharded.get_product(first.name).is_active()
+
+
+def test_worker_survives_unexpected_errors():
+    """Test that a command failing with an error other than ValueError is reported and the worker keeps serving."""
+    with ShardedStore(make_products(), workers=2) as sharded:
+        product = sharded.get_product("Product 3")
+        with pytest.raises(ValueError, match="TypeError"):
+            sharded.order([(product, "2")])
+        assert sharded.order([(product, 2)]) == product.get_price(2)
+
+
+def test_sharded_store_with_compiled_promotion():
+    """Test that products with a compiled promotion can be handed to worker processes and keep their pricing."""
+    products = make_products()
+    products[1].set_promotion(compile_promotion({"type": "buy_n_get_m", "name": "3 for 2", "buy": 2, "free": 1}))
+    with ShardedStore(products, workers=2) as sharded:
+        product = sharded.get_product("Product 1")
+        assert product.promotion.name == "3 for 2"
+        assert sharded.order([(product, 3)]) == products[1].get_price(3) == 40
@@ -0,0 +1,70 @@
+import pytest
+from products import Product, NonStockedProduct, LimitedProduct, SecondHalfPrice, PercentDiscount
+from promotion_engine import compile_promotion
+from snapshot import PROMOTION_TYPES, save_snapshot, load_snapshot
+from store import Store
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that a saved store loads back with the same products, classes and promotions."""
+    half_price = SecondHalfPrice("Second Half price!")
+    products = [
+        Product("MacBook Air M2", price=1450, quantity=100),
+        Product("Bose QuietComfort Earbuds", price=249.99, quantity=500),
+        NonStockedProduct("Windows License", price=125),
+        LimitedProduct("Shipping", price=10, quantity=250, maximum=1),
+        Product("Google Pixel 7 ✓", price=500, quantity=1),
+    ]
+    products[0].set_promotion(half_price)
+    products[1].set_promotion(half_price)
+    products[2].set_promotion(PercentDiscount("30% off!", percent=30))
+    store = Store(products)
+    store.order([(products[4], 1)])
+
+    path = tmp_path / "store.snapshot"
+    save_snapshot(store, str(path))
+    loaded = load_snapshot(str(path), debug=True)
+
+    assert [type(product) for product in loaded.products] == [type(product) for product in products]
+    assert [product.show() for product in loaded.products] == [product.show() for product in products]
+    assert [product.is_active() for product in loaded.products] == [product.is_active() for product in products]
+    assert loaded.get_product("Shipping").maximum == 1
+    assert loaded.get_product("Windows License").promotion.percent == 30
+    assert loaded.products[0].promotion is loaded.products[1].promotion
+    assert loaded.get_total_quantity() == store.get_total_quantity()
+
+    # Loaded products behave like the originals.
+    assert loaded.order([(loaded.get_product("MacBook Air M2"), 2)]) == products[0].get_price(2)
+    with pytest.raises(ValueError, match="Cannot purchase more than 1"):
+        loaded.order([(loaded.get_product("Shipping"), 2)])
+
+
+def test_snapshot_keeps_compiled_promotions(tmp_path):
+    """Test that a compiled promotion is saved by its description and prices the same after loading."""
+    product = Product("Socks", price=3.5, quantity=100)
+    product.set_promotion(compile_promotion({"type": "buy_n_get_m", "name": "3 for 2", "buy": 2, "free": 1}))
+    path = tmp_path / "store.snapshot"
+    save_snapshot(Store([product]), str(path))
+
+    loaded = load_snapshot(str(path)).get_product("Socks")
+    assert loaded.promotion.name == "3 for 2"
+    assert loaded.get_price(7) == product.get_price(7)
+
+
+def test_load_rejects_other_files(tmp_path):
+    """Test that loading a file that is not a snapshot raises an exception."""
+    path = tmp_path / "store.snapshot"
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    with pytest.raises(ValueError, match="not a store snapshot"):
+        load_snapshot(str(path))
+
+
+def test_load_rejects_unknown_promotion_type(tmp_path, monkeypatch):
+    """Test that a snapshot naming a promotion type this program does not know fails with ValueError."""
+    product = Product("Socks", price=3.5, quantity=100)
+    product.set_promotion(SecondHalfPrice("Second Half price!"))
+    path = tmp_path / "store.snapshot"
+    save_snapshot(Store([product]), str(path))
+    monkeypatch.delitem(PROMOTION_TYPES, "SecondHalfPrice")
+    with pytest.raises(ValueError, match="Unknown promotion type 'SecondHalfPrice'"):
+        load_snapshot(str(path))
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from products import Product, NonStockedProduct
+from stock_events import StockEvent, StockMonitor, LOW_STOCK, OUT_OF_STOCK, RESTOCKED
+from store import Store
+
+
+def make_store():
+    return Store([
+        Product("MacBook Air M2", price=1450, quantity=12),
+        Product("Google Pixel 7", price=500, quantity=250),
+        NonStockedProduct("Windows License", price=125),
+    ], debug=True)
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_events_follow_thresholds():
+    """Test that low-stock, out-of-stock and restocked events are sent once per crossing."""
+    async def scenario():
+        store = make_store()
+        mac, pixel = store.get_product("MacBook Air M2"), store.get_product("Google Pixel 7")
+        monitor = StockMonitor(store, low_stock=10)
+        monitor.set_threshold(pixel, 100)
+        queue = monitor.subscribe()
+        mac.buy(1)
+        mac.buy(2)
+        mac.buy(5)
+        store.order([(mac, 4)])
+        pixel.buy(200)
+        await asyncio.to_thread(store.restock, [(mac, 30), (pixel, 20)])
+        await asyncio.sleep(0)
+        return mac, pixel, drain(queue)
+
+    mac, pixel, events = asyncio.run(scenario())
+    assert events == [StockEvent(LOW_STOCK, mac, 9), StockEvent(OUT_OF_STOCK, mac, 0),
+                      StockEvent(LOW_STOCK, pixel, 50), StockEvent(RESTOCKED, mac, 30)]
+
+
+def test_slow_subscriber_loses_oldest_events():
+    """Test that a full queue drops its oldest events and other subscribers are unaffected."""
+    async def scenario():
+        store = make_store()
+        mac = store.get_product("MacBook Air M2")
+        monitor = StockMonitor(store, low_stock=5)
+        small, large = monitor.subscribe(maxsize=1), monitor.subscribe()
+        for _ in range(3):
+            mac.set_quantity(3)
+            mac.set_quantity(8)
+        await asyncio.sleep(0)
+        events = drain(small), drain(large)
+        monitor.unsubscribe(small)
+        monitor.close()
+        mac.set_quantity(1)
+        await asyncio.sleep(0)
+        return monitor, events, drain(large)
+
+    monitor, (small, large), after_close = asyncio.run(scenario())
+    assert [event.kind for event in small] == [RESTOCKED]
+    assert [event.kind for event in large] == [LOW_STOCK, RESTOCKED] * 3
+    assert monitor.dropped == 5
+    assert after_close == []
+
+
+def test_restock_reactivates_sold_out_products():
+    """Test that a bulk restock adds stock, reactivates sold-out products in order, and is all-or-nothing."""
+    store = make_store()
+    products = [Product(f"Cable {index}", price=5, quantity=1) for index in range(10)]
+    for product in products:
+        store.add_product(product)
+        product.buy(1)
+    hidden = store.get_product("Google Pixel 7")
+    hidden.deactivate()
+
+    assert store.restock([(product, 2) for product in products[::-1]] + [(hidden, 5), (products[0], 1)]) == 10
+    assert [product.get_quantity() for product in products] == [3] + [2] * 9
+    assert store.get_all_products() == [store.get_product(name) for name in ("MacBook Air M2", "Windows License")] \
+        + products
+    assert not hidden.is_active()
+
+    with pytest.raises(ValueError, match="not stocked"):
+        store.restock([(products[0], 1), (store.get_product("Windows License"), 1)])
+    with pytest.raises(ValueError, match="not in the store"):
+        store.restock([(Product("Nokia", price=1, quantity=1), 1)])
+    assert products[0].get_quantity() == 3
@@ -0,0 +1,276 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from products import Product, NonStockedProduct, LimitedProduct, SecondHalfPrice
+from promotion_engine import Bundle
+from store import Store
+
+
+def make_products():
+    return [
+        Product("MacBook Air M2", price=1450, quantity=100),
+        Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+        Product("Google Pixel 7", price=500, quantity=250),
+        NonStockedProduct("Windows License", price=125),
+        LimitedProduct("Shipping", price=10, quantity=250, maximum=1),
+    ]
+
+
+def make_store():
+    return Store(make_products())
+
+
+def test_get_product_by_name():
+    """Test that products can be looked up by name."""
+    store = make_store()
+    assert store.get_product("Google Pixel 7").price == 500
+    with pytest.raises(ValueError, match="Product 'Nokia' is not in the store."):
+        store.get_product("Nokia")
+
+
+def test_duplicate_product_name_rejected():
+    """Test that adding two products with the same name raises an exception."""
+    store = make_store()
+    with pytest.raises(ValueError, match="already in the store"):
+        store.add_product(Product("Google Pixel 7", price=1, quantity=1))
+
+
+
+def test_add_products_stops_at_a_duplicate():
+    """Test that a bulk add indexes the products before a duplicate name, sorted, and then raises."""
+    store = make_store()
+    batch = [Product("Zune", price=5, quantity=2), Product("Google Pixel 7", price=1, quantity=1),
+             Product("Kindle", price=90, quantity=3)]
+    with pytest.raises(ValueError, match="Product 'Google Pixel 7' is already in the store."):
+        store.add_products(batch)
+    assert store.get_product("Zune") is batch[0]
+    assert "Kindle" not in [product.name for product in store.products]
+    cheapest = store.get_page(limit=1, sort_by="price").products
+    assert cheapest == [batch[0]]
+    store.check_aggregates()
+
+
+def test_product_cannot_be_renamed_in_a_store():
+    """Test that a product in a store keeps its name, so the store's indexes stay valid."""
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    with pytest.raises(ValueError, match="Cannot rename a product while it is in a store."):
+        pixel.name = "Google Pixel 8"
+    store.order([(pixel, 1)])
+    store.check_aggregates()
+    store.remove_product(pixel)
+    pixel.name = "Google Pixel 8"
+    store.add_product(pixel)
+    assert store.get_product("Google Pixel 8") is pixel
+
+def test_remove_product():
+    """Test that removing a product takes it out of every view of the store."""
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    store.remove_product(pixel)
+    assert pixel not in store.products
+    assert pixel not in store.get_all_products()
+    with pytest.raises(ValueError):
+        store.get_product("Google Pixel 7")
+    # Removed products no longer affect the store.
+    pixel.set_quantity(0)
+    pixel.activate()
+    assert pixel not in store.get_all_products()
+
+
+def test_active_products_follow_product_state():
+    """Test that the active products view is updated when products change state."""
+    store = make_store()
+    mac = store.get_product("MacBook Air M2")
+    names = [product.name for product in store.get_all_products()]
+
+    mac.buy(100)
+    assert mac not in store.get_all_products()
+
+    mac.activate()
+    assert [product.name for product in store.get_all_products()] == names
+
+
+def test_inventory_aggregates_follow_changes():
+    """Test that the running inventory totals match a recount after every kind of change."""
+    store = Store(make_products(), debug=True)
+    assert store.get_total_quantity() == 100 + 500 + 250 + 0 + 250
+    assert store.get_active_count() == 5
+
+    mac = store.get_product("MacBook Air M2")
+    store.order([(mac, 100), (store.get_product("Shipping"), 1)])
+    assert store.get_total_quantity() == 500 + 250 + 249
+    assert store.get_active_count() == 4
+
+    store.get_product("Google Pixel 7").price = 400
+    store.remove_product(store.get_product("Bose QuietComfort Earbuds"))
+    store.add_product(Product("Nokia 3310", price=50, quantity=10))
+    assert store.get_total_quantity() == 250 + 249 + 10
+    assert store.get_stock_value() == 250 * 400 + 249 * 10 + 10 * 50
+    store.check_aggregates()
+
+
+def test_products_are_read_only():
+    """Test that the product listing cannot be changed behind the store's back."""
+    store = make_store()
+    with pytest.raises(AttributeError):
+        store.products.append(Product("Nokia 3310", price=50, quantity=10))
+
+
+def test_failed_order_takes_no_stock():
+    """Test that an order with one failing line leaves every product unchanged."""
+    store = make_store()
+    mac = store.get_product("MacBook Air M2")
+    shipping = store.get_product("Shipping")
+    with pytest.raises(ValueError, match="Cannot purchase more than 1 of 'Shipping' at once."):
+        store.order([(mac, 10), (shipping, 2)])
+    assert mac.get_quantity() == 100
+    assert shipping.get_quantity() == 250
+
+    # Repeated lines for the same product count against the same stock.
+    with pytest.raises(ValueError, match="Not enough quantity available for purchase."):
+        store.order([(mac, 60), (mac, 60)])
+    assert mac.get_quantity() == 100
+
+
+def test_concurrent_orders_do_not_oversell():
+    """Test that many threads ordering the same products never sell more than is in stock."""
+    products = [Product(f"Product {index}", price=10, quantity=300) for index in range(8)]
+    store = Store(products)
+    sold = {product.name: 0 for product in products}
+    sold_lock = threading.Lock()
+
+    def shopper(seed):
+        rng = random.Random(seed)
+        for _ in range(300):
+            lines = [(product, rng.randint(1, 5)) for product in rng.sample(products, rng.randint(1, 3))]
+            try:
+                store.order(lines)
+            except ValueError:
+                continue
+            with sold_lock:
+                for product, quantity in lines:
+                    sold[product.name] += quantity
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(shopper, range(16)))
+
+    for product in products:
+        assert product.get_quantity() == 300 - sold[product.name]
+        assert product.get_quantity() >= 0
+    assert store.get_total_quantity() == sum(product.get_quantity() for product in products)
+
+
+def test_process_orders_serves_batch_in_order():
+    """Test that a batch is served first come, first served and rejected orders take no stock."""
+    store = make_store()
+    mac = store.get_product("MacBook Air M2")
+    pixel = store.get_product("Google Pixel 7")
+    shipping = store.get_product("Shipping")
+    results = store.process_orders([
+        [(mac, 60), (pixel, 1)],
+        [(mac, 60)],
+        [(mac, 40), (shipping, 1)],
+        [(shipping, 2)],
+    ])
+    assert results[0] == (60 * 1450 + 500, None)
+    assert results[1].total_price is None
+    assert "Not enough quantity available" in results[1].error
+    assert results[2].total_price == 40 * 1450 + 10
+    assert "Cannot purchase more than 1" in results[3].error
+    assert mac.get_quantity() == 0
+    assert mac not in store.get_all_products()
+    assert pixel.get_quantity() == 249
+    assert shipping.get_quantity() == 249
+
+
+def test_process_orders_priority():
+    """Test that a priority function decides which orders get scarce stock."""
+    store = make_store()
+    mac = store.get_product("MacBook Air M2")
+    results = store.process_orders([[(mac, 60)], [(mac, 70)]], priority=lambda order: -order[0][1])
+    assert results[0].error is not None
+    assert results[1].total_price == 70 * 1450
+    assert mac.get_quantity() == 30
+
+
+def test_quote_prices_without_buying():
+    """Test that a quote matches the order's price line by line and takes no stock."""
+    store = make_store()
+    mac = store.get_product("MacBook Air M2")
+    bose = store.get_product("Bose QuietComfort Earbuds")
+    mac.set_promotion(SecondHalfPrice("Second Half price!"))
+    store.add_bundle(Bundle("Mac with earbuds", {"MacBook Air M2": 1, "Bose QuietComfort Earbuds": 1}, price=1600))
+    shopping_list = [(mac, 2), (bose, 1)]
+
+    quote = store.quote(shopping_list)
+    assert [(line.quantity, line.list_price, line.price, line.promotion) for line in quote.lines] == [
+        (2, 2900, 2175, "Second Half price!"), (1, 250, 250, None)]
+    assert quote.bundle_discount == 2175 + 250 - quote.total_price
+    assert mac.get_quantity() == 100
+    assert store.quote(shopping_list) is quote
+    assert store.order(shopping_list) == quote.total_price
+
+
+def test_quote_cache_follows_changes():
+    """Test that cached quotes and failures are dropped when the store changes."""
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    assert store.quote([(pixel, 2)]).total_price == 1000
+    assert store.quote([[pixel, 2]]).total_price == 1000
+    pixel.price = 400
+    assert store.quote([(pixel, 2)]).total_price == 800
+
+    with pytest.raises(ValueError, match="Not enough quantity"):
+        store.quote([(pixel, 300)])
+    with pytest.raises(ValueError, match="Not enough quantity"):
+        store.quote([(pixel, 300)])
+    pixel.set_quantity(300)
+    assert store.quote([(pixel, 300)]).total_price == 120_000
+    pixel.deactivate()
+    with pytest.raises(ValueError, match="not active"):
+        store.quote([(pixel, 1)])
+
+
+def test_quote_cache_survives_orders_for_other_products():
+    """Test that a cached quote is only dropped when one of its own products changes."""
+    store = make_store()
+    mac = store.get_product("MacBook Air M2")
+    pixel = store.get_product("Google Pixel 7")
+    quote = store.quote([(mac, 1)])
+    store.order([(pixel, 1)])
+    assert store.quote([(mac, 1)]) is quote
+    store.order([(mac, 1)])
+    assert store.quote([(mac, 1)]) is not quote
+    store.add_bundle(Bundle("Mac with phone", {"MacBook Air M2": 1, "Google Pixel 7": 1}, price=1000))
+    assert store.quote([(mac, 1), (pixel, 1)]).total_price == 1000
+
+
+def test_failed_ledger_does_not_fail_committed_order():
+    """Test that an order whose stock was taken still succeeds when the ledger cannot record it."""
+    class BrokenLedger:
+        def record(self, lines):
+            raise OSError("disk full")
+
+    store = make_store()
+    store.ledger = BrokenLedger()
+    pixel = store.get_product("Google Pixel 7")
+    with pytest.warns(RuntimeWarning, match="disk full"):
+        assert store.order([(pixel, 2)]) == 1000
+    assert pixel.get_quantity() == 248
+
+
+def test_prepared_order_commits_or_aborts():
+    """Test that a prepared order holds its stock until it is committed, and gives it back when aborted."""
+    store = make_store()
+    pixel = store.get_product("Google Pixel 7")
+    prepared = store.prepare_order([(pixel, 250)])
+    assert prepared.total_cents == 250 * 500 * 100
+    assert pixel.get_quantity() == 0 and not pixel.is_active()
+    store.abort_order(prepared)
+    assert pixel.get_quantity() == 250 and pixel.is_active()
+
+    store.commit_order(store.prepare_order([(pixel, 2)]))
+    assert pixel.get_quantity() == 248
+    store.check_aggregates()
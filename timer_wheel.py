@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import math
+
+
+class Timer:
+    """
+        A scheduled item of a TimerWheel, used to cancel it.
+    """
+    __slots__ = ("due", "item", "slot")
+
+    def __init__(self, due: int, item: object):
+        self.due = due
+        self.item = item
+        self.slot: dict[int, "Timer"] | None = None
+
+
+class TimerWheel:
+    """
+        Expires scheduled items in amortized constant time per item, whatever their number.
+
+        Time is cut into ticks. The wheel has several levels of slots, each level's slots
+        covering as many ticks as the whole level below: with 64 slots, a level 0 slot is one
+        tick, a level 1 slot 64 ticks, a level 2 slot 4096 ticks, and so on. An item is kept in
+        the slot of the lowest level that reaches its due tick. As time advances, level 0 slots
+        are expired one by one, and each time a level comes round, the next slot of the level
+        above is emptied into the levels below. An item therefore moves at most once per level
+        before it expires, and nothing ever scans the items that are not yet due.
+
+        Methods:
+            schedule(deadline, item) -> Timer: Schedules an item to expire at a time.
+            cancel(timer): Unschedules an item.
+            advance(now) -> List[Any]: Advances to a time and returns the items that expired.
+    """
+
+    def __init__(self, now: float, tick: float = 1.0, slots: int = 64, levels: int = 4):
+        if tick <= 0:
+            raise ValueError("Tick must be greater than zero.")
+        if slots < 2 or levels < 1:
+            raise ValueError("A timer wheel needs at least two slots and one level.")
+        self.tick = tick
+        self.slots = slots
+        self._origin = now
+        self._current = 0
+        self._levels: list[list[dict[int, Timer]]] = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tick_of(self, time: float) -> int:
+        return math.ceil((time - self._origin) / self.tick)
+
+    def schedule(self, deadline: float, item: object) -> Timer:
+        """
+                Schedules an item to expire at a time.
+
+                Args:
+                    deadline (float): The time, on the clock passed to advance, at which the item
+                        expires. It is rounded up to a whole tick.
+                    item: The item returned by advance once it has expired.
+
+                Returns:
+                    Timer: The timer of the item, to cancel it.
+        """
+        timer = Timer(max(self._tick_of(deadline), self._current + 1), item)
+        self._place(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer: Timer):
+        """
+                Unschedules an item, if it has not expired yet.
+        """
+        if timer.slot is not None:
+            del timer.slot[id(timer)]
+            timer.slot = None
+            self._count -= 1
+
+    def _place(self, timer: Timer):
+        delta = timer.due - self._current
+        span = self.slots
+        level = 0
+        while delta >= span and level < len(self._levels) - 1:
+            span *= self.slots
+            level += 1
+        slot = self._levels[level][(timer.due * self.slots // span) % self.slots]
+        slot[id(timer)] = timer
+        timer.slot = slot
+
+    def advance(self, now: float) -> list[object]:
+        """
+                Advances the wheel to a time and returns the items due by then, in due order.
+
+                Args:
+                    now (float): The current time. Times before the last one advanced to are ignored.
+
+                Returns:
+                    List[Any]: The expired items.
+        """
+        target = math.floor((now - self._origin) / self.tick)
+        expired = []
+        while self._current < target:
+            if not self._count:
+                self._current = target
+                break
+            self._current += 1
+            self._cascade()
+            slot = self._levels[0][self._current % self.slots]
+            for timer in list(slot.values()):
+                if timer.due <= self._current:
+                    del slot[id(timer)]
+                    timer.slot = None
+                    self._count -= 1
+                    expired.append(timer.item)
+        return expired
+
+    def _cascade(self):
+        """
+                Empties the slots of the upper levels that have come round into the levels below,
+                from the top down, so that items can fall through several levels at once.
+        """
+        spans = []
+        span = 1
+        for _ in range(1, len(self._levels)):
+            span *= self.slots
+            if self._current % span:
+                break
+            spans.append(span)
+        for level in range(len(spans), 0, -1):
+            span = spans[level - 1]
+            slot = self._levels[level][(self._current // span) % self.slots]
+            timers = list(slot.values())
+            slot.clear()
+            for timer in timers:
+                self._place(timer)